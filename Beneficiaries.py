@@ -1,7 +1,11 @@
 import streamlit as st
 from dashboard import CreateDashboard
 from graphs import CreateGraphs
+from payload import configure_json_engine
 from processing import ProcessData
+from warmup import get_warmup
+from cube import get_municipality_status, get_reach_cube
+from geometry import load_boundaries
 
 
 class DashboardAlcance(CreateDashboard):
@@ -11,31 +15,69 @@ class DashboardAlcance(CreateDashboard):
     based on the provided data.
 
     Attributes:
+        datasets (list): Datasets of the page, in the order they are loaded.
         option (str): The current option being displayed, default is "Direct Beneficiaries".
         graph_options (dict): A nested dictionary containing configuration for various graphs
                               related to direct beneficiaries and reached municipalities.
     """
+    # Datasets of the page in loading order: the cube and the sidebar need 'alcance' first
+    datasets = ["alcance", "municipios", "municipios_alcanzados"]
 
     def __init__(self, df):
         """
         Initializes the DashboardAlcance class, setting up the graph options based on the input data.
 
         :param df: A DataFrame containing the data for visualizations, including 'alcance'
-                   and 'municipios' information.
+                   and 'municipios' information. Only 'alcance' is required; the other datasets
+                   can arrive later (see launch_dashboard).
         """
         super().__init__(df)  # Call the constructor of the parent class to initialize base functionality.
 
         # Set the default option for the dashboard.
         self.option = "Direct Beneficiaries"
 
+        # Precomputed cube of the 'alcance' dataset, shared by all sessions for the same data version.
+        self.cube = get_reach_cube(self.df["alcance"], ProcessData.dataset_version(self.df["alcance"]))
+        # Filters selected in the sidebar, as {dimension: accepted values}. Empty lists accept every value.
+        self.filters = {}
+
         # Define graph options for various categories of data related to beneficiaries and municipalities.
+        self.set_graph_options()
+
+    def set_graph_options(self):
+        """
+        Builds the configuration of every graph option. The aggregates are answered by the reach cube
+        for the filters selected in the sidebar (self.filters).
+
+        :return: None; sets self.graph_options.
+        """
+        # Filters restricted to the people of each implementation, combined with the selected implementations
+        selected = self.filters.get("Implementación")
+        educators = dict(self.filters, **{"Implementación": lambda s: s.str.contains("Educadores") &
+                                          (s.isin(selected) if selected else True)})
+        students = dict(self.filters, **{"Implementación": lambda s: s.str.contains("Estudiantes") &
+                                         (s.isin(selected) if selected else True)})
+
+        # Municipalities of the selected states and priorities (None while the catalog is loading)
+        municipios = self.filter_frame(self.df.get("municipios"), ["Entidad", "Prioridad"])
+
+        # Unreached priority municipalities (derived at ingest) of the selected states
+        not_reached = self.filter_frame(self.df.get("municipios_alcanzados"), ["Entidad"])
+
+        # Reached or not, for every municipality of the selected states and priorities
+        status = None
+        if self.df.get("municipios") is not None:
+            version = (ProcessData.dataset_version(self.df["municipios"]) +
+                       ProcessData.dataset_version(self.df["alcance"]))
+            status = self.filter_frame(get_municipality_status(self.df["municipios"], self.df["alcance"], version),
+                                       ["Entidad", "Prioridad"])
+
         self.graph_options = {
             "Direct Beneficiaries": {
                 "states": {
                     # Data for direct beneficiaries grouped by state and priority.
-                    "df": self.df["alcance"].groupby(["Entidad", "Prioridad"]).aggregate({
-                        "Email": "nunique"  # Count unique emails (beneficiaries).
-                    }).reset_index(),
+                    "df": self.cube.query(["Entidad", "Prioridad"], self.filters,
+                                          Email=("Email", "nunique")),  # Count unique emails (beneficiaries).
                     "x": "Email",  # X-axis variable for the graph.
                     "y": "Entidad",  # Y-axis variable for the graph.
                     "type_graph": "barchart",  # Type of graph to create.
@@ -50,9 +92,7 @@ class DashboardAlcance(CreateDashboard):
                 },
                 "program": {
                     # Data for direct beneficiaries grouped by program type and priority.
-                    "df": self.df["alcance"].groupby(["Tipo", "Prioridad"]).aggregate({
-                        "Email": "nunique"
-                    }).reset_index(),
+                    "df": self.cube.query(["Tipo", "Prioridad"], self.filters, Email=("Email", "nunique")),
                     "x": "Email",
                     "y": "Tipo",
                     "type_graph": "barchart",
@@ -67,8 +107,7 @@ class DashboardAlcance(CreateDashboard):
                 },
                 "professionals": {
                     # Data for educators who benefited, grouped by state and priority.
-                    "df": self.df["alcance"][self.df["alcance"]["Implementación"].str.contains("Educadores")]
-                    .groupby(["Entidad", "Prioridad"]).aggregate({"Email": "nunique"}).reset_index(),
+                    "df": self.cube.query(["Entidad", "Prioridad"], educators, Email=("Email", "nunique")),
                     "x": "Email",
                     "y": "Entidad",
                     "type_graph": "barchart",
@@ -83,10 +122,8 @@ class DashboardAlcance(CreateDashboard):
                 },
                 "schools": {
                     # Data for verified schools grouped by state and priority.
-                    "df": self.df["alcance"][(self.df["alcance"]["Centro de trabajo verificado"]) &
-                                             (self.df["alcance"]["Tipo_cct"] == "Escuela")].groupby(
-                        ["Entidad", "Prioridad"])
-                    .aggregate({"Centro de trabajo": "nunique"}).reset_index(),
+                    "df": self.cube.query(["Entidad", "Prioridad"], dict(self.filters, **{"Escuela verificada": True}),
+                                          **{"Centro de trabajo": ("Centro de trabajo", "nunique")}),
                     "x": "Centro de trabajo",
                     "y": "Entidad",
                     "type_graph": "barchart",
@@ -101,8 +138,7 @@ class DashboardAlcance(CreateDashboard):
                 },
                 "teenagers": {
                     # Data for directly benefited teenagers, grouped by state and priority.
-                    "df": self.df["alcance"][self.df["alcance"]["Implementación"].str.contains("Estudiantes")]
-                    .groupby(["Entidad", "Prioridad"]).aggregate({"Email": "nunique"}).reset_index(),
+                    "df": self.cube.query(["Entidad", "Prioridad"], students, Email=("Email", "nunique")),
                     "x": "Email",
                     "y": "Entidad",
                     "type_graph": "barchart",
@@ -117,9 +153,8 @@ class DashboardAlcance(CreateDashboard):
                 },
                 "indirect": {
                     # Data for both directly and indirectly benefited teenagers grouped by state.
-                    "df": self.df["alcance"][self.df["alcance"]["Implementación"].str.contains("Estudiantes")]
-                    .groupby(["Entidad", "Ben_directo"]).agg(Conteo=("Ben_directo", "sum"))
-                    .reset_index().astype(str),
+                    "df": self.cube.query(["Entidad", "Ben_directo"], students,
+                                          Conteo=("Ben_directo", "sum")).astype(str),
                     "x": "Conteo",
                     "y": "Entidad",
                     "type_graph": "barchart",
@@ -136,7 +171,7 @@ class DashboardAlcance(CreateDashboard):
             "Reached Municipalities": {
                 "states": {
                     # Data for municipalities reached, grouped by state.
-                    "df": self.df["municipios"],
+                    "df": municipios,
                     "x": "Municipio_Porcentaje",
                     "y": "Entidad",
                     "type_graph": "barchart",
@@ -149,15 +184,50 @@ class DashboardAlcance(CreateDashboard):
                     "legend_name": "Municipality Priority",
                     "legend_translation": None
                 },
-                # "legend": {
-                #     # Data for the legend of reached municipalities.
-                #     "df": self.df["municipios_alcanzados"],
-                #     "type_graph": "reached_municipalities_legend",
-                #     "title": None
-                # }
+                "legend": {
+                    # Priority municipalities of the selected states missing from the reach data.
+                    "df": not_reached,
+                    "type_graph": "reached_municipalities_legend",
+                    "title": None
+                }
             }
         }
 
+        # Map of reached municipalities, first in its option, when municipal boundaries are configured
+        boundaries = load_boundaries()
+        if boundaries is not None:
+            self.graph_options["Reached Municipalities"] = {
+                "map": {
+                    "df": status,
+                    "boundaries": boundaries,  # Simplified geometries, loaded once per process
+                    "type_graph": "choropleth",
+                    "color": "Status",
+                    "title": "Reached and unreached municipalities",
+                    "show_legend": True,
+                    "legend_name": "Municipality"
+                },
+                **self.graph_options["Reached Municipalities"]
+            }
+
+    def filter_frame(self, df, columns: list):
+        """
+        Keeps the rows of a frame matching the sidebar filters on some of its columns. A filtered frame gets
+        its own version (see ProcessData.derive_version), so it does not share cache keys with the whole frame.
+
+        :param df: DataFrame to filter, or None while it is loading.
+        :param columns: Filtered columns (e.g., ["Entidad", "Prioridad"]).
+        :return: The filtered DataFrame, the frame itself when no filter is selected, or None.
+        """
+        active = {column: self.filters[column] for column in columns if self.filters.get(column)}
+        if df is None or not active:
+            return df
+
+        mask = None
+        for column, values in active.items():
+            selected = df[column].isin(values)
+            mask = selected if mask is None else mask & selected
+        return ProcessData.derive_version(df[mask], ProcessData.dataset_version(df), active)
+
     def set_sidebar(self):
         """
         Configures the sidebar of the dashboard. This method creates dropdown menus
@@ -179,11 +249,30 @@ class DashboardAlcance(CreateDashboard):
                 options=self.graph_options.keys()  # Options are the keys from the graph_options dictionary
             )
 
-    def launch_dashboard(self):
+            # Filters answered by the reach cube. An empty selection keeps every value.
+            st.write("Filter beneficiaries")
+            labels = {
+                "Entidad": "State",
+                "Prioridad": "Municipality priority",
+                "Tipo": "Program component",
+                "Implementación": "Implementation"
+            }
+            for dimension, label in labels.items():
+                self.filters[dimension] = st.multiselect(label=label, options=self.cube.values(dimension))
+
+            # Restrict the counts to verified schools
+            if st.checkbox("Verified schools only"):
+                self.filters["Escuela verificada"] = True
+            else:
+                self.filters.pop("Escuela verificada", None)
+
+    def launch_dashboard(self, stream=None):
         """
         Launches the dashboard by configuring the header and sidebar,
         and rendering the selected graphs based on user options.
 
+        :param stream: Remaining (key, DataFrame) pairs of ProcessData.iter_data. Charts are drawn as soon
+                       as their datasets arrive. None when every dataset is already loaded.
         :return: None; executes the methods to set the dashboard layout and graphs.
         """
 
@@ -191,23 +280,40 @@ class DashboardAlcance(CreateDashboard):
         self.set_header("Beneficiaries")
 
         # Configure the sidebar for user selections
+        selected = {k: v for k, v in self.filters.items() if v}
         self.set_sidebar()
 
-        # Iterate through the graph options based on the selected option from the sidebar
-        for k in self.graph_options[self.option]:
-            # Add a space in the Streamlit app for visual separation
-            st.write("")
+        # Rebuild the graph options when the filters differ from those of __init__ (empty selections accept
+        # every value, so they do not count)
+        if {k: v for k, v in self.filters.items() if v} != selected:
+            self.set_graph_options()
+
+        # Draw the graphs of the selected option, each one as soon as its data is ready
+        self.render_charts(stream)
 
-            # Retrieve the data configuration for the current graph option
-            data = self.graph_options[self.option][k]
+    def draw_chart(self, data: dict):
+        """
+        Draws one graph of the selected option.
+
+        :param data: Data configuration of the graph.
+        :return: None
+        """
+        # Add a space in the Streamlit app for visual separation
+        st.write("")
 
-            # Set the subtitle header for the current graph
-            self.set_header(data["title"], type_header="subtitle")
+        # Set the subtitle header for the current graph
+        self.set_header(data["title"], type_header="subtitle")
 
-            # Create an instance of CreateGraphs with the current data configuration
-            # and set up the plots in a grid format based on the specified graph type
-            CreateGraphs(data).set_plots_grid(type_graph=data["type_graph"])
+        # Create an instance of CreateGraphs with the current data configuration
+        # and set up the plots in a grid format based on the specified graph type
+        CreateGraphs(data).set_plots_grid(type_graph=data["type_graph"])
 
 
-st.set_page_config(layout="wide")
-DashboardAlcance(ProcessData().read_data()).launch_dashboard()
+# Streamlit runs pages as "__main__"; the guard lets tools import the dashboard classes.
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    configure_json_engine()  # orjson for the figures sent to the browser, set once per server process
+    get_warmup()  # Prepares the data and every figure once per server process, in the background
+    # Stream the page datasets; the page starts as soon as 'alcance' is ready
+    stream = ProcessData().iter_data(DashboardAlcance.datasets)
+    DashboardAlcance(DashboardAlcance.collect(stream, ["alcance"])).launch_dashboard(stream)
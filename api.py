@@ -0,0 +1,344 @@
+"""
+Read-only JSON API of the dashboards, for partner sites that embed the reach and outcome numbers without
+opening a Streamlit session per viewer.
+
+Endpoints (GET or HEAD):
+    /                                   Index: data version, pages, graph options, charts and tiles.
+    /<page>/<option>/<chart>            Aggregate behind a chart (the "df" of its configuration).
+    /<page>/<option>/<chart>/figure     Plotly figure JSON of a chart. Disaggregated charts take ?tile=<n>,
+                                        the position of the tile in the index.
+
+Pages are "beneficiaries" and "outcomes"; options and charts are the keys of `graph_options`, URL-encoded.
+The charts are those of the default page state (no sidebar filters, default subanalysis).
+
+Every response carries an ETag derived from the data-version fingerprint of the loaded datasets, so a
+request with a matching If-None-Match is answered 304 before anything is built. Response bodies are kept in
+the shared cache (cache.py) under that ETag, and figures go through the same figure cache as the pages.
+
+Usage:
+    python api.py [--host 127.0.0.1] [--port 8600]
+
+Environment: PIBSE_API_REFRESH_SECONDS (default 60) bounds how often the datasets are read again; the
+other PIBSE_* settings are the ones of the pages.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cache import get_shared_cache
+from warmup import PAGES, WarmUp
+
+logger = logging.getLogger(__name__)
+
+
+class NotFound(Exception):
+    """
+    Raised for paths that do not name a page, option, chart or tile.
+    """
+
+
+class DashboardAPI:
+    """
+    This class answers the API requests from the dashboards of the default page state. The datasets and the
+    dashboard instances are loaded once and reloaded at most every `refresh` seconds; a reload only changes
+    the ETags when the fingerprint of some dataset changed.
+
+    Every request works on one snapshot of (version, pages) taken at its start (see snapshot), so a reload
+    in another thread cannot give it the ETag of one version and the body of another.
+    """
+
+    def __init__(self, refresh: float = None):
+        """
+        :param refresh: Minimum time between two reads of the datasets, in seconds. Defaults to
+                        PIBSE_API_REFRESH_SECONDS (60).
+        """
+        if refresh is None:
+            refresh = float(os.environ.get("PIBSE_API_REFRESH_SECONDS", 60))
+        self.refresh = refresh
+        self.version = None  # Fingerprint of every loaded dataset
+        self.pages = {}  # Dashboard instances by page name
+        self.loaded = 0.0  # Time of the last read of the datasets
+        self.lock = threading.Lock()  # One reload at a time
+        self.state_lock = threading.Lock()  # Guards the swap and the reads of (version, pages)
+
+    @staticmethod
+    def page_name(page: str):
+        """
+        :param page: Page script (e.g., "pages/1_Outcomes.py").
+        :return: The page name used in the paths (e.g., "outcomes").
+        """
+        return os.path.splitext(os.path.basename(page))[0].split("_")[-1].lower()
+
+    def load(self):
+        """
+        Reads the datasets (from the caches of ProcessData when they did not change) and, when their
+        fingerprint changed, instantiates the dashboards again.
+
+        :return: None
+        """
+        from processing import ProcessData
+
+        with self.lock:
+            if self.version is not None and time.time() - self.loaded < self.refresh:
+                return  # Another request reloaded the datasets meanwhile
+
+            data = ProcessData().read_data()
+            version = ProcessData.data_version(data)  # The fingerprint of the page and figure cache keys
+
+            if version != self.version:
+                dashboards = WarmUp.dashboards(data)
+                pages = {self.page_name(page): dashboard for (page, _), dashboard in zip(PAGES, dashboards)}
+                with self.state_lock:
+                    self.version, self.pages = version, pages
+            self.loaded = time.time()
+
+    def snapshot(self):
+        """
+        :return: A tuple (data version, dashboard instances by page), after reloading the datasets when the
+                 refresh interval elapsed. Both belong to the same load.
+        """
+        if self.version is None or time.time() - self.loaded >= self.refresh:
+            self.load()
+        with self.state_lock:
+            return self.version, self.pages
+
+    @staticmethod
+    def normalize_query(path: str, query: str):
+        """
+        Keeps only the parameters a resource uses, so unrelated parameters (e.g., cache busters) do not
+        create new ETags and cache entries.
+
+        :param path: Path of the request.
+        :param query: Query string of the request.
+        :return: "tile=<n>" for figures ("tile=0" by default), an empty string for the other resources.
+        """
+        if path.rstrip("/").endswith("/figure"):
+            return f"tile={parse_qs(query).get('tile', ['0'])[0]}"
+        return ""
+
+    @staticmethod
+    def etag(version: str, path: str, query: str):
+        """
+        :param version: Data version of the request snapshot.
+        :param path: Path of the request.
+        :param query: Normalized query string of the request (see normalize_query).
+        :return: A strong ETag for the resource at that data version.
+        """
+        digest = hashlib.sha1(f"{version}|{path}?{query}".encode("utf-8")).hexdigest()[:20]
+        return f'"{digest}"'
+
+    @staticmethod
+    def chart(pages: dict, page: str, option: str, chart: str):
+        """
+        :param pages: Dashboard instances by page, from the request snapshot.
+        :return: The configuration of a chart of `graph_options`.
+        """
+        try:
+            return pages[page].graph_options[option][chart]
+        except KeyError:
+            raise NotFound(f"/{page}/{option}/{chart}")
+
+    @staticmethod
+    def tiles(config: dict):
+        """
+        :param config: Chart configuration.
+        :return: The tiles of the chart, as listed by the warm-up (a single None for non-disaggregated charts).
+        """
+        from graphs import CreateGraphs
+
+        return WarmUp.tiles(CreateGraphs(config), config["type_graph"])
+
+    def index(self, version: str, pages: dict):
+        """
+        :param version: Data version of the request snapshot.
+        :param pages: Dashboard instances by page, from the request snapshot.
+        :return: The index document: data version, and the charts and tiles of every page.
+        """
+        index = {}
+        for page, dashboard in pages.items():
+            index[page] = {
+                option: {
+                    chart: {
+                        "title": config.get("title"),
+                        "type_graph": config["type_graph"],
+                        "tiles": [None if t is None else str(t) for t in self.tiles(config)]
+                    }
+                    for chart, config in charts.items() if config.get("df") is not None or "data" in config
+                }
+                for option, charts in dashboard.graph_options.items()
+            }
+        return json.dumps({"version": version, "pages": index}, ensure_ascii=False).encode("utf-8")
+
+    def aggregate(self, pages: dict, page: str, option: str, chart: str):
+        """
+        :param pages: Dashboard instances by page, from the request snapshot.
+        :return: The aggregate behind a chart, as {"title", "type_graph", "columns", "data": [records]}.
+        """
+        from extracts import extract_frame
+
+        config = self.chart(pages, page, option, chart)
+        df = extract_frame(config)
+        if df is None:
+            raise NotFound(f"/{page}/{option}/{chart}")
+
+        meta = json.dumps({"title": config.get("title"), "type_graph": config["type_graph"],
+                           "columns": [str(c) for c in df.columns]}, ensure_ascii=False)
+        records = df.to_json(orient="records", date_format="iso", force_ascii=False)
+        return f'{meta[:-1]}, "data": {records}}}'.encode("utf-8")
+
+    def figure(self, pages: dict, page: str, option: str, chart: str, tile: str = None):
+        """
+        :param pages: Dashboard instances by page, from the request snapshot.
+        :param tile: Position of the tile in the index, for disaggregated charts.
+        :return: The Plotly JSON of a chart, read from the shared figure cache or built once.
+        """
+        import plotly.io as pio
+        from graphs import CreateGraphs
+
+        config = self.chart(pages, page, option, chart)
+        tiles = self.tiles(config)
+        try:
+            value = tiles[int(tile or 0)]
+        except (ValueError, IndexError):
+            raise NotFound(f"/{page}/{option}/{chart}/figure?tile={tile}")
+
+        fig = CreateGraphs(config).cached_figure(config["type_graph"], value)
+        return pio.to_json(fig, validate=False).encode("utf-8")
+
+    def body(self, version: str, pages: dict, path: str, query: str):
+        """
+        Builds the body of a resource.
+
+        :param version: Data version of the request snapshot.
+        :param pages: Dashboard instances by page, from the request snapshot.
+        :param path: Path of the request.
+        :param query: Query string of the request.
+        :return: The JSON body as bytes.
+        """
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if not parts:
+            return self.index(version, pages)
+        if len(parts) == 3:
+            return self.aggregate(pages, *parts)
+        if len(parts) == 4 and parts[3] == "figure":
+            return self.figure(pages, *parts[:3], tile=parse_qs(query).get("tile", [None])[0])
+        raise NotFound(path)
+
+    def respond(self, path: str, query: str, if_none_match: str = None):
+        """
+        Answers a request: 304 when the client holds the current version, the cached body otherwise.
+
+        :param path: Path of the request.
+        :param query: Query string of the request.
+        :param if_none_match: Value of the If-None-Match header, if any.
+        :return: A tuple (status, ETag, body).
+        """
+        version, pages = self.snapshot()
+        query = self.normalize_query(path, query)
+        etag = self.etag(version, path, query)
+        if if_none_match and (if_none_match.strip() == "*" or etag in map(str.strip, if_none_match.split(","))):
+            return 304, etag, b""
+
+        cache = get_shared_cache()
+        key = f"api:{etag}"
+        body = cache.get(key)
+        if body is None:
+            start = time.perf_counter()
+            body = self.body(version, pages, path, query)
+            cache.set(key, body)
+            cache.record_load(key, time.perf_counter() - start)
+        return 200, etag, body
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler of the API. Connections are kept alive, so embeds polling the same resources reuse them.
+    """
+    protocol_version = "HTTP/1.1"
+    api = None  # DashboardAPI shared by every request of the server
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def handle_request(self, send_body: bool):
+        """
+        Sends the response of a GET or HEAD request.
+
+        :param send_body: False for HEAD requests.
+        :return: None
+        """
+        url = urlsplit(self.path)
+        try:
+            status, etag, body = self.api.respond(url.path, url.query, self.headers.get("If-None-Match"))
+        except NotFound as e:
+            status, etag, body = 404, None, json.dumps({"error": f"not found: {e}"}).encode("utf-8")
+        except Exception:  # Keep serving the other resources; the details stay in the server log
+            logger.exception("Request failed: %s", self.path)
+            status, etag, body = 500, None, json.dumps({"error": "internal error"}).encode("utf-8")
+
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # Clients revalidate with If-None-Match
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Access logs only when PIBSE_API_LOG is set; they cost more than a 304
+        if os.environ.get("PIBSE_API_LOG"):
+            super().log_message(format, *args)
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8600, api: DashboardAPI = None):
+    """
+    Creates the API server; every connection is served in its own thread.
+
+    :param host: Interface to bind.
+    :param port: Port to bind (0 picks a free one).
+    :param api: DashboardAPI answering the requests. A new one by default.
+    :return: A ThreadingHTTPServer; call serve_forever() to run it.
+    """
+    from payload import configure_json_engine
+
+    configure_json_engine()  # orjson for every figure served
+    handler = type("Handler", (APIHandler,), {"api": api or DashboardAPI()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard aggregates and figures as JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8600, help="Port to bind")
+    args = parser.parse_args()
+
+    api = DashboardAPI()
+    api.load()  # Load the datasets before accepting requests
+    server = make_server(args.host, args.port, api)
+    print(f"serving on http://{args.host}:{server.server_address[1]}/ (data version {api.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
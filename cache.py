@@ -0,0 +1,471 @@
+import functools
+import io
+import logging
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir():
+    """
+    :return: The default folder of the shared cache: a folder of the current user in the temp directory.
+    """
+    owner = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"pibse-cache-{owner}")
+
+
+def ensure_private(folder: str):
+    """
+    Creates the folder of a cache, readable only by the current user (0700), and refuses a folder that is
+    a symbolic link, belongs to another user or can be written by other users. The pages trust what they
+    read from the cache, so nobody else may be able to plant entries in it.
+
+    :param folder: Cache folder.
+    :return: The folder.
+    :raises PermissionError: If the folder is not private to the current user.
+    """
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"cache folder {folder} is not a directory")
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"cache folder {folder} belongs to another user")
+    if info.st_mode & 0o022:
+        raise PermissionError(f"cache folder {folder} is writable by other users")
+    return folder
+
+
+class CacheBackend:
+    """
+    Base class of the shared cache backends. A backend stores raw bytes under string keys and is shared
+    by every Streamlit process on the host, so the work done by one replica (downloading a dataset,
+    building a figure) warms all the others. Backends must be safe to use from several processes.
+
+    The backend keeps the total size under a byte budget by evicting the least recently used entries, and
+    does not store entries larger than a fraction of the budget, so one oversized value cannot flush
+    everything else. Hits, misses, stores, rejections and evictions are counted per key prefix (the text
+    before the first ":", e.g. "dataset" or "figure"), together with the load time of every key, to size
+    the budget of a deployment (see metrics).
+
+    Subclasses implement `_get`, `_set`, `delete` and `bytes_held`.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, ttl: float = None, max_entry_bytes: int = None):
+        """
+        Initializes the backend limits.
+
+        :param max_bytes: Size bound of the cache. The least recently used entries are evicted past it.
+        :param ttl: Time to live of the entries in seconds. None keeps entries until they are evicted.
+        :param max_entry_bytes: Largest entry stored. Defaults to a quarter of max_bytes.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4
+        self.stats = Counter()  # "<prefix>.<hits|misses|sets|rejected|evictions>" of this process
+        self.load_times = OrderedDict()  # Seconds spent producing each key (most recent 1024 keys)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def prefix(key: str):
+        """
+        :param key: Entry key (e.g., "figure:3f2a...").
+        :return: The kind of the entry (e.g., "figure").
+        """
+        return key.split(":", 1)[0]
+
+    def count(self, key: str, event: str, n: int = 1):
+        """
+        Increases a counter of the key prefix.
+
+        :param key: Entry key.
+        :param event: "hits", "misses", "sets", "rejected" or "evictions".
+        :param n: Increment.
+        :return: None
+        """
+        with self.lock:
+            self.stats[f"{self.prefix(key)}.{event}"] += n
+
+    def record_load(self, key: str, seconds: float):
+        """
+        Records the time spent producing the value of a key (download and parsing, figure build, ...).
+
+        :param key: Entry key.
+        :param seconds: Load time in seconds.
+        :return: None
+        """
+        with self.lock:
+            self.load_times[key] = seconds
+            self.load_times.move_to_end(key)
+            while len(self.load_times) > 1024:
+                self.load_times.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        :param key: Entry key.
+        :return: The stored bytes, or None if the key is missing or expired.
+        """
+        value = self._get(key)
+        self.count(key, "misses" if value is None else "hits")
+        return value
+
+    def set(self, key: str, value: bytes):
+        """
+        Stores an entry, unless it is larger than max_entry_bytes, and evicts past the budget.
+
+        :param key: Entry key.
+        :param value: Bytes to store.
+        :return: None
+        """
+        if len(value) > self.max_entry_bytes:
+            self.count(key, "rejected")
+            return
+        self.count(key, "sets")
+        evicted = self._set(key, value)
+        if evicted:
+            self.count(key, "evictions", evicted)
+
+    def _get(self, key: str):
+        """
+        :param key: Entry key.
+        :return: The stored bytes, or None if the key is missing or expired.
+        """
+        return None
+
+    def _set(self, key: str, value: bytes):
+        """
+        :param key: Entry key.
+        :param value: Bytes to store.
+        :return: The number of entries evicted to fit the budget.
+        """
+        return 0
+
+    def bytes_held(self):
+        """
+        :return: The total size of the stored entries in bytes.
+        """
+        return 0
+
+    def metrics(self):
+        """
+        Cache metrics of this process, with the bytes held by the whole shared cache.
+
+        :return: A dictionary with the budget, the bytes held, the counters per prefix (with the hit rate)
+                 and the load time of every recently produced key.
+        """
+        with self.lock:
+            stats = Counter(self.stats)
+            load_times = dict(self.load_times)
+
+        prefixes = {}
+        for name, n in stats.items():
+            prefix, event = name.rsplit(".", 1)
+            prefixes.setdefault(prefix, Counter())[event] = n
+        for counters in prefixes.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = counters["hits"] / lookups if lookups else None
+
+        return {"max_bytes": self.max_bytes, "bytes_held": self.bytes_held(),
+                "prefixes": {k: dict(v) for k, v in prefixes.items()}, "load_times": load_times}
+
+    def delete(self, key: str):
+        """
+        :param key: Entry key.
+        :return: None
+        """
+        pass
+
+    def get_frame(self, key: str):
+        """
+        Reads a DataFrame stored as Parquet. Parquet is plain data, so reading an entry never runs code
+        (unlike unpickling).
+
+        :param key: Entry key.
+        :return: The DataFrame (with its dtypes, categoricals and `attrs`), or None if the key is missing.
+        """
+        value = self.get(key)
+        if value is None:
+            return None
+        import pandas as pd
+        return pd.read_parquet(io.BytesIO(value), engine="pyarrow")
+
+    def set_frame(self, key: str, df):
+        """
+        Stores a DataFrame as Parquet (pandas keeps the dtypes and `df.attrs` in the file metadata).
+
+        :param key: Entry key.
+        :param df: DataFrame to store.
+        :return: None
+        """
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, engine="pyarrow", index=False)
+        self.set(key, buffer.getvalue())
+
+    def get_figure(self, key: str):
+        """
+        Reads a Plotly figure stored as JSON.
+
+        :param key: Entry key.
+        :return: A Plotly figure, or None if the key is missing.
+        """
+        value = self.get(key)
+        if value is None:
+            return None
+        import plotly.io as pio
+        return pio.from_json(value.decode("utf-8"), skip_invalid=True)
+
+    def set_figure(self, key: str, fig):
+        """
+        Stores a Plotly figure as JSON.
+
+        :param key: Entry key.
+        :param fig: Plotly figure.
+        :return: None
+        """
+        import plotly.io as pio
+        self.set(key, pio.to_json(fig, validate=False).encode("utf-8"))
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Shared cache stored in a single SQLite database. Writes happen inside transactions, so readers in other
+    processes never see partial entries, and WAL mode lets them read while a replica is writing.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 ** 2, ttl: float = None,
+                 max_entry_bytes: int = None):
+        """
+        Opens (and creates if needed) the cache database. Its folder must be private to the current user
+        (see ensure_private), and so must the database file if it exists.
+
+        :param path: Path of the SQLite database file.
+        :param max_bytes: Size bound of the cache.
+        :param ttl: Time to live of the entries in seconds.
+        :param max_entry_bytes: Largest entry stored.
+        """
+        super().__init__(max_bytes, ttl, max_entry_bytes)
+        self.path = path
+        ensure_private(os.path.dirname(os.path.abspath(path)))
+        if os.path.lexists(path):
+            info = os.lstat(path)
+            if stat.S_ISLNK(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+                raise PermissionError(f"cache database {path} belongs to another user")
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS entries ("
+                        "key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, accessed REAL)")
+            con.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connect(self):
+        """
+        :return: A new connection; connections are not shared between threads.
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _get(self, key: str):
+        now = time.time()
+        with self._connect() as con:
+            row = con.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                con.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            con.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _set(self, key: str, value: bytes):
+        now = time.time()
+        evict = []
+        with self._connect() as con:
+            con.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                        (key, sqlite3.Binary(value), len(value), now, now))
+
+            # Evict the least recently used entries until the cache fits in its size bound.
+            total = con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = con.execute("SELECT key, size FROM entries WHERE key != ? ORDER BY accessed",
+                                   (key,)).fetchall()
+                for k, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((k,))
+                    total -= size
+                con.executemany("DELETE FROM entries WHERE key = ?", evict)
+        return len(evict)
+
+    def delete(self, key: str):
+        with self._connect() as con:
+            con.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def bytes_held(self):
+        with self._connect() as con:
+            return con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+class FileCache(CacheBackend):
+    """
+    Shared cache stored as one file per entry in a directory. Entries are written to a temporary file and
+    moved into place with `os.replace`, which is atomic, so readers never see partial entries.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 512 * 1024 ** 2, ttl: float = None,
+                 max_entry_bytes: int = None):
+        """
+        Creates the cache directory if needed; it must be private to the current user (see ensure_private).
+
+        :param folder: Directory holding the entries.
+        :param max_bytes: Size bound of the cache.
+        :param ttl: Time to live of the entries in seconds.
+        :param max_entry_bytes: Largest entry stored.
+        """
+        super().__init__(max_bytes, ttl, max_entry_bytes)
+        self.folder = ensure_private(folder)
+
+    def _path(self, key: str):
+        """
+        :param key: Entry key.
+        :return: Path of the file holding the entry.
+        """
+        import hashlib
+        return os.path.join(self.folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".bin")
+
+    def _get(self, key: str):
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path, (time.time(), os.path.getmtime(path)))  # Access time drives the eviction order
+            return value
+        except FileNotFoundError:
+            return None
+
+    def _set(self, key: str, value: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+        os.replace(tmp, self._path(key))
+
+        # Evict the least recently used entries until the cache fits in its size bound.
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".bin"):
+                try:
+                    info = os.stat(os.path.join(self.folder, name))
+                    entries.append((info.st_atime, info.st_size, name))
+                except FileNotFoundError:
+                    continue  # Removed by another process in the meantime
+        total = sum(e[1] for e in entries)
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if os.path.join(self.folder, name) != self._path(key):
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                    evicted += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        return evicted
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def bytes_held(self):
+        total = 0
+        for name in os.listdir(self.folder):
+            if name.endswith(".bin"):
+                try:
+                    total += os.path.getsize(os.path.join(self.folder, name))
+                except FileNotFoundError:
+                    continue
+        return total
+
+
+_builds = threading.local()  # Build time of the last aggregate built by this thread (see aggregate_cache)
+
+
+def aggregate_cache(kind: str, max_entries: int, resource: bool = False):
+    """
+    Caches an in-process aggregate (reach cube, indexed views, anti-joins, ...) with st.cache_data, or
+    st.cache_resource for shared objects, bounded to `max_entries` versions. Its hits, misses and build
+    times are counted under `kind` in the metrics of the shared cache, next to the datasets and figures.
+    The aggregates are objects (or frames derived from one) rebuilt in milliseconds from the cached
+    datasets, so they stay in the process instead of being serialized to the shared backend.
+
+    :param kind: Prefix of the counters (e.g., "cube").
+    :param max_entries: Number of entries kept; the oldest ones are dropped past it.
+    :param resource: Use st.cache_resource (one shared object, not copied on every hit).
+    :return: A decorator.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def build(*args, **kwargs):
+            start = time.perf_counter()
+            value = fn(*args, **kwargs)
+            _builds.seconds = time.perf_counter() - start
+            return value
+
+        cached = (st.cache_resource if resource else st.cache_data)(max_entries=max_entries)(build)
+
+        @functools.wraps(fn)
+        def lookup(*args, **kwargs):
+            _builds.seconds = None
+            value = cached(*args, **kwargs)
+            # The build runs in the calling thread, so a build time means that this call missed the cache
+            key, seconds = f"{kind}:{fn.__name__}", _builds.seconds
+            cache = get_shared_cache()
+            cache.count(key, "hits" if seconds is None else "misses")
+            if seconds is not None:
+                cache.record_load(key, seconds)
+            return value
+
+        lookup.clear = cached.clear
+        return lookup
+    return decorate
+
+
+@st.cache_resource
+def get_shared_cache():
+    """
+    Returns the shared cache backend of this process, configured with environment variables:
+
+        PIBSE_CACHE_URL: "sqlite:///path/to/cache.db" (default, in a private folder of the current user in
+                         the temp directory, see default_cache_dir), "file:///path/to/folder" or "none" to
+                         disable the shared cache. Folders must be private to the current user; otherwise
+                         the shared cache is disabled.
+        PIBSE_CACHE_MAX_MB: Size bound in megabytes (default 512).
+        PIBSE_CACHE_MAX_ENTRY_MB: Largest entry stored, in megabytes (default a quarter of the bound).
+        PIBSE_CACHE_TTL: Time to live of the entries in seconds (default 3600).
+
+    :return: A CacheBackend instance.
+    """
+    url = os.environ.get("PIBSE_CACHE_URL", "sqlite:///" + os.path.join(default_cache_dir(), "cache.sqlite"))
+    max_bytes = int(float(os.environ.get("PIBSE_CACHE_MAX_MB", 512)) * 1024 ** 2)
+    max_entry = os.environ.get("PIBSE_CACHE_MAX_ENTRY_MB")
+    max_entry_bytes = int(float(max_entry) * 1024 ** 2) if max_entry else None
+    ttl = float(os.environ.get("PIBSE_CACHE_TTL", 3600))
+
+    try:
+        if url.startswith("sqlite:///"):
+            return SQLiteCache(url[len("sqlite:///"):], max_bytes=max_bytes, ttl=ttl,
+                               max_entry_bytes=max_entry_bytes)
+        if url.startswith("file:///"):
+            return FileCache(url[len("file:///"):], max_bytes=max_bytes, ttl=ttl, max_entry_bytes=max_entry_bytes)
+    except PermissionError as e:
+        logger.warning("Shared cache disabled: %s", e)
+    return CacheBackend(max_bytes=max_bytes, ttl=ttl, max_entry_bytes=max_entry_bytes)  # "none" or a refused folder: stores nothing
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import defaultdict
+
+import streamlit as st
+
+
+class DriveChangeFeed:
+    """
+    This class follows the Google Drive changes feed. It keeps a changes page token and, on every poll,
+    asks a single changes endpoint which files changed since the previous poll. The changed file IDs are
+    mapped back to dataset labels, whose generation counter is increased so that only those datasets are
+    invalidated and read again.
+    """
+
+    def __init__(self, api_url: str, interval: float = 60):
+        """
+        Initializes the feed. The page token is requested on the first poll.
+
+        :param api_url: Base URL of the Drive API (e.g., "https://www.googleapis.com/drive/v3").
+        :param interval: Minimum number of seconds between two polls.
+        """
+        self.api_url = api_url.rstrip("/")
+        self.interval = interval
+        self.page_token = None
+        self.last_poll = 0.0
+        self.generations = defaultdict(int)  # Generation counter per dataset label
+        self.lock = threading.Lock()  # One poll at a time per process
+
+    def _get(self, path: str, headers: dict, **params):
+        """
+        Sends a GET request to the changes API.
+
+        :param path: Path relative to the API URL (e.g., "changes/startPageToken").
+        :param headers: Request headers (authorization).
+        :param params: Query parameters.
+        :return: The decoded JSON response.
+        """
+        import requests
+
+        rqst = requests.get(f"{self.api_url}/{path}", headers=headers, params=params, timeout=30)
+        rqst.raise_for_status()
+        return rqst.json()
+
+    def poll(self, file_ids: dict, headers: dict, force: bool = False):
+        """
+        Polls the changes feed, at most once per interval.
+
+        :param file_ids: Dictionary {Drive file ID: dataset label} of the followed files.
+        :param headers: Request headers (authorization).
+        :param force: Poll even if the interval has not elapsed.
+        :return: The list of dataset labels whose files changed since the previous poll.
+        """
+        with self.lock:
+            if not force and time.time() - self.last_poll < self.interval:
+                return []
+            self.last_poll = time.time()
+
+            # The first poll only stores the current position of the feed.
+            if self.page_token is None:
+                params = {"supportsAllDrives": "true"}
+                self.page_token = self._get("changes/startPageToken", headers, **params)["startPageToken"]
+                return []
+
+            changed = []
+            token = self.page_token
+            while token is not None:
+                page = self._get("changes", headers, pageToken=token, spaces="drive", pageSize=1000,
+                                 includeItemsFromAllDrives="true", supportsAllDrives="true",
+                                 fields="nextPageToken,newStartPageToken,changes(fileId)")
+                for change in page.get("changes", []):
+                    k = file_ids.get(change.get("fileId"))
+                    if k is not None and k not in changed:
+                        changed.append(k)
+
+                # "nextPageToken" means more pages; "newStartPageToken" marks the end of the feed.
+                token = page.get("nextPageToken")
+                if token is None:
+                    self.page_token = page.get("newStartPageToken", self.page_token)
+
+            for k in changed:
+                self.generations[k] += 1
+            return changed
+
+
+@st.cache_resource
+def get_change_feed(api_url: str, interval: float):
+    """
+    Returns the change feed of this process, shared by all sessions.
+
+    :param api_url: Base URL of the Drive API.
+    :param interval: Minimum number of seconds between two polls.
+    :return: A DriveChangeFeed instance.
+    """
+    return DriveChangeFeed(api_url, interval)
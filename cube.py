@@ -0,0 +1,207 @@
+from cache import aggregate_cache
+
+
+class ReachCube:
+    """
+    This class precomputes a cube over the dimensions of the 'alcance' dataset (state, municipality
+    priority, program component, implementation, verified school and beneficiary type). Every cell of
+    the cube holds mergeable measures: the sorted distinct codes of the counted columns (e.g., 'Email')
+    and the sums of the numeric columns. Filtered aggregates are answered by merging the matching cells
+    instead of scanning the raw frame, so any combination of filters is cheap.
+    """
+    # Dimensions of the cube, in the order used to build the cells
+    dimensions = ["Entidad", "Prioridad", "Tipo", "Implementación", "Escuela verificada", "Ben_directo"]
+    # Columns with a distinct-count measure
+    distinct = ["Email", "Centro de trabajo"]
+
+    def __init__(self, df):
+        """
+        Builds the cells of the cube.
+
+        :param df: The 'alcance' DataFrame.
+        """
+        import numpy as np
+        import pandas as pd
+
+        df = df.copy()
+        # Derived dimension: the row belongs to a verified school
+        df["Escuela verificada"] = (df["Centro de trabajo verificado"].fillna(False).astype(bool) &
+                                    (df["Tipo_cct"] == "Escuela"))
+
+        # Encode the counted columns as integer codes (-1 for missing values).
+        codes = {c: pd.factorize(df[c])[0] for c in self.distinct}
+
+        # One group of rows per cell; missing dimension values are kept as their own cells.
+        groups = df.groupby(self.dimensions, dropna=False, sort=False, observed=True).indices
+
+        ben_directo = pd.to_numeric(df["Ben_directo"], errors="coerce").to_numpy(dtype=float)
+
+        cells, self.codes = [], {c: [] for c in self.distinct}
+        for key, rows in groups.items():
+            cells.append(key)
+            for c in self.distinct:
+                cell_codes = np.unique(codes[c][rows])
+                self.codes[c].append(cell_codes[cell_codes >= 0])
+
+        # Small frame with one row per cell: dimension values, row count and numeric sums.
+        self.cells = pd.DataFrame(cells, columns=self.dimensions)
+        self.cells["rows"] = [len(rows) for rows in groups.values()]
+        self.cells["Ben_directo_sum"] = [np.nansum(ben_directo[rows]) for rows in groups.values()]
+
+    def values(self, dimension: str):
+        """
+        :param dimension: Name of a dimension (e.g., 'Entidad').
+        :return: The sorted list of values of the dimension present in the cube (missing values excluded).
+        """
+        return sorted(self.cells[dimension].dropna().unique().tolist())
+
+    def select(self, filters: dict = None):
+        """
+        Selects the cells matching a set of filters.
+
+        :param filters: Dictionary {dimension: condition}. A condition is a list of accepted values, a single
+                        value, or a function that receives the dimension column of the cells and returns a
+                        boolean mask (e.g., lambda s: s.str.contains("Educadores")). Empty lists are ignored.
+        :return: The boolean mask of the selected cells.
+        """
+        mask = self.cells["rows"] > 0
+        for dimension, condition in (filters or {}).items():
+            column = self.cells[dimension]
+            if callable(condition):
+                mask &= condition(column).fillna(False).astype(bool)
+            elif isinstance(condition, (list, tuple, set)):
+                if len(condition) > 0:
+                    mask &= column.isin(condition)
+            else:
+                mask &= column == condition
+        return mask
+
+    def query(self, by: list, filters: dict = None, **measures):
+        """
+        Aggregates the selected cells, with the same named-aggregation style as pandas `agg`.
+
+        :param by: Dimensions to group by (e.g., ["Entidad", "Prioridad"]).
+        :param filters: Filters of the cells (see select).
+        :param measures: Named measures, e.g. Email=("Email", "nunique") or Conteo=("Ben_directo", "sum").
+                         Supported functions are "nunique" (distinct columns), "sum" ('Ben_directo') and
+                         "count" (rows).
+        :return: A DataFrame with one row per group and one column per measure.
+        """
+        import numpy as np
+        import pandas as pd
+
+        cells = self.cells[self.select(filters)]
+        result = []
+        for key, group in cells.groupby(by, sort=True, observed=True):
+            row = dict(zip(by, key if isinstance(key, tuple) else (key,)))
+            for name, (column, func) in measures.items():
+                if func == "nunique":
+                    # Merge the distinct codes of the cells of the group.
+                    parts = [self.codes[column][i] for i in group.index]
+                    row[name] = len(np.unique(np.concatenate(parts))) if parts else 0
+                elif func == "sum":
+                    total = group[f"{column}_sum"].sum()
+                    row[name] = int(total) if float(total).is_integer() else total
+                elif func == "count":
+                    row[name] = group["rows"].sum()
+                else:
+                    raise ValueError(f"Unsupported measure function: {func}")
+            result.append(row)
+        return pd.DataFrame(result, columns=by + list(measures))
+
+
+@aggregate_cache("cube", max_entries=2, resource=True)
+def get_reach_cube(_df, version: str):
+    """
+    Returns the ReachCube of the 'alcance' dataset, built once per data version and shared by all sessions.
+
+    :param _df: The 'alcance' DataFrame (not hashed by Streamlit).
+    :param version: Fingerprint of the dataset, used as the cache key.
+    :return: A ReachCube instance.
+    """
+    return ReachCube(_df)
+
+
+def municipality_pairs(df):
+    """
+    :param df: DataFrame with the columns 'Entidad' and 'Municipio'.
+    :return: A MultiIndex of (state, municipality) pairs, as plain strings so categoricals with different
+             categories in each dataset compare by value.
+    """
+    import pandas as pd
+
+    return pd.MultiIndex.from_arrays([df["Entidad"].astype(str), df["Municipio"].astype(str)])
+
+
+def unreached_municipalities(municipios, alcance, priority: str = "Kellogg's Priority"):
+    """
+    Lists the priority municipalities of the catalog that do not appear in the reach data, with a hash
+    anti-join on (state, municipality): the reached pairs are indexed once and every catalog row is looked
+    up in that index, so the cost grows linearly with the catalog and the reach data.
+
+    :param municipios: The 'municipios' catalog (Entidad, Municipio, Prioridad).
+    :param alcance: The 'alcance' dataset (Entidad, Municipio).
+    :param priority: Priority of the municipalities that should be reached.
+    :return: A DataFrame with the columns 'Entidad' and 'Not Reached' (the municipality name), in catalog order.
+    """
+    import pandas as pd
+
+    catalog = municipios[municipios["Prioridad"] == priority]
+    reached = municipality_pairs(alcance[["Entidad", "Municipio"]].drop_duplicates())
+    missing = ~municipality_pairs(catalog).isin(reached)
+
+    return pd.DataFrame({
+        "Entidad": catalog["Entidad"].astype(str).to_numpy()[missing],
+        "Not Reached": catalog["Municipio"].astype(str).to_numpy()[missing]
+    })
+
+
+@aggregate_cache("unreached", max_entries=4)
+def get_unreached_municipalities(_municipios, _alcance, version: str):
+    """
+    Cached anti-join of the catalog against the reach data (see unreached_municipalities).
+
+    :param _municipios: The 'municipios' catalog (not hashed by Streamlit).
+    :param _alcance: The 'alcance' dataset (not hashed by Streamlit).
+    :param version: Fingerprint of both datasets, used as the cache key.
+    :return: A DataFrame with the columns 'Entidad' and 'Not Reached', versioned after both datasets.
+    """
+    df = unreached_municipalities(_municipios, _alcance)
+    df.attrs["version"] = f"{version}:unreached"
+    return df
+
+
+def municipality_status(municipios, alcance):
+    """
+    Marks every municipality of the catalog as reached or not, with the same hash lookup as
+    unreached_municipalities.
+
+    :param municipios: The 'municipios' catalog (Entidad, Municipio, Prioridad).
+    :param alcance: The 'alcance' dataset (Entidad, Municipio).
+    :return: A DataFrame with the columns 'Entidad', 'Municipio', 'Prioridad' and 'Status' ("Reached" or
+             "Not Reached"), one row per municipality of the catalog.
+    """
+    import numpy as np
+
+    catalog = municipios[["Entidad", "Municipio", "Prioridad"]].astype(str)
+    catalog = catalog.drop_duplicates(["Entidad", "Municipio"]).reset_index(drop=True)
+    catalog.attrs = {}  # Not the catalog: the version of 'municipios' must not carry over
+    reached = municipality_pairs(alcance[["Entidad", "Municipio"]].drop_duplicates())
+
+    return catalog.assign(Status=np.where(municipality_pairs(catalog).isin(reached), "Reached", "Not Reached"))
+
+
+@aggregate_cache("status", max_entries=4)
+def get_municipality_status(_municipios, _alcance, version: str):
+    """
+    Cached reach status of the municipalities of the catalog (see municipality_status).
+
+    :param _municipios: The 'municipios' catalog (not hashed by Streamlit).
+    :param _alcance: The 'alcance' dataset (not hashed by Streamlit).
+    :param version: Fingerprint of both datasets, used as the cache key.
+    :return: A DataFrame with the columns 'Entidad', 'Municipio', 'Prioridad' and 'Status', versioned after
+             both datasets.
+    """
+    df = municipality_status(_municipios, _alcance)
+    df.attrs["version"] = f"{version}:status"
+    return df
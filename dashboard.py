@@ -69,3 +69,83 @@ class CreateDashboard:
         """
         pass
 
+    @staticmethod
+    def collect(stream, keys: list):
+        """
+        Reads a dataset stream (see ProcessData.iter_data) until the given datasets arrived. The stream
+        is left open, so the remaining datasets can be consumed later (see render_charts).
+
+        Args:
+            stream (generator): Generator of (key, DataFrame) pairs.
+            keys (list): Datasets to wait for (e.g., those the sidebar needs).
+
+        Returns:
+            dict: The datasets received so far.
+        """
+        data = {}
+        for k, df in stream:
+            data[k] = df
+            if all(x in data for x in keys):
+                break
+        return data
+
+    @staticmethod
+    def is_ready(data: dict):
+        """
+        Checks that every frame a chart is built from has arrived; frames still loading are None.
+
+        Args:
+            data (dict): Chart configuration of `graph_options`.
+
+        Returns:
+            bool: True when the chart can be drawn.
+        """
+        if "df" in data:
+            return data["df"] is not None
+        if "data" in data:
+            return all(df is not None for df in data["data"].values())
+        return True
+
+    def draw_chart(self, data: dict):
+        """
+        Draws one chart of `graph_options`. This function is a placeholder; dashboards override it.
+
+        Args:
+            data (dict): Chart configuration.
+        """
+        pass
+
+    def render_charts(self, stream=None):
+        """
+        Draws the charts of the selected option (self.option) in page order. A placeholder is laid out
+        for every chart first; each chart is drawn as soon as the datasets it is built from have arrived,
+        while the datasets of the other charts are still loading.
+
+        Args:
+            stream (generator): Remaining (key, DataFrame) pairs of ProcessData.iter_data, or None when
+                                self.df already holds every dataset.
+        """
+        names = list(self.graph_options[self.option])
+        slots = {}
+        for k in names:
+            slots[k] = st.empty()
+            slots[k].caption("Loading data...")
+        pending = list(names)
+
+        def draw_ready():
+            # Draw every pending chart whose inputs are ready, into its own placeholder
+            for k in list(pending):
+                data = self.graph_options[self.option][k]
+                if self.is_ready(data):
+                    pending.remove(k)
+                    with slots[k].container():
+                        self.draw_chart(data)
+
+        draw_ready()
+        for key, df in (stream or ()):
+            if not pending:
+                break  # The datasets still loading are not used by the selected option
+            self.df[key] = df
+            self.set_graph_options()  # Rebuild the configurations with the new dataset
+            draw_ready()
+
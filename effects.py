@@ -0,0 +1,464 @@
+import hashlib
+import math
+import os
+
+import streamlit as st
+
+# Significance labels, from the strictest threshold (as in the "*p<0.05, **p<0.01, *** p<0.001" note)
+SIGNIFICANCE = [(0.001, "***"), (0.01, "**"), (0.05, "*")]
+
+# Columns of the frames consumed by `create_barchart` and `create_forest_plot`
+EFFECT_COLUMNS = ["Constructo", "Medición", "Medición inglés", "Medición inglés_sig", "D-cohen", "conf.low",
+                  "conf.high", "Significancia", "Comportamiento"]
+GROUP_COLUMNS = ["Subanálisis", "Pre", "Post"]
+
+
+def bootstrap_intervals(samples: list, seeds: list, resamples: int = 2000, confidence: float = 0.95,
+                        max_values: int = 2_000_000):
+    """
+    Percentile bootstrap intervals of the paired Cohen's d of several difference vectors. Resamples are drawn in
+    batches (one index matrix per batch) so each batch is a handful of NumPy operations; the batch size keeps the
+    resampled matrix under `max_values` values.
+
+    This is a module-level function so that worker processes can run it (see EffectSizes.bootstrap).
+
+    :param samples: List of 1-D arrays of post - pre differences (one per scale and group, without NaN).
+    :param seeds: List of numpy SeedSequence, one per sample, so results do not depend on how samples are split
+                  across processes.
+    :param resamples: Number of bootstrap resamples per sample.
+    :param confidence: Level of the intervals.
+    :param max_values: Maximum number of values of a resampled batch.
+    :return: A list of (low, high) tuples.
+    """
+    import numpy as np
+
+    alpha = (1 - confidence) / 2
+    intervals = []
+    for diffs, seed in zip(samples, seeds):
+        n = len(diffs)
+        if n < 2:
+            intervals.append((np.nan, np.nan))
+            continue
+
+        rng = np.random.default_rng(seed)
+        d = np.empty(resamples)
+        step = max(1, max_values // n)
+        for start in range(0, resamples, step):
+            size = min(step, resamples - start)
+            sample = diffs[rng.integers(0, n, size=(size, n))]  # (size × n) resampled differences
+            with np.errstate(invalid="ignore", divide="ignore"):
+                d[start:start + size] = sample.mean(axis=1) / sample.std(axis=1, ddof=1)
+
+        # Resamples with no variance give an undefined d and are left out of the percentiles
+        d = d[np.isfinite(d)]
+        intervals.append(tuple(np.quantile(d, [alpha, 1 - alpha])) if len(d) else (np.nan, np.nan))
+    return intervals
+
+
+class EffectSizes:
+    """
+    This class computes the paired effect sizes of the psychometric sheets from item-level responses, for every
+    scale, subgroup and measurement window in batch.
+
+    Responses hold one row per participant and application (wave), an ID column, a wave column and one column
+    per item. The item catalog holds one row per item with the columns:
+
+        Ítem             Column of the item in the responses
+        Constructo       Construct of the scale (e.g., "Malestar psicológico")
+        Medición         Scale name (e.g., "Depresión")
+        Medición inglés  English scale name
+        Inverso          True for reverse-scored items (optional, default False)
+        Mínimo, Máximo   Range of the answer scale, used to reverse items (optional, default 1 and 5)
+        Sentido          Expected direction of the change: 1 (increase) or -1 (decrease) (optional, default 1)
+
+    Scale scores are the mean of the answered items. Effect sizes are paired Cohen's d (d_z: mean of the
+    post - pre differences over their standard deviation), with normal-approximation confidence intervals and
+    the p-value of the paired t-test.
+
+    The Drive datasets only hold the computed "Psicométricos" sheets. The sheets are produced with
+    tools/effect_sizes.py; when the responses behind a sheet are also available (PIBSE_RESPONSES_DIR, see
+    apply_bootstrap), the Outcomes forest plots take their intervals from a bootstrap over them.
+    """
+
+    def __init__(self, responses, items, id_column: str = "ID", wave_column: str = "Aplicación"):
+        """
+        Scores every scale of every response row once; the scores are reused by every subgroup and window.
+
+        :param responses: DataFrame of item-level responses (one row per participant and wave).
+        :param items: DataFrame with the item catalog (see the class description).
+        :param id_column: Column identifying the participant, used to pair the waves.
+        :param wave_column: Column with the application of each row (e.g., "inicial", "final").
+        """
+        import numpy as np
+        import pandas as pd
+
+        self.responses = responses
+        self.id_column = id_column
+        self.wave_column = wave_column
+
+        # Only the catalog items present in the responses are scored
+        items = items[items["Ítem"].isin(responses.columns)].reset_index(drop=True)
+        self.scales = items.drop_duplicates(["Constructo", "Medición"])[
+            ["Constructo", "Medición", "Medición inglés"]].reset_index(drop=True)
+        scale_index = pd.MultiIndex.from_frame(self.scales[["Constructo", "Medición"]]).get_indexer(
+            pd.MultiIndex.from_frame(items[["Constructo", "Medición"]]))
+
+        # Expected direction per scale (first item of the scale decides)
+        if "Sentido" in items.columns:
+            direction = items.groupby(scale_index)["Sentido"].first().fillna(1)
+            self.direction = np.sign(direction.sort_index().to_numpy(dtype=float))
+        else:
+            self.direction = np.ones(len(self.scales))
+
+        # Item matrix (rows × items); text answers and blanks become NaN
+        X = responses[items["Ítem"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+        # Reverse-scored items: x -> min + max - x
+        reverse = items.get("Inverso", pd.Series(False, index=items.index)).fillna(False).astype(bool).to_numpy()
+        if reverse.any():
+            low = items.get("Mínimo", pd.Series(1, index=items.index)).to_numpy(dtype=float)
+            high = items.get("Máximo", pd.Series(5, index=items.index)).to_numpy(dtype=float)
+            X[:, reverse] = (low + high)[reverse] - X[:, reverse]
+
+        # Scale scores with one matrix product: sums and answered counts of the items of each scale
+        membership = np.zeros((len(items), len(self.scales)))
+        membership[np.arange(len(items)), scale_index] = 1
+        answered = ~np.isnan(X)
+        sums = np.where(answered, X, 0) @ membership
+        counts = answered @ membership
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.scores = np.where(counts > 0, sums / counts, np.nan)
+
+    def differences(self, pre: str, post: str, mask=None):
+        """
+        Pairs the pre and post rows of every participant and returns the score changes.
+
+        :param pre: Wave of the pre measurement (e.g., "inicial").
+        :param post: Wave of the post measurement (e.g., "final").
+        :param mask: Boolean array over the response rows selecting a subgroup. None keeps every row.
+        :return: An array (pairs × scales) of post - pre score differences.
+        """
+        import numpy as np
+        import pandas as pd
+
+        waves = self.responses[self.wave_column].to_numpy()
+        ids = self.responses[self.id_column].to_numpy()
+        selected = np.ones(len(waves), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+
+        pre_rows = np.flatnonzero((waves == pre) & selected)
+        post_rows = np.flatnonzero((waves == post) & selected)
+
+        # Row of the pre measurement of every participant (the last one if it was repeated)
+        pre_lookup = pd.Series(pre_rows, index=ids[pre_rows])
+        pre_lookup = pre_lookup[~pre_lookup.index.duplicated(keep="last")]
+        position = pre_lookup.index.get_indexer(ids[post_rows])
+        paired = position >= 0
+
+        return self.scores[post_rows[paired]] - self.scores[pre_lookup.to_numpy()[position[paired]]]
+
+    @staticmethod
+    def betainc(a, b, x, iterations: int = 200):
+        """
+        Regularized incomplete beta function I_x(a, b), evaluated element-wise with the continued fraction of
+        Numerical Recipes (modified Lentz's method). Used for the t distribution without requiring SciPy.
+
+        :param a: First shape parameter (array-like, > 0).
+        :param b: Second shape parameter (array-like, > 0).
+        :param x: Point in [0, 1] (array-like).
+        :param iterations: Number of terms of the continued fraction.
+        :return: An array with I_x(a, b).
+        """
+        import numpy as np
+
+        a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+        # The fraction converges fast for x < (a + 1) / (a + b + 2); use I_x(a, b) = 1 - I_{1-x}(b, a) otherwise
+        swap = x > (a + 1) / (a + b + 2)
+        a, b, x = np.where(swap, b, a), np.where(swap, a, b), np.where(swap, 1 - x, x)
+
+        tiny = 1e-300
+        qab, qap, qam = a + b, a + 1, a - 1
+        c = np.ones_like(x)
+        d = 1 - qab * x / qap
+        d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+        h = d.copy()
+        for m in range(1, iterations + 1):
+            m2 = 2 * m
+            for aa in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                       -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+                d = 1 + aa * d
+                d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+                c = 1 + aa / c
+                c = np.where(np.abs(c) < tiny, tiny, c)
+                h = h * d * c
+
+        lgamma = np.vectorize(math.lgamma, otypes=[float])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            front = np.exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * np.log(x) + b * np.log1p(-x)) / a
+        result = np.where(x <= 0, 0.0, front * h)
+        return np.where(swap, 1 - result, result)
+
+    @classmethod
+    def paired_stats(cls, diffs, confidence: float = 0.95):
+        """
+        Paired statistics of every column of a difference matrix, ignoring missing scores.
+
+        :param diffs: Array (pairs × scales) of post - pre differences.
+        :param confidence: Level of the confidence intervals.
+        :return: A dictionary of arrays (one value per scale): n, d, low, high and p.
+        """
+        import numpy as np
+        from statistics import NormalDist
+
+        valid = ~np.isnan(diffs)
+        n = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, diffs, 0).sum(axis=0) / n
+            variance = np.where(valid, (diffs - mean) ** 2, 0).sum(axis=0) / (n - 1)
+            d = mean / np.sqrt(variance)
+
+            # Paired t-test: t = d * sqrt(n), two-sided p = I_{df / (df + t²)}(df / 2, 1 / 2)
+            df = np.where(n > 1, n - 1, np.nan)  # No test with fewer than two pairs
+            t = d * np.sqrt(n)
+            p = cls.betainc(df / 2, 0.5, df / (df + t ** 2))
+
+            # Normal-approximation standard error of d_z
+            z = NormalDist().inv_cdf((1 + confidence) / 2)
+            se = np.sqrt(1 / n + d ** 2 / (2 * n))
+        return {"n": n, "d": d, "low": d - z * se, "high": d + z * se, "p": p}
+
+    @staticmethod
+    def bootstrap(samples: list, resamples: int = 2000, confidence: float = 0.95, seed: int = 0,
+                  workers: int = None):
+        """
+        Bootstrap intervals of many difference vectors, spread across a process pool. Every sample gets its own
+        child of one SeedSequence, so the intervals are reproducible and the same for any number of workers.
+
+        :param samples: List of 1-D arrays of post - pre differences.
+        :param resamples: Number of bootstrap resamples per sample.
+        :param confidence: Level of the intervals.
+        :param seed: Root seed.
+        :param workers: Number of worker processes. None uses PIBSE_BOOTSTRAP_WORKERS, or the CPU count up to 4;
+                        1 runs in this process.
+        :return: A list of (low, high) tuples, in the order of the samples.
+        """
+        import os
+        import numpy as np
+
+        seeds = np.random.SeedSequence(seed).spawn(len(samples))
+        if workers is None:
+            workers = int(os.environ.get("PIBSE_BOOTSTRAP_WORKERS", min(4, os.cpu_count() or 1)))
+        workers = min(workers, len(samples))
+        if workers <= 1:
+            return bootstrap_intervals(samples, seeds, resamples, confidence)
+
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # A few contiguous chunks per worker balance scales of different sizes
+        chunks = min(len(samples), workers * 4)
+        bounds = np.linspace(0, len(samples), chunks + 1).astype(int)
+        # Spawned workers: forking the threaded Streamlit server can copy locks held by other threads and hang
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(bootstrap_intervals, samples[a:b], seeds[a:b], resamples, confidence)
+                       for a, b in zip(bounds[:-1], bounds[1:])]
+            return [interval for future in futures for interval in future.result()]
+
+    @staticmethod
+    def significance(p):
+        """
+        :param p: Array of p-values.
+        :return: An array with the significance labels ("", "*", "**" or "***").
+        """
+        import numpy as np
+
+        labels = np.full(len(p), "", dtype=object)
+        for threshold, label in reversed(SIGNIFICANCE):
+            labels[p < threshold] = label
+        return labels
+
+    def compute(self, subgroups: dict = None, windows: list = (("inicial", "final"),), confidence: float = 0.95,
+                min_pairs: int = 2, keep_groups: bool = None, intervals: str = "normal", resamples: int = 2000,
+                seed: int = 0, workers: int = None):
+        """
+        Computes the effect sizes of every scale for every subgroup and measurement window.
+
+        :param subgroups: Dictionary {label: filters}, where filters is a dictionary {column: condition} over the
+                          responses; a condition is a list of accepted values or a single value (as in
+                          `ReachCube.select`). None computes a single "Todos-as" group.
+        :param windows: List of (pre, post) wave pairs.
+        :param confidence: Level of the confidence intervals.
+        :param min_pairs: Scales with fewer paired participants are left out.
+        :param keep_groups: Keep the Subanálisis, Pre and Post columns. By default they are kept when there is
+                            more than one subgroup or window, as in "Psicométricos FINALES con items inversos".
+        :param intervals: "normal" for normal-approximation intervals, or "bootstrap" for percentile bootstrap
+                          intervals (better suited to small subgroups).
+        :param resamples: Number of bootstrap resamples per scale and group.
+        :param seed: Root seed of the bootstrap.
+        :param workers: Number of bootstrap worker processes (see bootstrap).
+        :return: A DataFrame with the columns of the psychometric sheets.
+        """
+        import numpy as np
+        import pandas as pd
+
+        subgroups = subgroups or {"Todos-as": {}}
+        frames = []
+        samples = []  # Difference vectors of the output rows, in order, for the bootstrap
+        for label, filters in subgroups.items():
+            mask = np.ones(len(self.responses), dtype=bool)
+            for column, condition in filters.items():
+                values = self.responses[column]
+                if isinstance(condition, (list, tuple, set)):
+                    mask &= values.isin(condition).to_numpy()
+                else:
+                    mask &= (values == condition).to_numpy()
+
+            for pre, post in windows:
+                diffs = self.differences(pre, post, mask)
+                stats = self.paired_stats(diffs, confidence)
+                keep = stats["n"] >= min_pairs
+                if not keep.any():
+                    continue
+                if intervals == "bootstrap":
+                    samples.extend(diffs[~np.isnan(diffs[:, j]), j] for j in np.flatnonzero(keep))
+
+                significant = stats["p"][keep] < SIGNIFICANCE[-1][0]
+                expected = np.sign(stats["d"][keep]) * self.direction[keep] >= 0
+                behaviour = (np.where(significant, "Significativo", "No significativo").astype(object) +
+                             np.where(expected, "/sentido esperado", "/sentido contrario"))
+                # No direction without a d (zero variance or fewer than two pairs): no label
+                behaviour[np.isnan(stats["d"][keep])] = ""
+                signif = self.significance(stats["p"][keep])
+                scales = self.scales[keep]
+                frames.append(pd.DataFrame({
+                    "Constructo": scales["Constructo"].to_numpy(),
+                    "Medición": scales["Medición"].to_numpy(),
+                    "Medición inglés": scales["Medición inglés"].to_numpy(),
+                    "Medición inglés_sig": scales["Medición inglés"].to_numpy().astype(object) + signif,
+                    "D-cohen": stats["d"][keep],
+                    "conf.low": stats["low"][keep],
+                    "conf.high": stats["high"][keep],
+                    "Significancia": signif,
+                    "Comportamiento": behaviour,
+                    "Subanálisis": label,
+                    "Pre": pre,
+                    "Post": post
+                }))
+
+        if keep_groups is None:
+            keep_groups = len(subgroups) > 1 or len(windows) > 1
+        columns = EFFECT_COLUMNS + (GROUP_COLUMNS if keep_groups else [])
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        results = pd.concat(frames, ignore_index=True)[columns]
+
+        # Every scale of every group is resampled in one parallel batch
+        if intervals == "bootstrap":
+            bounds = np.array(self.bootstrap(samples, resamples, confidence, seed, workers), dtype=float)
+            results["conf.low"], results["conf.high"] = bounds[:, 0], bounds[:, 1]
+        elif intervals != "normal":
+            raise ValueError(f"Unsupported interval method: {intervals}")
+        return results
+
+
+@st.cache_data(max_entries=16)
+def compute_effect_sizes(_responses, _items, version: str, subgroups: dict = None,
+                         windows: tuple = (("inicial", "final"),), confidence: float = 0.95,
+                         intervals: str = "normal", resamples: int = 2000, seed: int = 0, keep_groups: bool = None):
+    """
+    Cached effect sizes of a response set (see EffectSizes.compute). The frames are not hashed; the cache key is
+    the data version and the analysis settings, so bootstrap intervals are resampled once per data version.
+
+    :param _responses: DataFrame of item-level responses (not hashed by Streamlit).
+    :param _items: DataFrame with the item catalog (not hashed by Streamlit).
+    :param version: Data version of the responses and catalog (see `ProcessData.data_version`).
+    :param subgroups: Dictionary {label: filters} of subgroups.
+    :param windows: Tuple of (pre, post) wave pairs.
+    :param confidence: Level of the confidence intervals.
+    :param intervals: "normal" or "bootstrap".
+    :param resamples: Number of bootstrap resamples per scale and group.
+    :param seed: Root seed of the bootstrap.
+    :param keep_groups: Keep the Subanálisis, Pre and Post columns (see EffectSizes.compute).
+    :return: A DataFrame with the columns of the psychometric sheets.
+    """
+    return EffectSizes(_responses, _items).compute(subgroups, list(windows), confidence, keep_groups=keep_groups,
+                                                   intervals=intervals, resamples=resamples, seed=seed)
+
+
+@st.cache_data(max_entries=8)
+def read_responses(path: str, mtime: float):
+    """
+    Reads a workbook of item-level responses, once per modification time. Sheets:
+
+        Respuestas    One row per participant and wave (see EffectSizes)
+        Ítems         Item catalog (see EffectSizes)
+        Subanálisis   Optional filters of the subgroups: one row per condition, with the columns Subanálisis,
+                      Columna and Valor (rows of the same subgroup and column accept any of their values)
+
+    :param path: Path of the workbook.
+    :param mtime: Modification time of the file, part of the cache key.
+    :return: A tuple (responses, items, subgroups); subgroups is None without the "Subanálisis" sheet.
+    """
+    import io
+    import pandas as pd
+
+    with open(path, "rb") as f:
+        content = f.read()
+    sheets = pd.read_excel(io.BytesIO(content), sheet_name=None, engine="openpyxl")
+    responses, items = sheets["Respuestas"], sheets["Ítems"]
+    # The version of the file, so compute_effect_sizes is keyed on it without hashing the frames
+    version = hashlib.sha1(content).hexdigest()
+    responses.attrs["version"], items.attrs["version"] = version, version
+
+    subgroups = None
+    if "Subanálisis" in sheets:
+        subgroups = {}
+        for row in sheets["Subanálisis"].itertuples(index=False):
+            label, column, value = row[:3]
+            subgroups.setdefault(label, {}).setdefault(column, []).append(value)
+    return responses, items, subgroups
+
+
+def apply_bootstrap(k: str, df):
+    """
+    Replaces the conf.low and conf.high columns of a psychometric dataset with percentile bootstrap intervals,
+    when the item-level responses behind it are in PIBSE_RESPONSES_DIR (as "<dataset>.xlsx", see
+    read_responses). Rows are matched on Medición and, when the sheet has them, on the measurement window
+    (Pre, Post) and the subanalysis; rows without a match keep the intervals of the sheet. A sheet with
+    subanalyses is left unchanged when the workbook does not define them.
+
+    The intervals are computed once per data version (compute_effect_sizes), with PIBSE_BOOTSTRAP_RESAMPLES
+    resamples (2000 by default).
+
+    :param k: Dataset label (e.g., 'educadores').
+    :param df: The dataset, or a view of it (None while it is loading).
+    :return: A new DataFrame with the bootstrap intervals, or `df` itself when there are no responses.
+    """
+    folder = os.environ.get("PIBSE_RESPONSES_DIR")
+    path = os.path.join(folder, f"{k}.xlsx") if folder else None
+    if df is None or path is None or not os.path.exists(path):
+        return df
+
+    import pandas as pd
+    from processing import ProcessData
+
+    responses, items, subgroups = read_responses(path, os.path.getmtime(path))
+    grouped = "Subanálisis" in df.columns
+    if grouped and subgroups is None:
+        return df
+
+    windows = (("inicial", "final"),)
+    if "Pre" in df.columns and "Post" in df.columns:
+        windows = tuple(dict.fromkeys(zip(df["Pre"].astype(str), df["Post"].astype(str))))
+    version = ProcessData.data_version({"responses": responses, "items": items})
+    resamples = int(os.environ.get("PIBSE_BOOTSTRAP_RESAMPLES", 2000))
+    # Without subanalyses in the sheet, every row is matched against the whole group
+    results = compute_effect_sizes(responses, items, version, subgroups if grouped else None, windows,
+                                   intervals="bootstrap", resamples=resamples, keep_groups=True)
+
+    keys = ["Medición"] + [c for c in GROUP_COLUMNS if c in df.columns]
+    intervals = results[keys + ["conf.low", "conf.high"]].astype({c: str for c in keys})
+    matched = df[keys].astype(str).merge(intervals, on=keys, how="left")
+    out = df.copy()
+    for column in ("conf.low", "conf.high"):
+        out[column] = matched[column].fillna(pd.Series(df[column].to_numpy(dtype=float))).to_numpy()
+    return ProcessData.derive_version(out, ProcessData.dataset_version(df), "bootstrap", version, resamples)
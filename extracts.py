@@ -0,0 +1,49 @@
+import streamlit as st
+
+# Supported extract formats: MIME type of the download
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+
+@st.cache_data(max_entries=256)
+def build_extract(_df, version: str, fmt: str = "csv"):
+    """
+    Serializes an aggregated frame for download. The result is cached per content and format, so the
+    file is generated once and then served from the cache on every rerun and click.
+
+    :param _df: Aggregated DataFrame (not hashed by Streamlit).
+    :param version: Fingerprint of the content of the frame (see `ProcessData.content_version`), used as
+                    the cache key.
+    :param fmt: "csv" or "parquet".
+    :return: The file content as bytes.
+    """
+    if fmt == "csv":
+        # UTF-8 with BOM so spreadsheets open accents ('Medición', 'Yucatán') correctly.
+        return _df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "parquet":
+        from io import BytesIO
+        buffer = BytesIO()
+        _df.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    raise ValueError(f"Unsupported extract format: {fmt}")
+
+
+def extract_frame(data: dict):
+    """
+    Returns the aggregated frame behind a chart configuration. Summary tables hold one frame per group;
+    they are stacked with a 'Group' column taken from the x-axis names.
+
+    :param data: Chart configuration of `graph_options` (with a "df" or a "data" entry).
+    :return: A DataFrame, or None if the configuration has no data.
+    """
+    import pandas as pd
+
+    if "df" in data:
+        return data["df"]
+    if "data" in data:
+        names = data.get("xaxis_name") or list(data["data"])
+        return pd.concat([df.assign(Group=name) for name, df in zip(names, data["data"].values())],
+                         ignore_index=True)
+    return None
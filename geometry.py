@@ -0,0 +1,202 @@
+import hashlib
+import json
+import math
+import os
+
+import streamlit as st
+
+# Simplification tolerances in degrees, from the finest to the coarsest level (about 100 m, 500 m and 2 km)
+TOLERANCES = (0.001, 0.005, 0.02)
+
+
+def simplify(points, tolerance: float):
+    """
+    Simplifies a line or ring with the Douglas-Peucker algorithm: a point is kept when it lies farther than
+    `tolerance` from the segment joining the points kept around it. The distances of a whole segment are
+    computed at once with numpy, and the segments left to split are kept on a stack instead of recursing.
+
+    :param points: Array of shape (n, 2) with the (longitude, latitude) coordinates.
+    :param tolerance: Maximum distance, in degrees, between the original and the simplified line.
+    :return: The array of the kept points (the first and last points are always kept).
+    """
+    import numpy as np
+
+    n = len(points)
+    if n < 3:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start, inner = points[first], points[first + 1:last]
+        dx, dy = points[last] - start
+        norm = math.hypot(dx, dy)
+        if norm == 0:  # Closed ring: distance to the start point
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:  # Distance to the line through the segment ends
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0])) / norm
+
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+
+    return points[keep]
+
+
+class MunicipalBoundaries:
+    """
+    This class loads the municipal boundaries of a local GeoJSON file once and precomputes simplified copies
+    of every geometry at several tolerances. A choropleth then embeds only the features it shows, at the
+    coarsest level that still looks exact at the size of the map (see resolution), instead of the raw
+    boundaries on every rerun.
+
+    Features are identified by "<state>|<municipality>", the names of the 'municipios' catalog.
+    """
+
+    def __init__(self, path: str, state_field: str = "Entidad", municipality_field: str = "Municipio",
+                 tolerances: tuple = TOLERANCES):
+        """
+        Reads the file and builds every level of simplification.
+
+        :param path: Path of a GeoJSON FeatureCollection of Polygon/MultiPolygon municipalities.
+        :param state_field: Feature property with the name of the state.
+        :param municipality_field: Feature property with the name of the municipality.
+        :param tolerances: Simplification tolerances in degrees, one level each.
+        """
+        import numpy as np
+
+        with open(path, "rb") as f:
+            content = f.read()
+        self.path = path
+        self.version = hashlib.sha1(content).hexdigest()[:12]  # Part of the figure keys (see __repr__)
+        self.tolerances = tuple(sorted(tolerances))
+
+        self.ids = []  # Feature ids, in file order
+        polygons = []  # Rings of every feature, as a list of polygons of (n, 2) arrays
+        for feature in json.loads(content)["features"]:
+            properties, geometry = feature["properties"], feature["geometry"]
+            if not geometry:
+                continue
+            self.ids.append(self.feature_id(properties[state_field], properties[municipality_field]))
+            coordinates = geometry["coordinates"]
+            if geometry["type"] == "Polygon":
+                coordinates = [coordinates]
+            polygons.append([[np.asarray(ring, dtype=float)[:, :2] for ring in polygon]
+                             for polygon in coordinates])
+        del content
+
+        # Bounding box of every feature, as (min lon, min lat, max lon, max lat)
+        self.bounds = {}
+        for i, feature in zip(self.ids, polygons):
+            points = np.concatenate([polygon[0] for polygon in feature])
+            self.bounds[i] = (*points.min(axis=0), *points.max(axis=0))
+
+        # Simplified geometries of every level, ready to be embedded in a GeoJSON
+        self.levels = {t: {i: self.simplify_feature(feature, t) for i, feature in zip(self.ids, polygons)}
+                       for t in self.tolerances}
+
+    def __repr__(self):
+        # Stable across processes, so figure keys change only when the file does
+        return f"MunicipalBoundaries({os.path.basename(self.path)!r}, {self.version})"
+
+    @staticmethod
+    def feature_id(state, municipality):
+        """
+        :return: The id of a municipality, "<state>|<municipality>".
+        """
+        return f"{state}|{municipality}"
+
+    @staticmethod
+    def simplify_feature(feature: list, tolerance: float):
+        """
+        Simplifies the rings of a feature. Holes and islands that collapse below a triangle are dropped; a
+        feature whose every polygon collapses keeps the outer ring of its largest polygon unsimplified, so
+        small municipalities stay on the map at every level.
+
+        :param feature: List of polygons, each one a list of (n, 2) ring arrays (outer ring first).
+        :param tolerance: Simplification tolerance in degrees.
+        :return: A GeoJSON MultiPolygon geometry.
+        """
+        # Enough decimals to keep the error below the tolerance, and no more
+        decimals = math.ceil(-math.log10(tolerance)) + 1
+
+        def ring(points):
+            return points.round(decimals).tolist()
+
+        polygons = []
+        for polygon in feature:
+            rings = [simplify(r, tolerance) for r in polygon]
+            if len(rings[0]) < 4:
+                continue
+            polygons.append([ring(rings[0])] + [ring(r) for r in rings[1:] if len(r) >= 4])
+
+        if not polygons:
+            largest = max(feature, key=lambda polygon: len(polygon[0]))
+            polygons = [[ring(largest[0])]]
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    def resolution(self, ids: list, width: int = 900):
+        """
+        Picks the level of simplification for a map fitted to some features: the coarsest tolerance that
+        stays below one pixel of the map.
+
+        :param ids: Ids of the features shown.
+        :param width: Width of the map in pixels.
+        :return: A tolerance of self.tolerances.
+        """
+        bounds = [self.bounds[i] for i in ids if i in self.bounds]
+        if not bounds:
+            return self.tolerances[-1]
+
+        extent = max(max(b[2] for b in bounds) - min(b[0] for b in bounds),
+                     max(b[3] for b in bounds) - min(b[1] for b in bounds))
+        pixel = extent / width
+        fitting = [t for t in self.tolerances if t <= pixel]
+        return fitting[-1] if fitting else self.tolerances[0]
+
+    def geojson(self, ids: list, tolerance: float):
+        """
+        Builds a FeatureCollection with the features shown, at one level of simplification.
+
+        :param ids: Ids of the features (unknown ids are skipped).
+        :param tolerance: A tolerance of self.tolerances.
+        :return: A GeoJSON dictionary whose features carry their id in "id".
+        """
+        level = self.levels[tolerance]
+        return {"type": "FeatureCollection",
+                "features": [{"type": "Feature", "id": i, "properties": {}, "geometry": level[i]}
+                             for i in dict.fromkeys(ids) if i in level]}
+
+
+@st.cache_resource(max_entries=2)
+def get_boundaries(path: str, mtime: float):
+    """
+    Returns the boundaries of a file, loaded and simplified once per server process and shared by all
+    sessions. The modification time is part of the cache key, so an updated file is reloaded.
+
+    :param path: Path of the GeoJSON file.
+    :param mtime: Modification time of the file.
+    :return: A MunicipalBoundaries instance.
+    """
+    state_field, municipality_field = os.environ.get("PIBSE_BOUNDARIES_FIELDS", "Entidad,Municipio").split(",")
+    return MunicipalBoundaries(path, state_field.strip(), municipality_field.strip())
+
+
+def load_boundaries():
+    """
+    Loads the municipal boundaries configured with PIBSE_BOUNDARIES (path of a GeoJSON file, with the state
+    and municipality properties named by PIBSE_BOUNDARIES_FIELDS, "Entidad,Municipio" by default).
+
+    :return: A MunicipalBoundaries instance, or None when no file is configured.
+    """
+    path = os.environ.get("PIBSE_BOUNDARIES")
+    if not path or not os.path.exists(path):
+        return None
+    return get_boundaries(path, os.path.getmtime(path))
@@ -1,9 +1,12 @@
 from collections import defaultdict
 import streamlit as st
 import math
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objs as go
+
+from cache import get_shared_cache
+from extracts import FORMATS, build_extract, extract_frame
+from payload import FigurePayload
+from processing import ProcessData
+from singleflight import get_single_flight
 
 
 class CreateGraphs:
@@ -11,6 +14,8 @@ class CreateGraphs:
     This class creates various types of charts (bar chart, forest plot, summary table, etc.)
     for visualizing data in a dashboard. It leverages Plotly for graph generation and Streamlit for display.
     """
+    # Layouts compiled from the `lines` settings, shared by all instances (see line_layout)
+    line_layouts = {}
 
     def __init__(self, data: dict):
         """
@@ -21,6 +26,9 @@ class CreateGraphs:
         self.data = data
         self.aux_data = defaultdict(lambda: None, data)
         self.bg_color = "#F5F0EA"  # Default background color for charts
+        self.payload = FigurePayload()  # Slims figures before they are sent to the browser
+        self.figures = {}  # Figures built ahead of the layout by build_tiles, by (type_graph, value)
+        self.key = None  # Fingerprint of the configuration, computed once per instance (see config_key)
         self.legend_translations = {
             "Constructo": {
                 "Autoconocimiento": "Self awareness",
@@ -55,6 +63,12 @@ class CreateGraphs:
                 "Seguridad y pertenencia": "#D094EA",
                 "Aprendizaje socioemocional en la comunidad educativa": "#F59794"
             },
+            "Entidad": {
+                "Campeche": "#22314E",
+                "Quintana Roo": "#1A7F83",
+                "Yucatán": "#F0BA54",
+                "No data": "#A7B4CD"
+            },
             "Prioridad": {
                 "Kellogg's Priority": "#22314E",
                 "Authorized Extension": "#4A5E7A",
@@ -65,6 +79,10 @@ class CreateGraphs:
                 "25": "#A7B4CD",
                 "1": "#22314E"
             },
+            "Status": {
+                "Reached": "#1A7F83",
+                "Not Reached": "#F8BAB1"
+            },
             "Comportamiento": {
                 "Significativo/sentido esperado": "#22314E",
                 "Significativo/sentido contrario": "#F15D4A",
@@ -86,7 +104,8 @@ class CreateGraphs:
             "Entidad": ["Campeche", "Quintana Roo", "Yucatán", "No data"],
             "Tipo": ["Professional Development", "Systemic Leadership Training",
                      "Professional Development/Systemic Leadership Training", "Teenagers"],
-            "Ben_directo": ["25", "1"]
+            "Ben_directo": ["25", "1"],
+            "Status": ["Reached", "Not Reached"]
         }
         # Settings for adding lines to charts (like D-Cohen effect size thresholds)
         self.lines = {
@@ -116,6 +135,48 @@ class CreateGraphs:
             }
         }
 
+    def line_layout(self, type_line: str, vlines: bool = True, hide_ticks: bool = False):
+        """
+        Compiles the reference lines and annotations of a `lines` entry (e.g., "Effect_Size" or "D-Cohen") into a
+        Plotly layout. Layouts are compiled once per process and shared by every figure, so builders attach them
+        in a single layout update instead of adding and re-validating each line and annotation.
+
+        :param type_line: Key of self.lines.
+        :param vlines: Include the vertical reference lines (and their labels, when they have one).
+        :param hide_ticks: Hide the x-axis tick labels when the entry has annotations, as the bar charts do.
+        :return: A plotly.graph_objects.Layout holding the shapes and annotations.
+        """
+        key = (type_line, vlines, hide_ticks)
+        if key not in CreateGraphs.line_layouts:
+            import plotly.graph_objects as go
+
+            lines = self.lines[type_line]["line"]
+            # Lines are either labelled ({"Small": 0.2, ...}) or plain positions ([-1.0, -0.5, ...]).
+            labelled = lines.items() if isinstance(lines, dict) else [(None, x) for x in lines]
+
+            shapes, annotations = [], []
+            if vlines:
+                for k, i in labelled:
+                    # Vertical dashed line spanning the whole plot area at x = i
+                    shapes.append(dict(type="line", xref="x", yref="y domain", x0=i, x1=i, y0=0, y1=1,
+                                       line=dict(width=1, dash="dash", color="grey")))
+                    if k is not None:
+                        # Label below the line (e.g., 'Small', 'Medium', 'Big')
+                        annotations.append(dict(xref="x", yref="y domain", x=i, y=0, text=k, showarrow=False,
+                                                xanchor="center", yanchor="top"))
+
+            # Notes (e.g., statistical significance) placed relative to the entire chart area
+            notes = self.lines[type_line]["annotation"] or {}
+            for k, i in notes.items():
+                annotations.append(dict(xref="paper", yref="paper", x=i["x"], y=i["y"], text=i["text"],
+                                        showarrow=False, textangle=0))
+
+            layout = dict(shapes=shapes, annotations=annotations)
+            if hide_ticks and notes:
+                layout["xaxis"] = {"showticklabels": False}
+            CreateGraphs.line_layouts[key] = go.Layout(layout)
+        return CreateGraphs.line_layouts[key]
+
     def create_barchart(self, **kwargs):
         """
         Creates a bar chart using Plotly with customizable features like orientation, color, text,
@@ -124,6 +185,7 @@ class CreateGraphs:
         :param kwargs: Optional layout properties to customize the chart (like width, title, etc.)
         :return: A Plotly figure object representing the bar chart.
         """
+        import plotly.express as px  # Imported lazily to keep page start-up cheap.
 
         # Create a basic bar chart with Plotly Express.
         # 'data_frame': Data to be plotted, 'x' and 'y': Axis mappings, 'orientation': Horizontal or vertical bars.
@@ -137,21 +199,10 @@ class CreateGraphs:
             category_orders=self.category_orders,
             color=self.aux_data["color"],
             color_discrete_map=self.color_palettes[self.aux_data["color"]],
+            template=self.payload.shared_template(),
             text=self.aux_data["text"]
         )
 
-        # Customize layout properties for the bar chart.
-        # Set axis titles, legend title, and background color. Additional layout properties can be provided via kwargs.
-        fig.update_layout(
-            xaxis_title=self.aux_data["xaxis_name"],
-            yaxis_title=self.aux_data["yaxis_name"],
-            legend_title=self.aux_data["legend_name"],
-            paper_bgcolor=self.bg_color,
-            plot_bgcolor=self.bg_color,
-            height=550,  # Set chart height
-            **kwargs  # Apply any additional layout customizations passed via kwargs
-        )
-
         # If the text data type is float, format the text on bars to show two decimal places.
         if self.aux_data["text_dtype"] == "float":
             fig.update_traces(texttemplate="%{value:.2f}")
@@ -170,39 +221,23 @@ class CreateGraphs:
                 hovertemplate=x.hovertemplate.replace(x.name, new_names[x.name])  # Update the hover text
             ))
 
-        # Add reference lines (like for effect sizes) to the chart if 'line' data is provided.
+        # Prebuilt reference lines (like for effect sizes) and annotations, if 'line' data is provided.
+        # Vertical lines are only drawn on horizontal bar charts (orientation == 'h').
         type_line = self.aux_data["line"]
-        if type_line is not None:
-            # Loop through each defined line and add it to the chart.
-            for k, i in self.lines[type_line]["line"].items():
-                # Add a vertical line for horizontal bar charts (orientation == 'h').
-                if self.aux_data["orientation"] == "h":
-                    fig.add_vline(
-                        x=i,  # Position of the vertical line
-                        line_width=1, line_dash="dash",  # Style of the line
-                        line_color="grey",  # Line color
-                        annotation_text=k,  # Label for the line (e.g., 'Small', 'Medium', 'Large')
-                        annotation_position="bottom"  # Position of the label
-                    )
-
-            # Add any annotations (e.g., statistical significance notes) to the chart.
-            annotation = self.lines[type_line]["annotation"]
-            if annotation is not None:
-                for k, i in annotation.items():
-                    # Add the annotation text at a specific location on the chart.
-                    fig.add_annotation(dict(
-                        xref="paper", yref="paper",  # Reference coordinates relative to the entire chart area
-                        x=i["x"], y=i["y"],  # Position of the annotation
-                        text=i["text"],  # Annotation text (e.g., "*p<0.05, **p<0.01")
-                        showarrow=False,  # No arrow
-                        textangle=0  # Horizontal text
-                    ))
-
-                    # Optionally hide tick labels on the x-axis (if desired) for a cleaner look.
-                    fig.update_layout(xaxis={'showticklabels': False})
-
-        # Customize the legend layout and positioning.
+        lines = {} if type_line is None else self.line_layout(type_line, vlines=self.aux_data["orientation"] == "h",
+                                                              hide_ticks=True).to_plotly_json()
+
+        # Customize all layout properties of the bar chart in a single update.
+        # Set axis titles, legend title and position, and background color. Additional layout properties can be
+        # provided via kwargs.
         fig.update_layout(
+            lines,
+            xaxis_title=self.aux_data["xaxis_name"],
+            yaxis_title=self.aux_data["yaxis_name"],
+            legend_title=self.aux_data["legend_name"],
+            paper_bgcolor=self.bg_color,
+            plot_bgcolor=self.bg_color,
+            height=550,  # Set chart height
             legend=dict(
                 xref="paper", yref="paper",  # Position the legend relative to the chart
                 orientation="h",  # Horizontal legend
@@ -212,11 +247,110 @@ class CreateGraphs:
                 xanchor="left",  # Align legend to the left
                 x=0  # Horizontal position
             ),
-            showlegend=self.data["show_legend"]  # Show or hide the legend based on user settings
+            showlegend=self.data["show_legend"],  # Show or hide the legend based on user settings
+            **kwargs  # Apply any additional layout customizations passed via kwargs
         )
 
         return fig  # Return the finalized bar chart figure.
 
+    def create_linechart(self, **kwargs):
+        """
+        Creates a line chart using Plotly, with one line per color category (e.g., reach per state across
+        snapshots). Additional layout properties can be passed via kwargs.
+
+        :param kwargs: Optional layout properties to customize the chart (like width, title, etc.)
+        :return: A Plotly figure object representing the line chart.
+        """
+        import plotly.express as px  # Imported lazily to keep page start-up cheap.
+
+        # Create the lines with markers on every snapshot.
+        fig = px.line(
+            data_frame=self.aux_data["df"],
+            x=self.aux_data["x"],
+            y=self.aux_data["y"],
+            color=self.aux_data["color"],
+            category_orders=self.category_orders,
+            color_discrete_map=self.color_palettes.get(self.aux_data["color"], {}),
+            markers=True,
+            template=self.payload.shared_template()
+        )
+
+        # Translate the legend labels if a translation is specified.
+        translate = self.aux_data["legend_translation"]
+        if translate in self.legend_translations:
+            new_names = self.legend_translations[translate]
+            fig.for_each_trace(lambda x: x.update(
+                name=new_names[x.name],  # Update the name
+                legendgroup=new_names[x.name],  # Update the group name in the legend
+                hovertemplate=x.hovertemplate.replace(x.name, new_names[x.name])  # Update the hover text
+            ))
+
+        # Customize all layout properties in a single update.
+        fig.update_layout(
+            xaxis_title=self.aux_data["xaxis_name"],
+            yaxis_title=self.aux_data["yaxis_name"],
+            legend_title=self.aux_data["legend_name"],
+            paper_bgcolor=self.bg_color,
+            plot_bgcolor=self.bg_color,
+            height=550,  # Set chart height
+            legend=dict(orientation="h", entrywidth=160, yanchor="bottom", y=1.02, xanchor="left", x=0),
+            showlegend=self.data["show_legend"],  # Show or hide the legend based on user settings
+            **kwargs  # Apply any additional layout customizations passed via kwargs
+        )
+
+        return fig  # Return the finalized line chart figure.
+
+    def create_choropleth(self, **kwargs):
+        """
+        Creates a choropleth map of municipalities using Plotly (e.g., reached and unreached municipalities).
+        The boundaries come from the MunicipalBoundaries of the configuration: the map embeds only the
+        municipalities of the data, simplified at the level that fits the extent of the map (see
+        MunicipalBoundaries.resolution). Municipalities without a boundary are left out of the map.
+
+        :param kwargs: Optional layout properties to customize the chart (like width, title, etc.)
+        :return: A Plotly figure object representing the map.
+        """
+        import plotly.express as px  # Imported lazily to keep page start-up cheap.
+
+        boundaries = self.aux_data["boundaries"]
+        width = self.aux_data["width"] or 900  # Approximate width of the map in pixels
+
+        # Identify every municipality by the ids of the boundary features.
+        df = self.aux_data["df"].copy()
+        df["id"] = [boundaries.feature_id(e, m) for e, m in zip(df["Entidad"], df["Municipio"])]
+        geojson = boundaries.geojson(df["id"], boundaries.resolution(df["id"], width))
+
+        color = self.aux_data["color"]
+        fig = px.choropleth(
+            data_frame=df,
+            geojson=geojson,
+            locations="id",
+            featureidkey="id",
+            color=color,
+            category_orders=self.category_orders,
+            color_discrete_map=self.color_palettes.get(color, {}),
+            hover_name="Municipio",
+            hover_data={"Entidad": True, "Prioridad": "Prioridad" in df, "id": False, color: False},
+            template=self.payload.shared_template()
+        )
+
+        # Fit the map to the municipalities shown and hide the base map of the world.
+        fig.update_geos(fitbounds="locations", visible=False, bgcolor=self.bg_color)
+        fig.update_traces(marker_line_color="white", marker_line_width=0.5)
+
+        # Customize all layout properties in a single update.
+        fig.update_layout(
+            legend_title=self.aux_data["legend_name"],
+            paper_bgcolor=self.bg_color,
+            height=600,  # Set chart height
+            margin=dict(l=0, r=0, t=40, b=0),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0),
+            showlegend=self.data["show_legend"],  # Show or hide the legend based on user settings
+            **kwargs  # Apply any additional layout customizations passed via kwargs
+        )
+
+        return fig  # Return the finalized map.
+
     def create_forest_plot(self, **kwargs):
         """
         Creates a forest plot using Plotly, which typically shows estimates (like odds ratios) with confidence intervals.
@@ -226,85 +360,57 @@ class CreateGraphs:
         :param kwargs: Additional layout properties to customize the chart (e.g., title, margins).
         :return: A Plotly figure object representing the forest plot.
         """
+        import plotly.graph_objects as go  # Imported lazily to keep page start-up cheap.
 
         # Extract key columns from auxiliary data for easier access.
+        df = self.aux_data["df"]
         x = self.aux_data["x"]  # Column for the central estimate (e.g., odds ratio)
         y = self.aux_data["y"]  # Column for the labels or categories (y-axis values)
         high = self.aux_data["high"]  # Column for the upper bound of the confidence interval
         low = self.aux_data["low"]  # Column for the lower bound of the confidence interval
         color = self.aux_data["color"]  # Column indicating different groups/colors in the plot
 
-        # Initialize a Plotly figure with a specified range for the x-axis and background colors.
-        fig = go.Figure(
-            layout_xaxis_range=[-1, 1],  # Setting x-axis range from -1 to 1, useful for odds ratios or effect sizes
-            layout={
-                "paper_bgcolor": self.bg_color,  # Set the background color of the entire figure
-                "plot_bgcolor": self.bg_color  # Set the background color of the plot area
-            }
-        )
-
-        # Get the unique categories from the 'color' column to differentiate groups in the plot.
-        unique_colors = self.aux_data["df"][color].unique()
+        # Translate the legend labels if a translation is specified.
+        # For example, translating internal variable names to more readable labels for the chart's legend.
+        translate = self.aux_data["legend_translation"]
+        new_names = self.legend_translations.get(translate)
 
-        # Loop through each unique color group and add traces (markers with error bars) for that group.
-        for c in unique_colors:
+        # Build one trace (markers with error bars) per unique color group.
+        traces = []
+        for c in df[color].unique():
             # Create a mask to filter data by the current color/group.
-            color_mask = self.aux_data["df"][color] == c
+            color_mask = df[color] == c
+            name = new_names[c] if new_names is not None else c  # Name for this trace (appears in the legend)
 
-            # Add scatter plot points with error bars for this group.
-            fig.add_trace(
+            traces.append(
                 go.Scatter(
-                    x=self.aux_data["df"][x][color_mask],  # X-values: central estimates
-                    y=self.aux_data["df"][y][color_mask],  # Y-values: categories or labels
+                    x=df[x][color_mask],  # X-values: central estimates
+                    y=df[y][color_mask],  # Y-values: categories or labels
                     mode="markers",  # Use markers to represent the points
                     error_x=dict(
                         type="data",  # The error bars represent data values
-                        array=abs(self.aux_data["df"][high][color_mask] - self.aux_data["df"][x][color_mask]),
-                        # Upper bound of CI
+                        array=abs(df[high][color_mask] - df[x][color_mask]),  # Upper bound of CI
                         symmetric=False,  # Error bars are asymmetric
-                        arrayminus=abs(self.aux_data["df"][low][color_mask] - self.aux_data["df"][x][color_mask])
-                        # Lower bound of CI
+                        arrayminus=abs(df[low][color_mask] - df[x][color_mask])  # Lower bound of CI
                     ),
                     marker=dict(
                         color=self.color_palettes[color][c],  # Set the marker color based on the group
                         size=20  # Marker size
                     ),
-                    name=c  # Name for this trace (appears in the legend)
+                    name=name,
+                    legendgroup=name
                 )
             )
 
-        # If reference lines (e.g., no-effect lines) are specified, add vertical dashed lines to the plot.
-        type_line = self.aux_data["line"]
-        for i in self.lines[type_line]["line"]:
-            # Add a vertical reference line (e.g., at odds ratio 1 or effect size 0)
-            fig.add_vline(x=i, line_width=1, line_dash="dash", line_color="grey")
+        # Attach the traces to the prebuilt reference lines (e.g., no-effect line) and annotations.
+        fig = go.Figure(data=traces, layout=self.line_layout(self.aux_data["line"]))
 
-        # Translate the legend labels if a translation is specified.
-        # For example, translating internal variable names to more readable labels for the chart's legend.
-        translate = self.aux_data["legend_translation"]
-        if translate in self.legend_translations:
-            # Get the translation mapping
-            new_names = self.legend_translations[translate]
-            # Update each trace (category) in the legend with the translated name.
-            fig.for_each_trace(lambda z: z.update(
-                name=new_names[z.name],  # Update the name
-                legendgroup=new_names[z.name]  # Update the group name in the legend
-            ))
-
-        # Add annotations (e.g., notes for statistical significance) if provided.
-        annotation = self.lines[type_line]["annotation"]
-        for k, i in annotation.items():
-            # Place the annotation text at specific positions on the plot.
-            fig.add_annotation(dict(
-                xref="paper", yref="paper",  # Coordinates relative to the full plot area
-                x=i["x"], y=i["y"],  # X and Y position of the annotation
-                text=i["text"],  # Annotation text (e.g., "*p<0.05")
-                showarrow=False,  # No arrow pointing to the text
-                textangle=0  # Keep the text horizontal
-            ))
-
-        # Update the layout of the figure with additional properties.
+        # Update the layout of the figure with additional properties in a single call.
         fig.update_layout(
+            template=self.payload.shared_template(),  # Shared small template (see FigurePayload)
+            xaxis_range=[-1, 1],  # Setting x-axis range from -1 to 1, useful for odds ratios or effect sizes
+            paper_bgcolor=self.bg_color,  # Set the background color of the entire figure
+            plot_bgcolor=self.bg_color,  # Set the background color of the plot area
             width=750,  # Set the figure width
             height=500,  # Set the figure height
             showlegend=True,  # Show the legend
@@ -323,37 +429,49 @@ class CreateGraphs:
 
         return fig  # Return the final forest plot figure.
 
-    def create_summary_table(self):
+    def create_summary_table(self, constructs: tuple = None):
         """
         Creates a summary table and visualizes it as a heatmap. The table merges multiple datasets on common columns
         and adds significance and behavior labels to effect size (Cohen's D). The result is color-coded for easy
         interpretation using a heatmap, with specific annotations for the table cells.
 
+        :param constructs: Constructs ('Constructo' values) to include, e.g. one page of the table. The figure height
+                           then follows the number of rows. None includes every construct.
         :return: A Plotly heatmap figure object representing the summary table.
         """
+        import pandas as pd  # Imported lazily to keep page start-up cheap.
+        import plotly.graph_objects as go
 
-        # Loop through each dataset and modify the 'D-cohen' column to include significance and behavior information.
+        # Loop through each dataset and add a 'D-cohen_sig' column with significance and behavior information.
+        # The column is added to copies, since the datasets may be shared with other sessions.
+        data = {}
         for k, i in self.data["data"].items():
             # Format 'D-cohen' to 3 decimal places, concatenate significance and behavior information.
             tempdf = i["D-cohen"].apply(lambda x: f"{x:.3f}")
-            i["D-cohen_sig"] = tempdf + i["Significancia"].astype(str) + "/" + i["Comportamiento"].astype(str)
+            data[k] = i.assign(**{
+                "D-cohen_sig": tempdf + i["Significancia"].astype(str) + "/" + i["Comportamiento"].astype(str)
+            })
 
         # Define the columns to keep for merging.
         cols_to_keep = ["Constructo", "Medición inglés", "D-cohen_sig"]
 
         # Get the keys (names of the datasets) to iterate over for merging.
-        keys = list(self.data["data"].keys())
+        keys = list(data.keys())
 
         # Start merging the datasets by initializing with the first dataset.
-        merged = self.data["data"][keys[0]][cols_to_keep]
+        merged = data[keys[0]][cols_to_keep]
 
         # Merge all datasets on 'Constructo' and 'Medición inglés' columns using outer join.
         for i in range(1, len(keys)):
-            merged = pd.merge(merged, self.data["data"][keys[i]][cols_to_keep],
+            merged = pd.merge(merged, data[keys[i]][cols_to_keep],
                               on=cols_to_keep[:2],  # Merge on the first two columns: 'Constructo' and 'Medición inglés'
                               how="outer",  # Outer join to include all rows from both datasets
                               suffixes=(f"{keys[i - 1]}", f"{keys[i]}"))  # Add suffixes to differentiate the columns
 
+        # Keep only the rows of the requested constructs.
+        if constructs is not None:
+            merged = merged[merged["Constructo"].isin(constructs)]
+
         # If a legend translation for 'Constructo' exists, reorder and rename the values.
         if self.legend_translations["Constructo"] is not None:
             # Get the desired order for 'Constructo' from category orders.
@@ -414,11 +532,14 @@ class CreateGraphs:
                             text=annotations.iloc[:, 2:],  # Use formatted annotations for each cell.
                             texttemplate="%{text}",  # Template to show text annotations on the heatmap.
                             showscale=False),  # Hide the color scale.
-            layout={"paper_bgcolor": self.bg_color,  # Set background color of the figure.
+            layout={"template": self.payload.shared_template(),  # Shared small template (see FigurePayload)
+                    "paper_bgcolor": self.bg_color,  # Set background color of the figure.
                     "plot_bgcolor": self.bg_color})  # Set background color of the plot area.
 
         # Update layout settings: set figure height and position the x-axis labels at the top.
-        fig.update_layout(height=1200, xaxis=dict(side='top'),
+        # A page of the table is as tall as its rows; the full table keeps its fixed height.
+        height = 1200 if constructs is None else max(300, 120 + 45 * len(merged))
+        fig.update_layout(height=height, xaxis=dict(side='top'),
                           font=dict(
                               size=13.5
                           )
@@ -439,8 +560,8 @@ class CreateGraphs:
         """
         import plotly.graph_objects as go  # Import Plotly graph objects for figure creation.
 
-        # Create an empty figure object.
-        fig = go.Figure()
+        # Create an empty figure object with the shared template.
+        fig = go.Figure(layout={"template": self.payload.shared_template()})
 
         # Check if the dataframe is empty, indicating all priority municipalities were reached.
         if self.data["df"].empty:
@@ -450,18 +571,11 @@ class CreateGraphs:
             # If some municipalities were not reached, get the unique list of those municipalities.
             not_reached = self.data["df"]["Not Reached"].unique()
 
-            # Start composing the message with HTML formatting.
-            text = "<b>Priority municipalities not reached:</b><br>"
-
-            # Initialize an empty string to store municipality names.
-            muns = ""
-
-            # Loop through the list of not reached municipalities and concatenate their names into the string.
-            for m in not_reached:
-                muns = muns + f"{m}, "  # Add each municipality followed by a comma and a space.
-
-            # Combine the message text and municipality list, then remove the trailing comma and space.
-            text = (text + muns)[:-2]
+            # Join the names in one call; long (nationwide) lists are cut so the legend stays readable.
+            limit = 40
+            text = "<b>Priority municipalities not reached:</b><br>" + ", ".join(map(str, not_reached[:limit]))
+            if len(not_reached) > limit:
+                text += f" and {len(not_reached) - limit} more"
 
         # Add an annotation (text) to the figure with HTML formatting.
         fig.add_annotation(
@@ -483,6 +597,243 @@ class CreateGraphs:
         # Return the created figure with the text message.
         return fig
 
+    def summary_pages(self, page_size: int):
+        """
+        Splits the constructs of the summary table into pages, following the category order.
+
+        :param page_size: Number of constructs per page.
+        :return: A list of tuples of 'Constructo' values, one tuple per page.
+        """
+        present = set()
+        for i in self.data["data"].values():
+            present.update(i["Constructo"].dropna().unique())
+        order = [x for x in self.category_orders["Constructo"] if x in present]
+        order += sorted(x for x in present if x not in order)  # Constructs without a defined order go last
+        return [tuple(order[i:i + page_size]) for i in range(0, len(order), page_size)]
+
+    def render_summary_pages(self, page_size: int):
+        """
+        Draws the summary table one page of constructs at a time. Only the rows of the selected page are sent
+        to the browser, so the cost of a rerun does not grow with the size of the table. It is called from the
+        render_tile fragment, so changing pages only reruns the table.
+
+        :param page_size: Number of constructs per page.
+        :return: None
+        """
+        pages = self.summary_pages(page_size)
+        translate = self.legend_translations["Constructo"]
+        page = st.radio(
+            label="Constructs",
+            label_visibility="collapsed",
+            options=range(len(pages)),
+            horizontal=True,
+            format_func=lambda p: " / ".join(translate.get(x, x) for x in pages[p])  # e.g., "Well being / ..."
+        )
+        st.plotly_chart(self.cached_figure("summary_table", pages[page]))
+
+    def tile_values(self):
+        """
+        Lists the values the data is disaggregated by, one per tile of the grid. Values follow the category
+        order when one is defined for the disaggregate parameter.
+
+        :return: A list of disaggregate values, or [None] when the chart is not disaggregated.
+        """
+        param = self.aux_data["disaggregate"]  # Get the disaggregate parameter.
+        if param is None:
+            return [None]
+
+        # Determine the disaggregate values based on category orders or unique values in the DataFrame.
+        if param in self.category_orders:
+            return [x for x in self.category_orders[param] if x in self.data["df"][param].unique()]
+        return list(self.data["df"][param].unique())
+
+    def build_figure(self, type_graph: str = "barchart", value=None):
+        """
+        Builds a single figure of the grid. When a disaggregate value is given, the data is filtered to
+        that value and the translated value is used as the figure title.
+
+        :param type_graph: Type of graph to create (e.g., "barchart", "linechart", "choropleth", "forest",
+                           "summary_table", or "reached_municipalities_legend"). Default is "barchart".
+        :param value: Disaggregate value the figure is built for. None builds the figure for the whole data.
+        :return: A Plotly figure object.
+        """
+        # Dictionary mapping plot types to their respective creation methods.
+        charts = {
+            "barchart": self.create_barchart,
+            "linechart": self.create_linechart,
+            "choropleth": self.create_choropleth,
+            "forest": self.create_forest_plot,
+            "summary_table": self.create_summary_table,
+            "reached_municipalities_legend": self.reached_municipalities_legend
+        }
+
+        # The summary table is paged by construct instead of disaggregated.
+        if type_graph == "summary_table":
+            return self.create_summary_table(constructs=value)
+
+        # Without a disaggregate value the chart is built from the full configuration.
+        if value is None:
+            return charts[type_graph]()
+
+        # Filter the DataFrame for the current disaggregate value.
+        param = self.aux_data["disaggregate"]
+        self.aux_data["df"] = self.data["df"][self.data["df"][param] == value]
+
+        # Create the plot using the specified type and translate the title if necessary.
+        return charts[type_graph](title=self.legend_translations[param][value])
+
+    def config_key(self):
+        """
+        Computes the fingerprint of the configuration: its settings and the versions of the data frames it is
+        built from (see ProcessData.dataset_version). Datasets and the frames derived from them carry their
+        version, so this does not hash the data; only unversioned frames (small aggregates) are hashed. The
+        fingerprint is computed once per instance and shared by every tile of the grid.
+
+        :return: A hexadecimal digest.
+        """
+        if self.key is not None:
+            return self.key
+
+        import hashlib
+        import pandas as pd
+
+        digest = hashlib.sha1()
+        for name in sorted(self.data):
+            item = self.data[name]
+            # The summary table holds a dictionary of frames under "data".
+            frames = item if isinstance(item, dict) else {name: item}
+            for k, i in frames.items():
+                if isinstance(i, pd.DataFrame):
+                    digest.update(f"{name}.{k}:{list(i.columns)}:{ProcessData.dataset_version(i)};".encode("utf-8"))
+                else:
+                    digest.update(f"{name}.{k}={i!r};".encode("utf-8"))
+        self.key = digest.hexdigest()
+        return self.key
+
+    def figure_key(self, type_graph: str = "barchart", value=None):
+        """
+        Computes a key that identifies a figure by its chart type, disaggregate value and configuration
+        (see config_key).
+
+        :param type_graph: Type of graph to create.
+        :param value: Disaggregate value of the tile, or None.
+        :return: A hexadecimal digest.
+        """
+        import hashlib
+
+        return hashlib.sha1(f"{self.config_key()}|{type_graph}|{value}".encode("utf-8")).hexdigest()
+
+    def cached_figure(self, type_graph: str = "barchart", value=None):
+        """
+        Returns a slimmed figure, reading it from the shared cache when another session or Streamlit
+        process already built it, and storing it there otherwise.
+
+        :param type_graph: Type of graph to create.
+        :param value: Disaggregate value of the tile, or None.
+        :return: A Plotly figure object.
+        """
+        # Figures built concurrently for the grid (see build_tiles)
+        if (type_graph, value) in self.figures:
+            return self.figures[(type_graph, value)]
+
+        cache = get_shared_cache()
+        key = "figure:" + self.figure_key(type_graph, value)
+
+        fig = cache.get_figure(key)
+        if fig is None:
+            # Sessions asking for the same figure at the same time wait for a single build
+            fig = get_single_flight().do(key, self.build_cached_figure, key, type_graph, value)
+        return fig
+
+    def build_cached_figure(self, key: str, type_graph: str = "barchart", value=None):
+        """
+        Builds a slimmed figure and stores it in the shared cache (see cached_figure).
+
+        :param key: Key of the figure in the shared cache.
+        :param type_graph: Type of graph to create.
+        :param value: Disaggregate value of the tile, or None.
+        :return: A Plotly figure object.
+        """
+        import time
+
+        start = time.perf_counter()
+        fig = self.payload.slim(self.build_figure(type_graph, value))
+        cache = get_shared_cache()
+        cache.set_figure(key, fig)
+        cache.record_load(key, time.perf_counter() - start)
+        return fig
+
+    def build_tiles(self, type_graph: str, values: list):
+        """
+        Starts building the figures of several tiles concurrently in a thread pool, so the layout can place
+        them in order while the remaining ones are still being built. Each worker uses its own CreateGraphs
+        instance, since building a tile filters self.aux_data in place.
+
+        Plotly figure construction is mostly Python code and holds the GIL, so the gain comes from the parts
+        that release it (cache reads and writes, JSON encoding, pandas filtering) and from overlapping them.
+
+        :param type_graph: Type of graph to create.
+        :param values: Disaggregate values of the tiles.
+        :return: A tuple (pool, futures) where futures maps every value to the Future of its figure. The
+                 caller shuts the pool down.
+        """
+        import os
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+        ctx = get_script_run_ctx()  # Workers share the session context (caches, secrets)
+        key = self.config_key()  # Computed once for the whole grid
+
+        def build(value):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            graphs = CreateGraphs(self.data)
+            graphs.key = key
+            return graphs.cached_figure(type_graph, value)
+
+        workers = int(os.environ.get("PIBSE_FIGURE_WORKERS", 8))
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(values))), thread_name_prefix="pibse-tile")
+        return pool, {value: pool.submit(build, value) for value in values}
+
+    @st.fragment
+    def render_tile(self, type_graph: str = "barchart", value=None):
+        """
+        Builds and draws one tile of the grid. The method is a Streamlit fragment, so an interaction inside
+        the tile only reruns this tile instead of the whole page.
+
+        :param type_graph: Type of graph to create.
+        :param value: Disaggregate value the tile is built for. None draws the figure for the whole data.
+        :return: None
+        """
+        if type_graph == "summary_table" and self.aux_data["page_size"]:
+            self.render_summary_pages(self.aux_data["page_size"])
+        else:
+            st.plotly_chart(self.cached_figure(type_graph, value))
+
+    def set_downloads(self):
+        """
+        Offers the aggregated frame behind the chart as CSV and Parquet downloads. The files are generated
+        once per content of the frame and served from the cache afterwards. The content is hashed rather
+        than trusting `attrs`, since the frame may be a selection or a stack of several datasets.
+
+        :return: None
+        """
+        df = extract_frame(self.data)
+        if df is None:
+            return
+
+        version = ProcessData.content_version(df)
+        name = (self.data.get("title") or "extract").replace(" ", "_").replace(":", "").replace("/", "-")
+        columns = st.columns([1, 1, 6])
+        for column, (fmt, mime) in zip(columns, FORMATS.items()):
+            column.download_button(
+                label=f"Download {fmt.upper()}",
+                data=build_extract(df, version, fmt),
+                file_name=f"{name}.{fmt}",
+                mime=mime,
+                key=f"download-{fmt}-{self.config_key()}"  # Unique per chart configuration and data
+            )
+
     def set_plots_grid(self, type_graph: str = "barchart",
                        ncols: int = 2, last: list = None, idx: int = 1):
         """
@@ -490,6 +841,10 @@ class CreateGraphs:
         provided 'type_graph' argument. It supports disaggregating data based on a specified parameter and
         displaying the plots accordingly.
 
+        The whole grid is laid out first with a placeholder in every tile, then each placeholder is filled
+        as soon as its figure is ready, so the page structure appears before the slowest figure is built.
+        The figures of a disaggregated grid are built concurrently (see build_tiles).
+
         :param type_graph: Type of graph to create (e.g., "barchart", "forest", "summary_table", or
                            "reached_municipalities_legend"). Default is "barchart".
         :param ncols: Number of columns to display the plots in. Default is 2.
@@ -503,56 +858,45 @@ class CreateGraphs:
         if last is None:
             last = [1 / 4, 1 / 2, 1 / 4]
 
-        # Dictionary mapping plot types to their respective creation methods.
-        charts = {
-            "barchart": self.create_barchart,
-            "forest": self.create_forest_plot,
-            "summary_table": self.create_summary_table,
-            "reached_municipalities_legend": self.reached_municipalities_legend
-        }
-
-        counter = 0  # Initialize a counter for tracking the number of plots created.
-
         # Check if there is a disaggregate parameter set in the aux_data.
         if self.aux_data["disaggregate"] is not None:
-            param = self.aux_data["disaggregate"]  # Get the disaggregate parameter.
-
-            # Determine the disaggregate values based on category orders or unique values in the DataFrame.
-            if param in self.category_orders:
-                disaggregate = [x for x in self.category_orders[param] if x in self.aux_data["df"][param].unique()]
-            else:
-                disaggregate = self.aux_data["df"][param].unique()
+            disaggregate = self.tile_values()  # Get the disaggregate values, one per tile.
 
             nrows = math.ceil(len(disaggregate) / 2)  # Calculate the number of rows needed.
-            rows = {}  # Dictionary to hold the row columns for layout.
+            columns = []  # Columns that will hold a tile, in the same order as the disaggregate values.
 
             # Loop through the number of rows to create the grid layout.
             for i in range(nrows):
                 # Check if it's the last row and if it has an odd number of disaggregates.
                 if i == (nrows - 1) and (len(disaggregate) % 2) != 0:
-                    # Create columns with specified widths for the last row.
-                    rows[f"{i}"] = st.columns(last)
+                    # Create columns with specified widths for the last row and use the specified index.
+                    columns.append(st.columns(last)[idx])
                 else:
                     # Create two equal columns for other rows.
-                    rows[f"{i}"] = st.columns([1 / 2, 1 / 2])
-
-                # Loop through the number of columns to place the plots.
-                for j in range(ncols):
-                    # Filter the DataFrame for the current disaggregate value.
-                    self.aux_data["df"] = self.data["df"][self.data["df"][param] == disaggregate[counter]]
-
-                    # Create the plot using the specified type and translate the title if necessary.
-                    temp_fig = charts[type_graph](title=self.legend_translations[param][disaggregate[counter]])
-
-                    if len(rows[f"{i}"]) == 2:  # Check if there are two columns in the row.
-                        tile = rows[f"{i}"][j].container(border=True)  # Create a container for the plot.
-                        tile.plotly_chart(temp_fig)  # Display the plot in the container.
-                        counter += 1  # Increment the counter to move to the next disaggregate.
-                    else:  # If the number of columns is less than expected (e.g., in the last row).
-                        tile = rows[f"{i}"][idx].container(border=True)  # Use the specified index for the tile.
-                        tile.plotly_chart(temp_fig)  # Display the plot in the tile.
-                        break  # Exit the loop after placing the plot.
+                    columns.extend(st.columns([1 / 2, 1 / 2])[:ncols])
+
+            # Put a placeholder in every tile before building any figure.
+            placeholders = []
+            for column in columns:
+                placeholder = column.container(border=True).empty()
+                placeholder.caption("Loading chart...")
+                placeholders.append(placeholder)
+
+            # Build every tile concurrently, then fill the placeholders in order as each figure is ready.
+            pool, futures = self.build_tiles(type_graph, disaggregate)
+            try:
+                for value, placeholder in zip(disaggregate, placeholders):
+                    self.figures[(type_graph, value)] = futures[value].result()
+                    with placeholder.container():
+                        self.render_tile(type_graph, value)
+            finally:
+                pool.shutdown(cancel_futures=True)
 
         else:  # If there is no disaggregate parameter.
-            tile = st.columns(1)  # Create a single column layout.
-            tile[0].container(border=True).plotly_chart(charts[type_graph]())  # Display the plot.
+            placeholder = st.columns(1)[0].container(border=True).empty()  # Create a single column layout.
+            placeholder.caption("Loading chart...")
+            with placeholder.container():
+                self.render_tile(type_graph)  # Display the plot.
+
+        # Downloads of the data behind the chart
+        self.set_downloads()
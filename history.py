@@ -0,0 +1,193 @@
+import datetime
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+
+import streamlit as st
+
+# Columns holding personal data: stored as keyed hashes, which keep distinct counts but not the values
+PRIVATE_COLUMNS = ["Email"]
+
+
+class HistoryStore:
+    """
+    This class keeps dated snapshots of the datasets in a local columnar store, so trends across cohorts and
+    years can be shown without reloading every past version. Snapshots are Parquet files partitioned by
+    dataset and date:
+
+        <folder>/<dataset>/snapshot=<YYYY-MM-DD>/<version>.parquet
+
+    Reads only open the partitions in the requested date range and only decode the requested columns.
+
+    Retention: snapshots older than `retention_days` (PIBSE_HISTORY_DAYS, 730 by default) are deleted
+    whenever a new snapshot is stored. Only the columns the dashboards use are stored (the caller projects
+    the frame), and the personal columns (PRIVATE_COLUMNS) are replaced by keyed hashes, so trends can
+    still count distinct people without keeping their addresses. The key is created with the store
+    (<folder>/.key, readable only by its owner).
+    """
+
+    def __init__(self, folder: str, retention_days: int = None):
+        """
+        :param folder: Root directory of the store (created if needed).
+        :param retention_days: Days a snapshot is kept. Defaults to PIBSE_HISTORY_DAYS (730).
+        """
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        if retention_days is None:
+            retention_days = int(os.environ.get("PIBSE_HISTORY_DAYS", 730))
+        self.retention_days = retention_days
+
+    def key(self):
+        """
+        :return: The secret key of the keyed hashes of the store, created on first use.
+        """
+        path = os.path.join(self.folder, ".key")
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                return f.read()
+        key = os.urandom(32)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        return key
+
+    def normalise(self, df):
+        """
+        Prepares a frame for Parquet: text columns mixing types (numbers and text, as hand-edited sheets
+        often do) are stored as text, and the personal columns are replaced by keyed hashes.
+
+        :param df: DataFrame to store.
+        :return: A new DataFrame.
+        """
+        import pandas as pd
+
+        df = df.copy()
+        for column in df.columns:
+            s = df[column]
+            if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True).startswith("mixed"):
+                df[column] = s.where(s.isna(), s.astype(str))
+
+        key = None
+        for column in PRIVATE_COLUMNS:
+            if column in df.columns:
+                key = key or self.key()
+                df[column] = df[column].map(
+                    lambda v: hmac.new(key, str(v).strip().lower().encode("utf-8"), hashlib.sha256).hexdigest()[:32],
+                    na_action="ignore")
+        return df
+
+    def prune(self, k: str, today: datetime.date = None):
+        """
+        Deletes the snapshots of a dataset older than the retention period.
+
+        :param k: Dataset label.
+        :param today: Reference date. Defaults to today.
+        :return: The list of deleted snapshot dates.
+        """
+        limit = ((today or datetime.date.today()) - datetime.timedelta(days=self.retention_days)).isoformat()
+        expired = [d for d in self.dates(k) if d < limit]
+        for date in expired:
+            shutil.rmtree(os.path.join(self.folder, k, f"snapshot={date}"), ignore_errors=True)
+        return expired
+
+    def append(self, k: str, df, date: datetime.date = None):
+        """
+        Stores the state of a dataset for a date. There is one snapshot per dataset and date: a newer version
+        of the same day replaces the previous one, and storing an already stored version does nothing.
+
+        :param k: Dataset label (e.g., 'alcance').
+        :param df: DataFrame to store (see normalise); its `attrs["version"]` names the file.
+        :param date: Date of the snapshot. Defaults to today.
+        :return: The path of the snapshot file.
+        """
+        date = (date or datetime.date.today()).isoformat()
+        version = df.attrs.get("version", "unversioned")
+        partition = os.path.join(self.folder, k, f"snapshot={date}")
+        path = os.path.join(partition, f"{version}.parquet")
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(partition, exist_ok=True)
+        # Hidden temporary name: dataset discovery ignores files starting with "."
+        fd, tmp = tempfile.mkstemp(dir=partition, prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            self.normalise(df).to_parquet(tmp, index=False)
+            os.replace(tmp, path)  # Readers only ever see complete files
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        # Drop the older versions of the same day.
+        for name in os.listdir(partition):
+            if name.endswith(".parquet") and name != os.path.basename(path):
+                os.remove(os.path.join(partition, name))
+        self.prune(k, datetime.date.fromisoformat(date))
+        return path
+
+    def dates(self, k: str):
+        """
+        :param k: Dataset label.
+        :return: The sorted list of snapshot dates (ISO strings) stored for the dataset.
+        """
+        folder = os.path.join(self.folder, k)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(x.split("=", 1)[1] for x in os.listdir(folder) if x.startswith("snapshot="))
+
+    def read(self, k: str, columns: list = None, start: str = None, end: str = None):
+        """
+        Reads the snapshots of a dataset, pruning the partitions outside the date range and the columns that
+        are not requested.
+
+        :param k: Dataset label.
+        :param columns: Columns to read. None reads every column.
+        :param start: First snapshot date to include (ISO string). None starts at the first snapshot.
+        :param end: Last snapshot date to include (ISO string). None ends at the last snapshot.
+        :return: A DataFrame with the requested columns and a 'snapshot' column with the snapshot date.
+        """
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not self.dates(k):
+            return pd.DataFrame(columns=(columns or []) + ["snapshot"])
+
+        dataset = ds.dataset(
+            os.path.join(self.folder, k), format="parquet",
+            partitioning=ds.partitioning(pa.schema([("snapshot", pa.string())]), flavor="hive"),
+            exclude_invalid_files=True
+        )
+
+        # ISO dates compare correctly as strings, so the filter prunes whole partitions.
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field("snapshot") >= start)
+        if end is not None:
+            conditions.append(ds.field("snapshot") <= end)
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+
+        if columns is not None:
+            # Schemas may differ across snapshots; ask only for the columns that exist.
+            columns = [c for c in columns if c in dataset.schema.names] + ["snapshot"]
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+@st.cache_data(ttl=600, max_entries=64)
+def read_history(folder: str, k: str, columns: tuple = None, start: str = None, end: str = None):
+    """
+    Cached read of the history store (see HistoryStore.read).
+
+    :param folder: Root directory of the store.
+    :param k: Dataset label.
+    :param columns: Columns to read.
+    :param start: First snapshot date to include.
+    :param end: Last snapshot date to include.
+    :return: A DataFrame with the requested columns and a 'snapshot' column.
+    """
+    return HistoryStore(folder).read(k, None if columns is None else list(columns), start, end)
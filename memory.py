@@ -0,0 +1,136 @@
+import pickle
+
+# Columns used by the dashboards for each dataset. Any other column is dropped by the compaction pass.
+DASHBOARD_COLUMNS = {
+    "psychometrics": ["Constructo", "Medición", "Medición inglés", "Medición inglés_sig", "D-cohen",
+                      "conf.low", "conf.high", "Significancia", "Comportamiento", "Subanálisis", "Pre", "Post"],
+    "alcance": ["Entidad", "Municipio", "Prioridad", "Tipo", "Implementación", "Email", "Centro de trabajo",
+                "Centro de trabajo verificado", "Tipo_cct", "Ben_directo"],
+    "municipios": ["Entidad", "Municipio", "Prioridad", "Municipio_Porcentaje"],
+    "municipios_alcanzados": ["Entidad", "Not Reached"]
+}
+DASHBOARD_COLUMNS.update({k: DASHBOARD_COLUMNS["psychometrics"]
+                          for k in ["educadores", "estudiantes_g1", "estudiantes_g2", "fls"]})
+
+
+class MemoryReport:
+    """
+    This class reports the memory taken by the datasets returned by `ProcessData.read_data` and provides
+    a compaction pass that shrinks them: low-cardinality text columns become categoricals, numeric columns
+    are downcast when no information is lost, and columns no dashboard uses are dropped.
+    """
+
+    def __init__(self, data: dict):
+        """
+        :param data: Dictionary of datasets, as returned by `ProcessData.read_data`.
+        """
+        self.data = data
+
+    def columns(self):
+        """
+        Deep memory usage of every column of every dataset.
+
+        :return: A DataFrame with the dataset, column, dtype, number of rows and bytes.
+        """
+        import pandas as pd
+
+        rows = []
+        for k, df in self.data.items():
+            usage = df.memory_usage(deep=True, index=False)
+            for column in df.columns:
+                rows.append({"dataset": k, "column": column, "dtype": str(df[column].dtype),
+                             "rows": len(df), "bytes": int(usage[column])})
+        return pd.DataFrame(rows, columns=["dataset", "column", "dtype", "rows", "bytes"])
+
+    def datasets(self):
+        """
+        Deep memory usage of every dataset.
+
+        :return: A DataFrame with the dataset, rows, columns and bytes (index included).
+        """
+        import pandas as pd
+
+        return pd.DataFrame([{"dataset": k, "rows": len(df), "columns": df.shape[1],
+                              "bytes": int(df.memory_usage(deep=True, index=True).sum())}
+                             for k, df in self.data.items()])
+
+    def summary(self, sessions: int = 1):
+        """
+        Process-level figures. `st.cache_data` keeps one pickled copy of the datasets and returns a fresh
+        unpickled copy on every rerun, so each active session adds roughly one full copy of the frames.
+
+        :param sessions: Number of concurrent sessions to estimate the total for.
+        :return: A dictionary with the cache size, the per-session copy and the estimated total in bytes.
+        """
+        cache_bytes = len(pickle.dumps(self.data, protocol=pickle.HIGHEST_PROTOCOL))
+        session_bytes = int(self.datasets()["bytes"].sum())
+        return {
+            "cache_bytes": cache_bytes,
+            "session_bytes": session_bytes,
+            "sessions": sessions,
+            "total_bytes": cache_bytes + sessions * session_bytes
+        }
+
+    @staticmethod
+    def compact_frame(df, columns: list = None, max_ratio: float = 0.5, min_rows: int = 1000):
+        """
+        Compacts a single DataFrame.
+
+        :param df: DataFrame to compact.
+        :param columns: Columns to keep. None keeps every column.
+        :param max_ratio: Text columns become categoricals when their number of distinct values is at most
+                          this fraction of the rows (e.g., 'Entidad', 'Prioridad', 'Tipo', 'Constructo').
+        :param min_rows: Frames with fewer rows keep their text columns, since categoricals only pay off
+                         when the rows far outnumber the categories.
+        :return: The compacted DataFrame (a new object; attrs such as the version are kept).
+        """
+        import numpy as np
+        import pandas as pd
+
+        attrs = dict(df.attrs)
+        if columns is not None:
+            df = df[[c for c in df.columns if c in columns]]
+        df = df.copy()
+
+        for column in df.columns:
+            series = df[column]
+            if series.dtype == object and len(series) >= min_rows:
+                # Only convert pure text columns, so mixed columns keep their values untouched.
+                if series.dropna().map(type).eq(str).all() and series.nunique() <= max_ratio * len(series):
+                    df[column] = series.astype("category")
+            elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                df[column] = pd.to_numeric(series, downcast="integer")
+            elif pd.api.types.is_float_dtype(series):
+                # Floats are downcast only when float32 holds exactly the same values.
+                downcast = series.astype(np.float32)
+                if np.array_equal(downcast.astype(np.float64).to_numpy(), series.to_numpy(), equal_nan=True):
+                    df[column] = downcast
+
+        df.attrs.update(attrs)
+        return df
+
+    def compact(self, columns: dict = None, **kwargs):
+        """
+        Compacts every dataset.
+
+        :param columns: Columns to keep per dataset. Defaults to DASHBOARD_COLUMNS; datasets missing from it
+                        keep every column.
+        :param kwargs: Options of compact_frame (max_ratio, min_rows).
+        :return: A new MemoryReport over the compacted datasets.
+        """
+        columns = DASHBOARD_COLUMNS if columns is None else columns
+        return MemoryReport({k: self.compact_frame(df, columns.get(k), **kwargs) for k, df in self.data.items()})
+
+    def compare(self, other):
+        """
+        Compares the dataset sizes of this report (before) with another one (after).
+
+        :param other: MemoryReport, usually the result of compact().
+        :return: A DataFrame with the bytes before and after, and the saved fraction per dataset.
+        """
+        before = self.datasets().set_index("dataset")["bytes"].rename("before_bytes")
+        after = other.datasets().set_index("dataset")["bytes"].rename("after_bytes")
+        result = before.to_frame().join(after)
+        result.loc["total"] = result.sum()
+        result["saved"] = 1 - result["after_bytes"] / result["before_bytes"]
+        return result.reset_index()
@@ -1,7 +1,11 @@
 import streamlit as st
 from dashboard import CreateDashboard
+from effects import apply_bootstrap
 from graphs import CreateGraphs
+from payload import configure_json_engine
 from processing import ProcessData
+from warmup import get_warmup
+from views import get_indexed_views
 
 
 class DashboardOutcomes(CreateDashboard):
@@ -10,6 +14,8 @@ class DashboardOutcomes(CreateDashboard):
     for educational program data. It inherits from the CreateDashboard class, allowing for
     a structured dashboard interface and functionality.
     """
+    # Datasets of the page in loading order: the sidebar needs 'estudiantes_g2' first
+    datasets = ["estudiantes_g2", "educadores", "fls", "estudiantes_g1"]
 
     def __init__(self, df):
         """
@@ -17,16 +23,40 @@ class DashboardOutcomes(CreateDashboard):
 
         :param df: DataFrame containing the data for various educational outcomes, including
                    information about educators, students, and their respective measurements.
+                   Only 'estudiantes_g2' is required; the other datasets can arrive later
+                   (see launch_dashboard).
         """
         # Call the parent class constructor to initialize base dashboard functionalities
         super().__init__(df)
 
+        # Index the 'estudiantes_g2' subanalyses once per data version
+        g2 = self.df["estudiantes_g2"]
+        self.g2_views = get_indexed_views(g2, ProcessData.dataset_version(g2))
+        # Subanalysis, pre and post measurements displayed for Teenagers Groups 3, 4 & 5
+        self.subanalysis = ("Todos-as 1+ CA", "inicial", "final")
+
         # Define the options for graphs that will be displayed in the dashboard
+        self.set_graph_options()
+
+        # Set the default graph option to "Outcome Graphs (Horizontal)"
+        self.option = "Outcome Graphs (Horizontal)"
+
+    def set_graph_options(self):
+        """
+        Builds the configuration of every graph option. The 'estudiantes_g2' graphs use the rows of
+        the selected subanalysis and measurement window (self.subanalysis).
+
+        :return: None; sets self.graph_options.
+        """
+        # Rows of 'estudiantes_g2' for the selected subanalysis and measurement window. The other
+        # datasets are None while they are loading.
+        g2 = self.g2_views.view(*self.subanalysis)
+
         self.graph_options = {
             "Outcome Graphs (Vertical)": {
                 "Professionals": {
                     # Data for educators
-                    "df": self.df["educadores"],
+                    "df": self.df.get("educadores"),
                     "x": "Medición inglés",  # X-axis measurement
                     "y": "D-cohen",  # Y-axis measurement
                     "type_graph": "barchart",  # Type of graph
@@ -43,7 +73,7 @@ class DashboardOutcomes(CreateDashboard):
                 },
                 # Additional graph configurations for different educator and student groups go here...
                 "Professionals_FLS": {
-                    "df": self.df["fls"],
+                    "df": self.df.get("fls"),
                     "x": "Medición inglés",
                     "y": "D-cohen",
                     "type_graph": "barchart",
@@ -60,7 +90,7 @@ class DashboardOutcomes(CreateDashboard):
                     "legend_translation": "Constructo"
                 },
                 "Teenagers_g1": {
-                    "df": self.df["estudiantes_g1"],
+                    "df": self.df.get("estudiantes_g1"),
                     "x": "Medición inglés",
                     "y": "D-cohen",
                     "type_graph": "barchart",
@@ -76,8 +106,7 @@ class DashboardOutcomes(CreateDashboard):
                     "legend_translation": "Constructo"
                 },
                 "Teenagers_g2": {
-                    "df": self.df["estudiantes_g2"].query("Subanálisis == 'Todos-as 1+ CA' "
-                                                          "& Pre == 'inicial' & Post == 'final'"),
+                    "df": g2,
                     "x": "Medición inglés",
                     "y": "D-cohen",
                     "type_graph": "barchart",
@@ -97,7 +126,7 @@ class DashboardOutcomes(CreateDashboard):
             # and "Outcome Summary Table" will go here...
             "Outcome Graphs (Horizontal)": {
                 "Professionals": {
-                    "df": self.df["educadores"],
+                    "df": self.df.get("educadores"),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés",
@@ -114,7 +143,7 @@ class DashboardOutcomes(CreateDashboard):
                     "show_legend": False  # Hide the legend for this graph
                 },
                 "Professionals_FLS": {
-                    "df": self.df["fls"],
+                    "df": self.df.get("fls"),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés",
@@ -132,7 +161,7 @@ class DashboardOutcomes(CreateDashboard):
                     "show_legend": False
                 },
                 "Teenagers_g1": {
-                    "df": self.df["estudiantes_g1"],
+                    "df": self.df.get("estudiantes_g1"),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés",
@@ -149,8 +178,7 @@ class DashboardOutcomes(CreateDashboard):
                     "show_legend": False
                 },
                 "Teenagers_g2": {
-                    "df": self.df["estudiantes_g2"].query("Subanálisis == 'Todos-as 1+ CA' "
-                                                          "& Pre == 'inicial' & Post == 'final'"),
+                    "df": g2,
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés",
@@ -169,7 +197,7 @@ class DashboardOutcomes(CreateDashboard):
             },
             "Detailed Outcome Graphs": {
                 "Professionals": {
-                    "df": self.df["educadores"],
+                    "df": apply_bootstrap("educadores", self.df.get("educadores")),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés_sig",
@@ -186,7 +214,7 @@ class DashboardOutcomes(CreateDashboard):
                     "legend_translation": "Comportamiento"
                 },
                 "Professionals_FLS": {
-                    "df": self.df["fls"],
+                    "df": apply_bootstrap("fls", self.df.get("fls")),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés_sig",
@@ -203,7 +231,7 @@ class DashboardOutcomes(CreateDashboard):
                     "legend_translation": "Comportamiento"
                 },
                 "Teenagers_g1": {
-                    "df": self.df["estudiantes_g1"],
+                    "df": apply_bootstrap("estudiantes_g1", self.df.get("estudiantes_g1")),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés_sig",
@@ -220,8 +248,7 @@ class DashboardOutcomes(CreateDashboard):
                     "legend_translation": "Comportamiento"
                 },
                 "Teenagers_g2": {
-                    "df": self.df["estudiantes_g2"].query("Subanálisis == 'Todos-as 1+ CA' "
-                                                          "& Pre == 'inicial' & Post == 'final'"),
+                    "df": apply_bootstrap("estudiantes_g2", g2),
                     "disaggregate": "Constructo",
                     "x": "D-cohen",
                     "y": "Medición inglés_sig",
@@ -243,13 +270,13 @@ class DashboardOutcomes(CreateDashboard):
                 "general": {
                     "data": {
                         # Data for summary table from different educational groups
-                        "df1": self.df["educadores"],
-                        "df2": self.df["fls"],
-                        "df3": self.df["estudiantes_g1"],
-                        "df4": self.df["estudiantes_g2"].query("Subanálisis == 'Todos-as 1+ CA' "
-                                                               "& Pre == 'inicial' & Post == 'final'")
+                        "df1": self.df.get("educadores"),
+                        "df2": self.df.get("fls"),
+                        "df3": self.df.get("estudiantes_g1"),
+                        "df4": g2
                     },
                     "type_graph": "summary_table",  # Type set for summary table
+                    "page_size": 2,  # Constructs per page; None draws the whole table at once
                     "color_scale": "Comportamiento",  # Color scale used for table visualization
                     "title": "Outcome Summary Table",  # Title for the summary table
                     "xaxis_name": ["Professional Development", "Systemic Leadership Training",
@@ -258,9 +285,6 @@ class DashboardOutcomes(CreateDashboard):
             }
         }
 
-        # Set the default graph option to "Outcome Graphs (Horizontal)"
-        self.option = "Outcome Graphs (Horizontal)"
-
     def set_sidebar(self):
         """
         Configures the sidebar of the Streamlit dashboard, allowing users to select a graph option
@@ -280,7 +304,26 @@ class DashboardOutcomes(CreateDashboard):
                 options=self.graph_options.keys()  # Options are the keys from the graph_options dictionary
             )
 
-    def launch_dashboard(self):
+            # Select the subanalysis and measurement window for Teenagers Groups 3, 4 & 5.
+            # Only combinations present in the data are offered.
+            st.write("Teenagers Groups 3, 4 & 5")
+            subanalyses = self.g2_views.values("Subanálisis")
+            subanalysis = st.selectbox(
+                label="Subanalysis",
+                options=subanalyses,
+                index=subanalyses.index(self.subanalysis[0]) if self.subanalysis[0] in subanalyses else 0
+            )
+            windows = [(pre, post) for sub, pre, post in self.g2_views.keys() if sub == subanalysis]
+            window = st.selectbox(
+                label="Measurement window",
+                options=windows,
+                index=windows.index(self.subanalysis[1:]) if self.subanalysis[1:] in windows else 0,
+                format_func=lambda w: f"{w[0]} → {w[1]}"  # e.g., "inicial → final"
+            )
+            if subanalysis is not None and window is not None:
+                self.subanalysis = (subanalysis, *window)
+
+    def launch_dashboard(self, stream=None):
         """
         Launches the outcomes dashboard by configuring the header, sidebar,
         and displaying the relevant graphs based on the user's selection.
@@ -291,26 +334,45 @@ class DashboardOutcomes(CreateDashboard):
         displayed with its title as a subtitle, and the appropriate plotting
         function is called to generate the graph visuals.
 
+        :param stream: Remaining (key, DataFrame) pairs of ProcessData.iter_data. Graphs are drawn as soon
+                       as their datasets arrive. None when every dataset is already loaded.
         :return: None
         """
         # Set the main header of the dashboard
         self.set_header("Outcomes")
 
         # Set the sidebar options for graph selection
+        selected = self.subanalysis
         self.set_sidebar()
 
-        # Iterate through the selected graph options and display each graph
-        for k in self.graph_options[self.option]:
-            data = self.graph_options[self.option][k]  # Get data configuration for the current graph
-            st.write(" ")  # Add a space for better visual separation
-            # st.write(data["df"])
-            if "df" in data and data["df"].empty:
-                continue
-            # Set the subtitle header for the current graph
-            self.set_header(data["title"], type_header="subtitle")
-            # Create the graph using the specified configuration
-            CreateGraphs(data).set_plots_grid(type_graph=data["type_graph"])
+        # Rebuild the graph options when another subanalysis or measurement window was selected
+        if self.subanalysis != selected:
+            self.set_graph_options()
+
+        # Display each graph of the selected option as soon as its data is ready
+        self.render_charts(stream)
+
+    def draw_chart(self, data: dict):
+        """
+        Draws one graph of the selected option; graphs without rows are skipped.
+
+        :param data: Data configuration of the graph.
+        :return: None
+        """
+        st.write(" ")  # Add a space for better visual separation
+        if "df" in data and data["df"].empty:
+            return
+        # Set the subtitle header for the current graph
+        self.set_header(data["title"], type_header="subtitle")
+        # Create the graph using the specified configuration
+        CreateGraphs(data).set_plots_grid(type_graph=data["type_graph"])
 
 
-st.set_page_config(layout="wide")
-DashboardOutcomes(ProcessData().read_data()).launch_dashboard()
+# Streamlit runs pages as "__main__"; the guard lets tools import the dashboard classes.
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    configure_json_engine()  # orjson for the figures sent to the browser, set once per server process
+    get_warmup()  # Prepares the data and every figure once per server process, in the background
+    # Stream the page datasets; the page starts as soon as 'estudiantes_g2' is ready
+    stream = ProcessData().iter_data(DashboardOutcomes.datasets)
+    DashboardOutcomes(DashboardOutcomes.collect(stream, ["estudiantes_g2"])).launch_dashboard(stream)
@@ -0,0 +1,183 @@
+import streamlit as st
+from dashboard import CreateDashboard
+from graphs import CreateGraphs
+from payload import configure_json_engine
+from history import HistoryStore, read_history
+from processing import ProcessData
+
+
+class DashboardTrends(CreateDashboard):
+    """
+    DashboardTrends class shows how reach and effect sizes evolved across cohorts and years. It reads the
+    dated snapshots of the history store (see history.py) instead of the current datasets, and only the
+    partitions and columns each trend needs.
+    """
+
+    def __init__(self, folder: str):
+        """
+        Initializes the DashboardTrends instance with the folder of the history store.
+
+        :param folder: Root directory of the history store (PIBSE_HISTORY_DIR).
+        """
+        # The trends read the history store, so the base class gets no current DataFrame
+        super().__init__(None)
+
+        self.folder = folder
+        # Every stored snapshot date, taken from the reach dataset (refreshed with all the others)
+        self.dates = HistoryStore(folder).dates("alcance")
+        # Date range of the snapshots displayed; None means unbounded
+        self.window = (None, None)
+        # Default graph option
+        self.option = "Reach Over Time"
+
+        # Define the options for graphs that will be displayed in the dashboard
+        self.set_graph_options()
+
+    def effect_sizes(self, k: str):
+        """
+        Reads the mean D-Cohen per construct of every snapshot of a psychometric dataset.
+
+        :param k: Dataset label (e.g., 'educadores').
+        :return: A DataFrame with the columns 'snapshot', 'Constructo' and 'D-cohen'.
+        """
+        start, end = self.window
+        columns = ("Constructo", "D-cohen", "Subanálisis", "Pre", "Post")
+        df = read_history(self.folder, k, columns, start, end)
+
+        # Teenagers Groups 3, 4 & 5 hold several subanalyses; keep the one shown on the Outcomes page
+        if "Subanálisis" in df.columns:
+            df = df[(df["Subanálisis"] == "Todos-as 1+ CA") & (df["Pre"] == "inicial") & (df["Post"] == "final")]
+
+        return df.groupby(["snapshot", "Constructo"], observed=True, as_index=False)["D-cohen"].mean()
+
+    def set_graph_options(self):
+        """
+        Builds the configuration of every graph option for the selected date range (self.window).
+
+        :return: None; sets self.graph_options.
+        """
+        start, end = self.window
+
+        # Distinct educators per state in every snapshot; only three columns of the reach dataset are read.
+        # Students are left out as on the Beneficiaries page (educator implementations contain "Educadores")
+        alcance = read_history(self.folder, "alcance", ("Entidad", "Email", "Implementación"), start, end)
+        alcance = alcance[alcance["Implementación"].astype(str).str.contains("Educadores")]
+        reach = alcance.groupby(["snapshot", "Entidad"], observed=True, as_index=False)["Email"].nunique()
+
+        # Shared configuration of the effect size trends
+        effect = {
+            "x": "snapshot",
+            "y": "D-cohen",
+            "type_graph": "linechart",
+            "color": "Constructo",
+            "xaxis_name": "Snapshot",
+            "yaxis_name": "Mean D-Cohen",
+            "legend_name": None,
+            "show_legend": True,
+            "legend_translation": "Constructo"
+        }
+
+        self.graph_options = {
+            "Reach Over Time": {
+                "states": {
+                    "df": reach,
+                    "x": "snapshot",  # Snapshot date on the x-axis
+                    "y": "Email",  # Number of distinct educators
+                    "type_graph": "linechart",  # One line per state
+                    "color": "Entidad",
+                    "title": "Educators Reached per State",
+                    "xaxis_name": "Snapshot",
+                    "yaxis_name": "Number of Educators",
+                    "legend_name": "State",
+                    "show_legend": True,
+                    "legend_translation": None
+                }
+            },
+            "Effect Sizes Across Waves": {
+                "Professionals": {
+                    "df": self.effect_sizes("educadores"),
+                    "title": "Effect Sizes: Professional Development",
+                    **effect
+                },
+                "Professionals_FLS": {
+                    "df": self.effect_sizes("fls"),
+                    "title": "Effect Sizes: Systemic Leadership Training",
+                    **effect
+                },
+                "Teenagers_g1": {
+                    "df": self.effect_sizes("estudiantes_g1"),
+                    "title": "Effect Sizes: Teenagers Groups 1 & 2",
+                    **effect
+                },
+                "Teenagers_g2": {
+                    "df": self.effect_sizes("estudiantes_g2"),
+                    "title": "Effect Sizes: Teenagers Groups 3, 4 & 5",
+                    **effect
+                }
+            }
+        }
+
+    def set_sidebar(self):
+        """
+        Configures the sidebar: the graph option and the range of snapshot dates displayed.
+
+        :return: None
+        """
+        with st.sidebar:
+            # Create a select box in the sidebar for users to choose a graph option
+            self.option = st.selectbox(
+                label="Default",
+                label_visibility="collapsed",
+                options=self.graph_options.keys()
+            )
+
+            # Range of snapshots; partitions outside the range are not read at all
+            if len(self.dates) > 1:
+                self.window = st.select_slider(
+                    label="Snapshots",
+                    options=self.dates,
+                    value=(self.dates[0], self.dates[-1])
+                )
+
+    def launch_dashboard(self):
+        """
+        Launches the trends dashboard: header, sidebar, and the graphs of the selected option.
+
+        :return: None
+        """
+        # Set the main header of the dashboard
+        self.set_header("Trends")
+
+        # Set the sidebar options for graph selection
+        selected = self.window
+        self.set_sidebar()
+
+        # Rebuild the graph options when another date range was selected
+        if self.window != selected:
+            self.set_graph_options()
+
+        if not self.dates:
+            st.info("No snapshots stored yet. They are added every time the datasets are refreshed.")
+            return
+
+        # Iterate through the selected graph options and display each graph
+        for k in self.graph_options[self.option]:
+            data = self.graph_options[self.option][k]
+            st.write(" ")  # Add a space for better visual separation
+            if data["df"].empty:
+                continue
+            # Set the subtitle header for the current graph
+            self.set_header(data["title"], type_header="subtitle")
+            # Create the graph using the specified configuration
+            CreateGraphs(data).set_plots_grid(type_graph=data["type_graph"])
+
+
+# Streamlit runs pages as "__main__"; the guard lets tools import the dashboard classes.
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    configure_json_engine()  # orjson for the figures sent to the browser, set once per server process
+    folder = ProcessData().history_dir
+    if folder:
+        DashboardTrends(folder).launch_dashboard()
+    else:
+        st.info("Trends need a history store: set PIBSE_HISTORY_DIR to keep dated snapshots of the datasets.")
@@ -0,0 +1,116 @@
+import time
+
+import streamlit as st
+
+
+@st.cache_resource
+def configure_json_engine():
+    """
+    Switches Plotly's JSON engine to orjson, when installed, for every figure serialized by Plotly (and
+    Streamlit) in this process. Called once at start-up by the pages and the API server.
+
+    :return: The name of the engine in use.
+    """
+    import importlib.util
+    import plotly.io as pio
+
+    if importlib.util.find_spec("orjson") is not None:
+        pio.json.config.default_engine = "orjson"
+    return pio.json.config.default_engine
+
+
+class FigurePayload:
+    """
+    This class slims Plotly figures before they are handed to `plotly_chart`. It provides a single small
+    template that CreateGraphs passes to every figure it creates (instead of the default Plotly template)
+    and rounds numeric arrays so they serialize to short numbers. It also keeps track of the bytes and
+    serialization time of the figures sent during a page run.
+    """
+    template_name = "pibse"  # Name of the shared template registered in plotly.io.templates
+
+    def __init__(self, precision: int = 4):
+        """
+        Initializes the payload slimmer.
+
+        :param precision: Number of decimals kept in numeric arrays (e.g., D-cohen values and error bars).
+        """
+        self.precision = precision
+        self.stats = {"figures": 0, "bytes": 0, "seconds": 0.0}  # Accumulated payload measurements
+
+    @classmethod
+    def shared_template(cls):
+        """
+        Registers (once) and returns the template shared by all figures. It only holds the theme settings
+        the dashboards rely on, instead of the several kilobytes of defaults of the "plotly" template.
+
+        :return: The name of the registered template.
+        """
+        import plotly.graph_objects as go
+        import plotly.io as pio
+
+        if cls.template_name not in pio.templates:
+            pio.templates[cls.template_name] = go.layout.Template(layout={
+                "paper_bgcolor": "#F5F0EA",  # Same background color used by CreateGraphs
+                "plot_bgcolor": "#F5F0EA",
+                "font": {"color": "#2a3f5f"},
+                "xaxis": {"automargin": True, "gridcolor": "white", "zerolinecolor": "white"},
+                "yaxis": {"automargin": True, "gridcolor": "white", "zerolinecolor": "white"},
+                "hovermode": "closest"
+            })
+
+        return cls.template_name
+
+    def _round(self, values):
+        """
+        Rounds a numeric array-like to the configured precision. Non-numeric values are returned untouched.
+
+        :param values: Trace attribute value (tuple, list or numpy array).
+        :return: The rounded numpy array, or the original value if it is not numeric.
+        """
+        import numpy as np
+
+        if values is None or isinstance(values, str):
+            return values
+        array = np.asarray(values)
+        if array.dtype.kind != "f":
+            return values
+        return np.round(array, self.precision)
+
+    def slim(self, fig):
+        """
+        Slims a figure in place: rounds the numeric arrays of every trace. The shared template is set when
+        the figure is created (see shared_template), so the styling Plotly Express derives from it is kept.
+
+        :param fig: Plotly figure created by CreateGraphs.
+        :return: The same figure, ready to be passed to `plotly_chart`.
+        """
+        for trace in fig.data:
+            # Coordinates and heatmap values
+            for attr in ("x", "y", "z"):
+                if attr in trace and trace[attr] is not None:
+                    trace[attr] = self._round(trace[attr])
+
+            # Error bars of the forest plots
+            if "error_x" in trace and trace.error_x.array is not None:
+                trace.error_x.array = self._round(trace.error_x.array)
+                trace.error_x.arrayminus = self._round(trace.error_x.arrayminus)
+
+        return fig
+
+    def measure(self, fig):
+        """
+        Serializes a figure the same way Streamlit does and records its size and serialization time.
+
+        :param fig: Plotly figure to measure.
+        :return: A tuple (bytes, seconds) for this figure.
+        """
+        import plotly.io as pio
+
+        start = time.perf_counter()
+        size = len(pio.to_json(fig, validate=False).encode("utf-8"))
+        elapsed = time.perf_counter() - start
+
+        self.stats["figures"] += 1
+        self.stats["bytes"] += size
+        self.stats["seconds"] += elapsed
+        return size, elapsed
@@ -1,11 +1,20 @@
 import streamlit as st
-from pydrive.auth import GoogleAuth
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
-from io import BytesIO
+import logging
+import os
+import threading
+import time
+from collections import Counter
 
-import pandas as pd
-import requests
+from cache import get_shared_cache
+from changes import get_change_feed
+from cube import get_unreached_municipalities
+from memory import DASHBOARD_COLUMNS, MemoryReport
+from history import HistoryStore
+from singleflight import get_single_flight
+from snapshot import get_snapshot_store
+from workbook import read_sheet, spool
+
+logger = logging.getLogger(__name__)
 
 
 class ProcessData:
@@ -14,6 +23,12 @@ class ProcessData:
     and Excel files stored in Google Drive. The data is fetched based on
     sheet identifiers and cached to improve performance.
     """
+    # Datasets computed from downloaded ones, with the datasets they are computed from (see derive_datasets)
+    derived = {"municipios_alcanzados": ("municipios", "alcance")}
+    # Number of downloads per dataset label in this process, shared by all instances
+    downloads = Counter()
+    downloads_lock = threading.Lock()
+
     def __init__(self):
         """
         Initializes the ProcessData class by setting up the identifiers for
@@ -59,55 +74,400 @@ class ProcessData:
                 "sheetname": "Sheet1",
                 "type": "excel",
                 "engine": "openpyxl"
-            },
-            "municipios_alcanzados": {
-                "key": "1kINeWvQv5yrr62zNKgoXATqJwmosGTVd",
-                "sheetname": "Sheet1",
-                "type": "excel",
-                "engine": "openpyxl"
             }
+            # 'municipios_alcanzados' is derived from 'municipios' and 'alcance' (see derive_datasets)
         }
         # Dictionary to store the loaded data
         self.data = {}
+        # Service account credentials, created on the first download
+        self.__credentials = None
+        # Local folder with one "<label>.xlsx" file per dataset (e.g., fixtures for load tests).
+        # When set, the files are read from it instead of Google Drive.
+        self.data_dir = os.environ.get("PIBSE_DATA_DIR")
+        # Base URLs of the Drive API and of the Google Sheets export (overridden by local fakes in tests).
+        self.drive_api = os.environ.get("PIBSE_DRIVE_API", "https://www.googleapis.com/drive/v3")
+        self.docs_url = os.environ.get("PIBSE_DOCS_URL", "https://docs.google.com")
+        # Seconds between two polls of the Drive changes feed. 0 keeps the loaded data until restart.
+        self.refresh_interval = float(os.environ.get("PIBSE_REFRESH_SECONDS", 0))
+        # Folder of the memory-mapped Arrow snapshots shared by all worker processes (disabled if unset)
+        self.snapshot_dir = os.environ.get("PIBSE_SNAPSHOT_DIR")
+        # Age in seconds past which a process checks the snapshot against the sources when it starts
+        self.snapshot_max_age = float(os.environ.get("PIBSE_SNAPSHOT_MAX_AGE", 3600))
+        # Folder of the dated history of every dataset, used by the trend views (disabled if unset)
+        self.history_dir = os.environ.get("PIBSE_HISTORY_DIR")
+
+    def get_credentials(self):
+        """
+        Builds the service account credentials used to download the files. The credentials are
+        only created when a dataset actually has to be downloaded, and are reused afterwards.
+
+        :return: Refreshed service account credentials.
+        """
+        if self.__credentials is None:
+            # Heavy dependencies are imported here rather than at module level so that
+            # importing this module (and painting the page header) stays cheap.
+            from google.oauth2 import service_account
+            from google.auth.transport.requests import Request
+
+            # Use service account credentials to authenticate with Google Drive API
+            credentials = service_account.Credentials.from_service_account_info(
+                st.secrets["connections"],  # Use secret credentials stored in Streamlit config
+                scopes=["https://www.googleapis.com/auth/drive"]  # Scope to access Google Drive files
+            )
+            # Ensure credentials are valid and refresh if necessary
+            credentials.refresh(Request())
+            self.__credentials = credentials
+        return self.__credentials
 
-    @st.cache_data
-    def read_data(_self):
+    def download(self, k: str):
+        """
+        Downloads the file of a dataset from Google Drive. The response is streamed in chunks into a spooled
+        temporary file (see workbook.spool), so a large workbook is never held in memory as a whole.
+
+        :param k: Dataset label (e.g., 'educadores').
+        :return: A tuple (file object with the Excel workbook, SHA-1 hex digest of its content).
+        """
+        # Count the fetches of every dataset (reported by tools/load_test.py)
+        with ProcessData.downloads_lock:
+            ProcessData.downloads[k] += 1
+
+        # Local files take the place of Google Drive when a data folder is configured
+        if self.data_dir:
+            with open(os.path.join(self.data_dir, f"{k}.xlsx"), "rb") as f:
+                return spool(iter(lambda: f.read(1024 ** 2), b""))
+
+        import requests
+
+        i = self.__sheets_ids[k]
+        key = i["key"]  # Extract the Google Drive key (file ID)
+
+        # If the file is a Google Sheet, construct a URL to export it as Excel
+        if i["type"] == "gsheets":
+            url = f"{self.docs_url}/spreadsheets/export?id={key}&exportFormat=xlsx"
+        else:
+            # For Excel files, use the Google Drive API to download the file
+            url = f"{self.drive_api}/files/{key}?alt=media"
+
+        # Send a GET request to download the file from the constructed URL, reading the body in 1 MB chunks
+        with requests.get(url, headers=self.auth_headers(), stream=True, timeout=60) as rqst:
+            rqst.raise_for_status()
+            return spool(rqst.iter_content(chunk_size=1024 ** 2))
+
+    def auth_headers(self):
+        """
+        :return: The authorization headers of the Drive requests. Custom API URLs (local fakes) are
+                 called without credentials.
+        """
+        if self.drive_api != "https://www.googleapis.com/drive/v3":
+            return {}
+        return {"Authorization": f"Bearer {self.get_credentials().token}"}
+
+    def dataset_cache_key(self, k: str):
+        """
+        :param k: Dataset label (e.g., 'educadores').
+        :return: Key of the parsed dataset in the shared cache.
+        """
+        i = self.__sheets_ids[k]
+        source = self.data_dir or i["key"]  # Local files never share cache entries with Drive files
+        return f"dataset:{k}:{source}:{i['sheetname']}"
+
+    def refresh(self, force: bool = False):
+        """
+        Polls the Drive changes feed (one request for all files) and invalidates only the datasets whose
+        files changed: their shared cache entries are deleted and their generation is increased, so the
+        next read_data call reads them again while the other datasets stay cached.
+
+        :param force: Poll even if the refresh interval has not elapsed.
+        :return: The list of dataset labels that changed.
+        """
+        feed = get_change_feed(self.drive_api, self.refresh_interval)
+        file_ids = {i["key"]: k for k, i in self.__sheets_ids.items()}
+
+        changed = feed.poll(file_ids, self.auth_headers(), force=force)
+        for k in changed:
+            get_shared_cache().delete(self.dataset_cache_key(k))
+        return changed
+
+    def generation(self, k: str):
+        """
+        :param k: Dataset label.
+        :return: The number of times the file of the dataset changed since the process started.
+        """
+        if not self.refresh_interval:
+            return 0
+        return get_change_feed(self.drive_api, self.refresh_interval).generations[k]
+
+    def keys(self):
+        """
+        :return: The list of dataset labels (e.g., 'educadores', 'alcance').
+        """
+        return list(self.__sheets_ids)
+
+    def file_id(self, k: str):
+        """
+        :param k: Dataset label (e.g., 'educadores').
+        :return: The Google Drive file ID of the dataset.
+        """
+        return self.__sheets_ids[k]["key"]
+
+    def read_dataset(self, k: str, compact: bool = True):
+        """
+        Reads one dataset. The parsed frame is looked up in the shared cache first, so a dataset
+        downloaded by another Streamlit process on the same host is not downloaded again. Concurrent
+        sessions missing the cache wait for a single download instead of each starting their own.
+
+        The frame carries a fingerprint of the downloaded file in ``df.attrs["version"]``.
+
+        :param k: Dataset label (e.g., 'educadores').
+        :param compact: If True, the frame goes through the MemoryReport compaction pass (categoricals,
+                        downcast numerics, unused columns dropped). Raw frames bypass the shared cache.
+        :return: The dataset as a DataFrame.
+        """
+        cache_key = self.dataset_cache_key(k)
+        df = get_shared_cache().get_frame(cache_key) if compact else None
+        if df is None:
+            df = get_single_flight().do(f"dataset:{cache_key}:{compact}", self.fetch_dataset, k, compact)
+        return df
+
+    def fetch_dataset(self, k: str, compact: bool = True):
+        """
+        Downloads and parses one dataset, and stores it in the shared cache (see read_dataset).
+
+        :param k: Dataset label (e.g., 'educadores').
+        :param compact: If True, the frame is compacted and stored in the shared cache.
+        :return: The dataset as a DataFrame.
+        """
+        i = self.__sheets_ids[k]
+        cache = get_shared_cache()
+        cache_key = self.dataset_cache_key(k)
+
+        # A call that finished just before this one was started may have filled the cache already
+        df = cache.get_frame(cache_key) if compact else None
+        if df is not None:
+            return df
+
+        start = time.perf_counter()
+        f, version = self.download(k)
+
+        # Read the downloaded workbook row by row into typed columns
+        with f:
+            df = read_sheet(f, i["sheetname"], i["engine"])
+        df.attrs["version"] = version
+
+        # Keep a dated snapshot of every state read from the source
+        if self.history_dir:
+            # Only the columns the dashboards use; a snapshot that cannot be stored must not block the page
+            columns = [c for c in DASHBOARD_COLUMNS.get(k, df.columns) if c in df.columns]
+            try:
+                HistoryStore(self.history_dir).append(k, df[columns])
+            except Exception:
+                logger.exception("Could not store the history snapshot of %s", k)
+
+        if compact:
+            df = MemoryReport.compact_frame(df, DASHBOARD_COLUMNS.get(k))
+            cache.set_frame(cache_key, df)
+        cache.record_load(cache_key, time.perf_counter() - start)
+        return df
+
+    @staticmethod
+    def dataset_version(df):
+        """
+        Returns the fingerprint of a dataset. Frames read by read_dataset carry it in
+        ``df.attrs["version"]``, and so do the frames derived from them with derive_version; for any other
+        frame it is computed from the content.
+
+        pandas copies `attrs` to the frames derived from a dataset (filters, `.loc`, `assign`, ...), so code
+        that derives a frame from a versioned one must give it its own version with derive_version.
+
+        :param df: DataFrame.
+        :return: A hexadecimal fingerprint.
+        """
+        if "version" in df.attrs:
+            return df.attrs["version"]
+        return ProcessData.content_version(df)
+
+    @staticmethod
+    def content_version(df):
+        """
+        Computes the fingerprint of a frame from its columns and values, ignoring `attrs`.
+
+        :param df: DataFrame.
+        :return: A hexadecimal fingerprint.
+        """
+        import hashlib
+        import pandas as pd
+
+        digest = hashlib.sha1(str(list(df.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def derive_version(df, parent: str, *params):
+        """
+        Gives a frame derived from a versioned dataset (a filtered subset, a view, ...) a version of its own,
+        computed from the version of the parent and the parameters of the derivation.
+
+        :param df: Derived DataFrame (a new frame, never the parent itself).
+        :param parent: Version of the parent dataset.
+        :param params: Parameters that determine the derived rows (e.g., the selected filters).
+        :return: The same DataFrame, with its version in `df.attrs["version"]`.
+        """
+        import hashlib
+
+        # A new dict, so the attrs of the parent are never touched
+        df.attrs = {**df.attrs, "version": hashlib.sha1(f"{parent}|{params!r}".encode("utf-8")).hexdigest()}
+        return df
+
+    @staticmethod
+    def data_version(data: dict):
+        """
+        Combines the fingerprints of all datasets into a single data version.
+
+        :param data: Dictionary of datasets, as returned by read_data.
+        :return: A short hexadecimal fingerprint that changes whenever any dataset changes.
+        """
+        import hashlib
+
+        digest = hashlib.sha1()
+        for k in sorted(data):
+            digest.update(f"{k}={ProcessData.dataset_version(data[k])};".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @st.cache_data(max_entries=32)
+    def load_dataset(_self, k: str, generation: int = 0):
+        """
+        Cached read of one dataset. The generation is part of the cache key, so a dataset is read
+        again only when its file changed.
+
+        :param k: Dataset label (e.g., 'educadores').
+        :param generation: Generation of the dataset (see generation()).
+        :return: The dataset as a DataFrame.
+        """
+        return _self.read_dataset(k)
+
+    def read_snapshot(self, reload: bool = False):
+        """
+        Reads the datasets from the current Arrow snapshot, memory-mapped and shared by all the
+        processes of the host. The snapshot is published by the first process that has to load the
+        data (or that detects a change), and the other processes switch to it on their next read.
+
+        A snapshot left by earlier processes would otherwise be served until a change is detected, which
+        never happens without PIBSE_REFRESH_SECONDS: the first read of every process loads the datasets
+        again when the snapshot is older than PIBSE_SNAPSHOT_MAX_AGE (one hour by default), and publishes
+        them if their version changed.
+
+        :param reload: Load the datasets again and publish a new snapshot if their version changed.
+        :return: A dictionary of read-only DataFrames backed by the snapshot.
+        """
+        snapshots = get_snapshot_store(self.snapshot_dir)
+        data = snapshots.load()
+
+        if not snapshots.validated:
+            snapshots.validated = True
+            age = snapshots.age()
+            reload = reload or (age is not None and age > self.snapshot_max_age)
+
+        if data is None or reload:
+            fresh = {k: self.load_dataset(k, self.generation(k)) for k in self.__sheets_ids}
+            version = self.data_version(fresh)
+            if version != snapshots.version:
+                snapshots.publish(fresh, version)
+            else:
+                snapshots.renew()  # Still current: the processes started next skip the check
+            data = snapshots.load()
+
+        self.data = dict(data)
+        return self.data
+
+    def derive_datasets(self, data: dict):
+        """
+        Adds the datasets computed from the downloaded ones. 'municipios_alcanzados' lists the priority
+        municipalities of the 'municipios' catalog missing from 'alcance'; it is computed once per data version.
+
+        :param data: Dictionary of downloaded datasets.
+        :return: The same dictionary, with the derived datasets whose inputs are present.
+        """
+        if "municipios" in data and "alcance" in data:
+            municipios, alcance = data["municipios"], data["alcance"]
+            version = self.dataset_version(municipios) + self.dataset_version(alcance)
+            data["municipios_alcanzados"] = get_unreached_municipalities(municipios, alcance, version)
+        return data
+
+    def read_data(self):
         """
         Reads the necessary data for the dashboards from Google Sheets or Excel files
         located on Google Drive. The data is cached to avoid repeated reads and improve performance.
 
+        When a refresh interval is configured (PIBSE_REFRESH_SECONDS), the Drive changes feed is
+        polled first and only the datasets whose files changed are read again.
+
         :return:A dictionary containing all loaded data, where the keys represent the file labels
             (e.g., 'educadores', 'estudiantes_g1', etc.) and values are the corresponding dataframes.
         """
-        # Initialize Google authentication object
-        gauth = GoogleAuth()
-
-        # Use service account credentials to authenticate with Google Drive API
-        credentials = service_account.Credentials.from_service_account_info(
-            st.secrets["connections"],  # Use secret credentials stored in Streamlit config
-            scopes=["https://www.googleapis.com/auth/drive"]  # Scope to access Google Drive files
-        )
-        # Ensure credentials are valid and refresh if necessary
-        credentials.refresh(Request())
-        gauth.credentials = credentials
-
-        # Loop through each sheet configuration in self.__sheets_ids
-        for k, i in _self.__sheets_ids.items():
-            key = i["key"]         # Extract the Google Drive key (file ID)
-            engine = i["engine"]   # Extract the engine for reading the data (e.g., openpyxl or calamine)
-
-            # If the file is a Google Sheet, construct a URL to export it as Excel
-            if i["type"] == "gsheets":
-                url = f"https://docs.google.com/spreadsheets/export?id={key}&exportFormat=xlsx"
-            else:
-                # For Excel files, use the Google Drive API to download the file
-                url = f"https://www.googleapis.com/drive/v3/files/{key}?alt=media"
+        changed = self.refresh() if self.refresh_interval else []
 
-            # Send a GET request to download the file from the constructed URL
-            rqst = requests.get(url, headers={"Authorization": f"Bearer {credentials.token}"})
+        if self.snapshot_dir:
+            return self.derive_datasets(self.read_snapshot(reload=bool(changed)))
 
-            # Read the downloaded content as an Excel file and store it in the data dictionary
-            _self.data[k] = pd.read_excel(BytesIO(rqst.content), sheet_name=i["sheetname"], engine=engine)
+        # Loop through each sheet configuration in self.__sheets_ids and store it in the data dictionary
+        for k in self.__sheets_ids:
+            self.data[k] = self.load_dataset(k, self.generation(k))
+        self.derive_datasets(self.data)
 
         # Return the dictionary containing all the loaded data
-        return _self.data
+        return self.data
+
+    def iter_data(self, keys: list = None, workers: int = 4):
+        """
+        Streaming variant of read_data: yields (key, DataFrame) pairs as soon as each dataset is ready, so a
+        page can draw the charts whose inputs arrived while the other datasets are still being downloaded.
+
+        Datasets are loaded in a thread pool and submitted in the order of `keys`, so the datasets a page needs
+        first start first. Only the requested datasets (and the inputs of requested derived datasets) are read.
+
+        :param keys: Dataset labels in priority order. None reads every dataset.
+        :param workers: Number of datasets loaded at the same time.
+        :return: A generator of (key, DataFrame) pairs, in completion order.
+        """
+        changed = self.refresh() if self.refresh_interval else []
+        keys = list(keys or self.keys() + list(self.derived))
+
+        # The snapshot holds every dataset already: yield them in priority order
+        if self.snapshot_dir:
+            data = self.derive_datasets(self.read_snapshot(reload=bool(changed)))
+            for k in keys:
+                yield k, data[k]
+            return
+
+        # Downloaded datasets to read, in priority order (derived datasets are replaced by their inputs)
+        fetch = []
+        for k in keys:
+            for i in self.derived.get(k, (k,)):
+                if i not in fetch:
+                    fetch.append(i)
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+        ctx = get_script_run_ctx()  # Workers share the session context (caches, secrets)
+
+        def load(k):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return self.load_dataset(k, self.generation(k))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(fetch))), thread_name_prefix="pibse-data")
+        try:
+            futures = {pool.submit(load, k): k for k in fetch}
+            for future in as_completed(futures):
+                k = futures[future]
+                self.data[k] = future.result()
+                if k in keys:
+                    yield k, self.data[k]
+
+                # Derived datasets are computed as soon as their inputs arrived
+                for d, inputs in self.derived.items():
+                    if d in keys and d not in self.data and all(i in self.data for i in inputs):
+                        yield d, self.derive_datasets(self.data)[d]
+        finally:
+            # A consumer that stops early does not wait for the datasets it no longer needs
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,75 @@
+import threading
+from collections import Counter
+
+import streamlit as st
+
+
+class _Call:
+    """
+    An in-flight call: the waiters block on the event until the leader stores the result or the error.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    This class coalesces concurrent calls for the same key: the first caller (the leader) runs the function,
+    and every caller arriving while it runs waits for the same result instead of running it again. Once the
+    call finishes the key is released, so later callers go through the regular caches.
+
+    Streamlit runs the sessions of a server process as threads, so this removes duplicate downloads and figure
+    builds within a process; the shared cache (cache.py) deduplicates work across processes.
+    """
+
+    def __init__(self):
+        self.calls = {}  # In-flight calls by key
+        self.lock = threading.Lock()
+        self.stats = Counter()  # Executions ("run") and coalesced waits ("shared") by key prefix
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` once for all concurrent callers of the same key.
+
+        :param key: Key of the call (e.g., "dataset:educadores:..."). The text before the first ":" is used as
+                    the prefix of the statistics.
+        :param fn: Function to run.
+        :return: The result of the leader's call. If it raised, every waiter raises the same error.
+        """
+        prefix = key.split(":", 1)[0]
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            self.stats[f"{prefix}.{'run' if leader else 'shared'}"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+
+@st.cache_resource
+def get_single_flight():
+    """
+    Returns the single-flight group of this process, shared by all sessions.
+
+    :return: A SingleFlight instance.
+    """
+    return SingleFlight()
@@ -0,0 +1,188 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import streamlit as st
+
+
+class ArrowSnapshot:
+    """
+    This class writes the whole dataset dictionary to one versioned snapshot file and reads it back
+    through a read-only memory map, so every worker process on the host shares the same physical pages
+    of the OS page cache instead of holding its own copy of the frames.
+
+    A snapshot file is the concatenation of one Arrow IPC file per dataset (each aligned to 64 bytes),
+    followed by a JSON footer with the offset, length and attributes of every dataset, the footer length
+    and a magic marker. The file name of the current snapshot is kept in a pointer file ("CURRENT"),
+    replaced atomically when a new version is published.
+    """
+    magic = b"PIBSESNP"
+    alignment = 64
+
+    def __init__(self, folder: str, keep: int = 2, arrow_dtypes: bool = False):
+        """
+        Initializes the snapshot store.
+
+        :param folder: Directory holding the snapshot files and the pointer file.
+        :param keep: Number of snapshot files kept on disk; older ones are removed after a publish.
+        :param arrow_dtypes: If True, every column is exposed as a pandas ArrowDtype backed by the memory
+                             map (zero-copy for all columns). Otherwise numeric columns without nulls are
+                             zero-copy, text columns are copied to object columns and categorical columns
+                             (Arrow dictionaries) come back as pandas Categorical.
+        """
+        self.folder = folder
+        self.keep = keep
+        self.arrow_dtypes = arrow_dtypes
+        self.version = None  # Version of the mapped snapshot
+        self.data = None  # Datasets of the mapped snapshot
+        self.validated = False  # Whether this process checked the snapshot against the sources (see age)
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _pointer(self):
+        """
+        :return: The path of the pointer file.
+        """
+        return os.path.join(self.folder, "CURRENT")
+
+    def current(self):
+        """
+        :return: The file name of the current snapshot, or None if nothing was published yet.
+        """
+        try:
+            with open(self._pointer(), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def age(self):
+        """
+        :return: Seconds since the current snapshot was published or last confirmed (see renew), or None if
+                 nothing was published yet.
+        """
+        try:
+            return time.time() - os.path.getmtime(self._pointer())
+        except FileNotFoundError:
+            return None
+
+    def renew(self):
+        """
+        Marks the current snapshot as confirmed against the sources, restarting its age.
+
+        :return: None
+        """
+        try:
+            os.utime(self._pointer())
+        except FileNotFoundError:
+            pass
+
+    def publish(self, data: dict, version: str):
+        """
+        Writes a new snapshot and makes it current. The file is written under a temporary name and
+        renamed, then the pointer file is replaced, so readers never see a partial snapshot.
+
+        :param data: Dictionary of datasets, as returned by `ProcessData.read_data`.
+        :param version: Data version of the datasets (see `ProcessData.data_version`).
+        :return: The file name of the published snapshot.
+        """
+        import pyarrow as pa
+
+        name = f"snapshot-{version}.arrow"
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        footer = {"version": version, "datasets": {}}
+        with os.fdopen(fd, "wb") as f:
+            for k, df in data.items():
+                # Pad so that every IPC file (and so every buffer) starts on an aligned offset.
+                f.write(b"\0" * (-f.tell() % self.alignment))
+                offset = f.tell()
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                sink = pa.PythonFile(f, mode="w")
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+                footer["datasets"][k] = {"offset": offset, "length": f.tell() - offset,
+                                         "attrs": {a: str(v) for a, v in df.attrs.items()}}
+
+            encoded = json.dumps(footer).encode("utf-8")
+            f.write(encoded)
+            f.write(struct.pack("<Q", len(encoded)))
+            f.write(self.magic)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.folder, name))
+
+        # Switch the pointer atomically, then remove the oldest snapshots.
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp, self._pointer())
+
+        snapshots = sorted((x for x in os.listdir(self.folder) if x.startswith("snapshot-") and x != name),
+                           key=lambda x: os.path.getmtime(os.path.join(self.folder, x)))
+        for old in snapshots[:max(len(snapshots) - self.keep + 1, 0)]:
+            # Processes still mapping an old file keep their pages until they switch.
+            os.remove(os.path.join(self.folder, old))
+        return name
+
+    def _map(self, name: str):
+        """
+        Memory-maps a snapshot file and exposes its datasets.
+
+        :param name: File name of the snapshot.
+        :return: A tuple (version, dictionary of DataFrames).
+        """
+        import pandas as pd
+        import pyarrow as pa
+
+        source = pa.memory_map(os.path.join(self.folder, name), "r")
+        buffer = source.read_buffer()  # Zero-copy view of the whole file
+
+        size = buffer.size
+        if buffer.slice(size - len(self.magic)).to_pybytes() != self.magic:
+            raise ValueError(f"{name} is not a snapshot file")
+        footer_length = struct.unpack("<Q", buffer.slice(size - len(self.magic) - 8, 8).to_pybytes())[0]
+        footer_start = size - len(self.magic) - 8 - footer_length
+        footer = json.loads(buffer.slice(footer_start, footer_length).to_pybytes())
+
+        data = {}
+        for k, entry in footer["datasets"].items():
+            table = pa.ipc.open_file(buffer.slice(entry["offset"], entry["length"])).read_all()
+            if self.arrow_dtypes:
+                df = table.to_pandas(types_mapper=pd.ArrowDtype)
+            else:
+                df = table.to_pandas(split_blocks=True)
+            df.attrs.update(entry["attrs"])
+            data[k] = df
+        return footer["version"], data
+
+    def load(self):
+        """
+        Returns the datasets of the current snapshot. The pointer file is checked on every call, and the
+        new snapshot is mapped when another process published one.
+
+        :return: A dictionary of DataFrames, or None if nothing was published yet.
+        """
+        name = self.current()
+        if name is None:
+            return None
+        with self.lock:
+            if name != f"snapshot-{self.version}.arrow":
+                # Build the new mapping completely before swapping it in.
+                version, data = self._map(name)
+                self.version, self.data = version, data
+            return self.data
+
+
+@st.cache_resource
+def get_snapshot_store(folder: str):
+    """
+    Returns the snapshot store of a folder, shared by all sessions of the process.
+
+    :param folder: Directory holding the snapshot files.
+    :return: An ArrowSnapshot instance.
+    """
+    return ArrowSnapshot(folder)
@@ -0,0 +1,162 @@
+"""
+Throughput benchmark of the JSON API (``api.py``) under concurrent clients.
+
+The server runs in this process on a free port, reading local fixture files (``PIBSE_DATA_DIR``) and a
+private shared cache. Every client keeps one HTTP/1.1 connection open and requests random resources of the
+index (aggregates and figures). Three phases are measured:
+
+    cold         first request of every resource, on an empty cache (bodies and figures are built)
+    full         plain GET requests: bodies are read from the shared cache
+    revalidate   GET requests with If-None-Match: answered 304 without a body
+
+Reported: requests, throughput (requests per second), p50/p95/p99 latency and bytes received per phase.
+
+Usage:
+    python tools/bench_api.py [--clients 16] [--requests 200] [--data-dir DIR] [--scale 1]
+
+Without ``--data-dir``, fixtures from ``tools/fixtures.py`` are written to a temporary folder.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def resources(index: dict):
+    """
+    Lists the paths of every aggregate and figure of the index.
+
+    :param index: Index document of the API.
+    :return: A list of paths.
+    """
+    paths = []
+    for page, options in index["pages"].items():
+        for option, charts in options.items():
+            for chart, info in charts.items():
+                base = f"/{quote(page)}/{quote(option)}/{quote(chart)}"
+                paths.append(base)
+                paths.extend(f"{base}/figure?tile={n}" for n in range(len(info["tiles"])))
+    return paths
+
+
+def run_client(port: int, paths: list, n: int, seed: int, etags: dict = None):
+    """
+    Sends `n` requests for random paths over one keep-alive connection.
+
+    :param port: Port of the server.
+    :param paths: Paths to choose from.
+    :param n: Number of requests. None requests every path once, in order.
+    :param seed: Seed of the random choices of this client.
+    :param etags: ETags by path, sent as If-None-Match. None sends plain requests.
+    :return: A list of (path, status, ETag, latency in seconds, body bytes).
+    """
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    results = []
+    try:
+        for path in (paths if n is None else [rng.choice(paths) for _ in range(n)]):
+            headers = {"If-None-Match": etags[path]} if etags and path in etags else {}
+            start = time.perf_counter()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            results.append((path, response.status, response.getheader("ETag"), time.perf_counter() - start,
+                            len(body)))
+    finally:
+        connection.close()
+    return results
+
+
+def run_phase(port: int, clients: int, jobs: list):
+    """
+    Runs one client per job concurrently.
+
+    :param port: Port of the server.
+    :param clients: Number of concurrent clients.
+    :param jobs: List of (paths, requests, seed, etags) per client.
+    :return: A tuple (results of every request, elapsed seconds).
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(run_client, port, *job) for job in jobs]
+        results = [r for future in futures for r in future.result()]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON API with concurrent clients.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client and phase")
+    parser.add_argument("--data-dir", help="Folder with <dataset>.xlsx fixture files")
+    parser.add_argument("--scale", type=int, default=1, help="Row multiplier of generated fixtures")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        from fixtures import write_datasets
+        data_dir = tempfile.mkdtemp(prefix="pibse-fixtures-")
+        write_datasets(data_dir, scale=args.scale)
+    os.environ["PIBSE_DATA_DIR"] = data_dir
+    # A private cache, so the cold phase starts empty and a deployment's cache on this host is left alone
+    os.environ.setdefault("PIBSE_CACHE_URL",
+                          "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pibse-cache-"), "cache.sqlite"))
+
+    from api import DashboardAPI, make_server
+    from load_test import percentile, print_cache_metrics
+
+    start = time.perf_counter()
+    api = DashboardAPI()
+    api.load()
+    server = make_server(port=0, api=api)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"server on port {port}, datasets loaded in {time.perf_counter() - start:.1f} s, fixtures in {data_dir}")
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    connection.request("GET", "/")
+    paths = resources(json.loads(connection.getresponse().read()))
+    connection.close()
+
+    # Cold: the resources are split between the clients, so each one is built once
+    shares = [paths[i::args.clients] for i in range(args.clients)]
+    phases = {"cold": run_phase(port, args.clients, [(share, None, n, None)
+                                                     for n, share in enumerate(shares) if share])}
+    etags = {path: etag for path, status, etag, _, _ in phases["cold"][0] if status == 200}
+    phases["full"] = run_phase(port, args.clients, [(paths, args.requests, n, None) for n in range(args.clients)])
+    phases["revalidate"] = run_phase(port, args.clients, [(paths, args.requests, n, etags)
+                                                          for n in range(args.clients)])
+    server.shutdown()
+
+    print(f"{len(paths)} resources, {args.clients} concurrent clients")
+    print(f"{'phase':<11} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'MB':>8} "
+          f"{'statuses':>16}")
+    for phase, (results, elapsed) in phases.items():
+        latencies = [r[3] for r in results]
+        statuses = {}
+        for r in results:
+            statuses[r[1]] = statuses.get(r[1], 0) + 1
+        print(f"{phase:<11} {len(results):>9} {len(results) / elapsed:>8.0f} "
+              f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>8.1f} "
+              f"{sum(r[4] for r in results) / 1024 ** 2:>8.1f} {str(statuses):>16}")
+    print_cache_metrics()
+
+    failed = [r for results, _ in phases.values() for r in results if r[1] >= 400]
+    if failed:
+        print(f"WARNING: {len(failed)} failed requests, e.g. {failed[0][0]} ({failed[0][1]})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
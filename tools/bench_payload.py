@@ -0,0 +1,109 @@
+"""
+Payload benchmark for the figures sent to ``plotly_chart``.
+
+For every option of both dashboards it builds all figures of the page, then reports the bytes per page
+and the serialization time before slimming (default "plotly" template, stdlib json) and as sent by the pages
+(shared template set at creation, ``FigurePayload.slim`` rounding, orjson when installed).
+
+Usage:
+    python tools/bench_payload.py [--scale 1] [--repeat 5]
+
+Data comes from ``tools/fixtures.py``, so no Drive credentials are needed.
+"""
+import argparse
+import importlib.util
+import os
+import runpy
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {"Beneficiaries.py": "DashboardAlcance", os.path.join("pages", "1_Outcomes.py"): "DashboardOutcomes"}
+
+
+def load_dashboards(data: dict):
+    """
+    Imports the dashboard classes from the page scripts (without running the pages) and instantiates them.
+
+    :param data: Dictionary of datasets, as returned by ``ProcessData.read_data``.
+    :return: A dictionary {page script: dashboard instance}.
+    """
+    dashboards = {}
+    for script, name in PAGES.items():
+        namespace = runpy.run_path(os.path.join(ROOT, script), run_name="bench")
+        dashboards[script] = namespace[name](data)
+    return dashboards
+
+
+def page_figures(dashboard, option: str):
+    """
+    Builds every figure drawn for a dashboard option, in page order.
+
+    :param dashboard: Dashboard instance (DashboardAlcance or DashboardOutcomes).
+    :param option: Key of ``dashboard.graph_options``.
+    :return: A list of Plotly figures.
+    """
+    from graphs import CreateGraphs
+
+    figures = []
+    for config in dashboard.graph_options[option].values():
+        if "df" in config and config["df"].empty:
+            continue
+        graphs = CreateGraphs(config)
+        figures.extend(graphs.build_figure(config["type_graph"], v) for v in graphs.tile_values())
+    return figures
+
+
+def serialize(figures: list, engine: str, repeat: int):
+    """
+    Serializes a list of figures like Streamlit does and times it.
+
+    :param figures: Plotly figures of a page.
+    :param engine: Plotly JSON engine ("json" or "orjson").
+    :param repeat: Number of repetitions; the best time is reported.
+    :return: A tuple (bytes, seconds).
+    """
+    import plotly.io as pio
+
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = sum(len(pio.to_json(f, validate=False, engine=engine).encode("utf-8")) for f in figures)
+        best = min(best, time.perf_counter() - start)
+    return size, best
+
+
+def main():
+    import plotly.graph_objects as go
+    from fixtures import make_datasets
+    from payload import FigurePayload
+    from processing import ProcessData
+
+    parser = argparse.ArgumentParser(description="Measure figure payload size and serialization time.")
+    parser.add_argument("--scale", type=int, default=1, help="Fixture row multiplier")
+    parser.add_argument("--repeat", type=int, default=5, help="Serialization repetitions")
+    args = parser.parse_args()
+
+    fast_engine = "orjson" if importlib.util.find_spec("orjson") is not None else "json"
+
+    payload = FigurePayload()
+    print(f"{'page / option':<55} {'figs':>4} {'before KB':>10} {'after KB':>9} {'before ms':>10} {'after ms':>9}")
+    data = ProcessData().derive_datasets(make_datasets(scale=args.scale))  # Adds 'municipios_alcanzados'
+    for script, dashboard in load_dashboards(data).items():
+        for option in dashboard.graph_options:
+            figures = page_figures(dashboard, option)
+            # Figures are created with the shared template; the baseline puts the default one back
+            baseline = [go.Figure(f).update_layout(template="plotly") for f in figures]
+            before_bytes, before_s = serialize(baseline, "json", args.repeat)
+            slimmed = [payload.slim(go.Figure(f)) for f in figures]
+            after_bytes, after_s = serialize(slimmed, fast_engine, args.repeat)
+            print(f"{os.path.basename(script) + ' / ' + option:<55} {len(figures):>4} "
+                  f"{before_bytes / 1024:>10.1f} {after_bytes / 1024:>9.1f} "
+                  f"{before_s * 1000:>10.1f} {after_s * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Start-up benchmark for the dashboard entry points.
+
+It reports two things:
+    * An import-time profile (``python -X importtime``) of the modules every page imports,
+      listing the most expensive imports so that regressions in lazy loading are easy to spot.
+    * Start-up timings of ``Beneficiaries.py`` and ``pages/1_Outcomes.py``, measured with Streamlit's
+      app-testing API from the start of the script run:
+        - first paint: the first message sent to the browser (``st.set_page_config``), before any data
+          is loaded, so it measures the imports and the page set-up;
+        - time to header: the first header drawn by ``CreateDashboard.set_header``, which comes after the
+          datasets are loaded, so it is mostly data-load time.
+
+Usage:
+    python tools/bench_startup.py [--runs 5] [--top 15]
+
+The start-up measurement needs the same ``.streamlit/secrets.toml`` the pages use.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ["Beneficiaries.py", os.path.join("pages", "1_Outcomes.py")]
+
+
+def profile_imports(modules: list, top: int = 15):
+    """
+    Runs a fresh interpreter with ``-X importtime`` and returns the slowest imports.
+
+    :param modules: Module names to import (e.g., ["processing", "graphs", "dashboard"]).
+    :param top: Number of entries to return.
+    :return: A tuple (total_ms, rows) where rows is a list of (cumulative_ms, self_ms, module).
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True)
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # Lines look like: "import time:       123 |       4567 |   package.module"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Keep the indentation of the name, it encodes the nesting depth of the import.
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name[1:].rstrip()))
+
+    # Top-level entries (no indentation) add up to the total import time.
+    total = sum(r[0] for r in rows if r[2] in modules)
+    rows.sort(reverse=True)
+    return total, rows[:top]
+
+
+def time_to_first_paint(script: str, runs: int = 5):
+    """
+    Measures the time from the start of a script run until the first message is sent (first paint) and
+    until the first header is drawn (after the datasets are loaded).
+
+    :param script: Path of the Streamlit page relative to the repository root.
+    :param runs: Number of runs to perform; the first one is reported separately as the cold run.
+    :return: A dictionary {"first_paint": [...], "header": [...]} with one time (in seconds) per run.
+    """
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    from dashboard import CreateDashboard
+
+    original_config, original_header = st.set_page_config, CreateDashboard.set_header
+    marks = {}
+
+    def timed_config(*args, **kwargs):
+        # The first call of every page, before the datasets are loaded.
+        marks.setdefault("first_paint", time.perf_counter())
+        return original_config(*args, **kwargs)
+
+    def timed_header(self, *args, **kwargs):
+        # Record only the first header drawn during the current run.
+        marks.setdefault("header", time.perf_counter())
+        return original_header(self, *args, **kwargs)
+
+    st.set_page_config, CreateDashboard.set_header = timed_config, timed_header
+    timings = {"first_paint": [], "header": []}
+    try:
+        for _ in range(runs):
+            marks.clear()
+            at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=600)
+            start = time.perf_counter()
+            at.run()
+            end = time.perf_counter()
+            for name in timings:
+                timings[name].append(marks.get(name, end) - start)
+    finally:
+        st.set_page_config, CreateDashboard.set_header = original_config, original_header
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile imports and first paint of the dashboard pages.")
+    parser.add_argument("--runs", type=int, default=5, help="Script runs per page for the start-up timings.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list.")
+    parser.add_argument("--skip-paint", action="store_true", help="Only run the import-time profile.")
+    args = parser.parse_args()
+
+    total, rows = profile_imports(["processing", "graphs", "dashboard"], top=args.top)
+    print(f"Import time of processing, graphs and dashboard: {total:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, own, name in rows:
+        print(f"{cumulative:>14.1f} {own:>9.1f}  {name}")
+
+    if args.skip_paint:
+        return
+
+    print()
+    for script in ENTRY_POINTS:
+        for name, timings in time_to_first_paint(script, runs=args.runs).items():
+            warm = timings[1:] or timings
+            label = "first paint" if name == "first_paint" else "time to header (includes data load)"
+            print(f"{script}: {label} cold {timings[0] * 1000:.0f} ms, "
+                  f"warm median {statistics.median(warm) * 1000:.0f} ms over {len(warm)} runs")
+
+
+if __name__ == "__main__":
+    main()
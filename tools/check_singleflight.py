@@ -0,0 +1,87 @@
+"""
+Check of the download coalescing of ``ProcessData.read_dataset`` (see ``singleflight.py``).
+
+Fixture workbooks (``tools/fixtures.py``) are served by the fake Drive of ``tools/fake_drive.py`` and the
+shared cache starts empty. For every dataset, N threads released at the same time call
+``ProcessData().read_dataset(k)``; every dataset must be downloaded exactly once
+(``ProcessData.downloads[k] == 1``, and one download request per file on the fake Drive), and every thread
+must get the same data version.
+
+Usage:
+    python tools/check_singleflight.py [--threads 16] [--scale 1]
+
+Exits with status 1 when a dataset was downloaded more than once or a thread failed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent reads download every dataset once.")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent readers per dataset")
+    parser.add_argument("--scale", type=int, default=1, help="Row multiplier of the fixtures")
+    args = parser.parse_args()
+
+    from fixtures import write_datasets
+    from fake_drive import FakeDrive
+
+    folder = tempfile.mkdtemp(prefix="pibse-fixtures-")
+    write_datasets(folder, scale=args.scale)
+
+    drive = FakeDrive()
+    server = drive.serve()
+    port = server.server_address[1]
+    os.environ["PIBSE_DRIVE_API"] = f"http://127.0.0.1:{port}/drive/v3"
+    os.environ["PIBSE_DOCS_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.pop("PIBSE_DATA_DIR", None)
+    # A private, empty cache: every dataset has to be downloaded
+    os.environ["PIBSE_CACHE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pibse-cache-"),
+                                                                "cache.sqlite")
+
+    from processing import ProcessData
+
+    keys = ProcessData().keys()
+    for k in keys:
+        with open(os.path.join(folder, f"{k}.xlsx"), "rb") as f:
+            drive.publish(ProcessData().file_id(k), f.read())
+
+    failed = False
+    for k in keys:
+        barrier = threading.Barrier(args.threads)
+        versions, errors = [], []
+
+        def read():
+            barrier.wait()  # Every thread misses the cache at the same time
+            try:
+                versions.append(ProcessData.dataset_version(ProcessData().read_dataset(k)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        ok = ProcessData.downloads[k] == 1 and not errors and len(set(versions)) == 1
+        print(f"{'ok' if ok else 'FAIL':<5} {k:<24} {args.threads} readers, {ProcessData.downloads[k]} downloads, "
+              f"{len(set(versions))} versions, {len(errors)} errors")
+        for error in errors[:1]:
+            print(f"      {error!r}")
+        failed = failed or not ok
+
+    server.shutdown()
+    print(f"fake Drive download requests: {drive.requests['download']} for {len(keys)} files")
+    if failed or drive.requests["download"] != len(keys):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Parity check of the streaming sheet reader (``workbook.SheetReader``) against ``pandas.read_excel``.
+
+Every sheet of the fixture workbooks of ``tools/fixtures.py``, plus a workbook of edge cases (repeated and
+blank headers, numeric text, NA strings, error cells, blank rows, cells past the header), is read with both
+readers and compared column by column: names, dtypes and values must match.
+
+Usage:
+    python tools/check_workbook.py [--data-dir DIR] [--engine openpyxl] [--block-rows 8192]
+
+Without ``--data-dir``, the fixtures are written to a temporary folder. Exits with status 1 on a mismatch.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_edge_cases(path: str):
+    """
+    Writes a workbook with the layouts where the readers are most likely to differ.
+
+    :param path: Output path of the workbook.
+    :return: The path.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["A", "A.1", "A", None, "Número", "Texto", "Mixto", "Fecha", "Errores", "Lógico"])
+    ws.append([1, 2, 3, 4, "12", "Sí", 1, "2024-01-05", 1.5, True])
+    ws.append([])  # Blank row, skipped
+    ws.append([5, 6, 7, None, "0.5", "NA", "dos", None, "#DIV/0!", False])
+    ws.append([8, 9, 10, 11, None, "null", 3, None, 2.0, None, "extra"])
+    wb.save(path)
+    return path
+
+
+def compare(expected, actual):
+    """
+    :param expected: DataFrame read by pandas.read_excel.
+    :param actual: DataFrame read by SheetReader.
+    :return: A list of mismatch descriptions (empty when the frames match).
+    """
+    import pandas as pd
+
+    if list(expected.columns) != list(actual.columns):
+        return [f"columns {list(actual.columns)} != {list(expected.columns)}"]
+    if len(expected) != len(actual):
+        return [f"{len(actual)} rows != {len(expected)}"]
+
+    mismatches = []
+    for column in expected.columns:
+        e, a = expected[column], actual[column]
+        if e.dtype != a.dtype:
+            mismatches.append(f"{column!r}: dtype {a.dtype} != {e.dtype}")
+            continue
+        try:
+            pd.testing.assert_series_equal(e.reset_index(drop=True), a.reset_index(drop=True), check_names=False)
+        except AssertionError as error:
+            mismatches.append(f"{column!r}: {str(error).splitlines()[0]}")
+    return mismatches
+
+
+def main():
+    import pandas as pd
+    from workbook import SheetReader
+
+    parser = argparse.ArgumentParser(description="Compare the streaming sheet reader with pandas.read_excel.")
+    parser.add_argument("--data-dir", help="Folder with <dataset>.xlsx files")
+    parser.add_argument("--engine", default="openpyxl", choices=["openpyxl", "calamine"],
+                        help="Streaming engine of SheetReader")
+    parser.add_argument("--block-rows", type=int, default=8192, help="Rows converted at once by SheetReader")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        from fixtures import write_datasets
+        data_dir = tempfile.mkdtemp(prefix="pibse-fixtures-")
+        write_datasets(data_dir)
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if name.endswith(".xlsx"))
+    paths.append(write_edge_cases(os.path.join(tempfile.mkdtemp(prefix="pibse-edge-"), "edge_cases.xlsx")))
+
+    reader = SheetReader(block_rows=args.block_rows)
+    failed = 0
+    for path in paths:
+        for sheetname in pd.ExcelFile(path, engine="openpyxl").sheet_names:
+            expected = pd.read_excel(path, sheet_name=sheetname, engine="openpyxl")
+            with open(path, "rb") as f:
+                actual = reader.read(f, sheetname, args.engine)
+            mismatches = compare(expected, actual)
+            print(f"{'FAIL' if mismatches else 'ok':<5} {os.path.basename(path)} [{sheetname}] "
+                  f"{len(expected)} rows x {len(expected.columns)} columns")
+            for mismatch in mismatches:
+                print(f"      {mismatch}")
+            failed += bool(mismatches)
+
+    if failed:
+        print(f"{failed} sheets differ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
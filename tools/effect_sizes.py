@@ -0,0 +1,78 @@
+"""
+Computes the psychometric results sheet (D-cohen, confidence intervals, significance and behaviour per scale)
+from item-level pre/post responses, with ``effects.EffectSizes``.
+
+Usage:
+    python tools/effect_sizes.py OUTPUT.xlsx --responses RESPONSES.xlsx --items ITEMS.xlsx
+        [--window inicial:final ...] [--subgroup "Mujeres 1+ CA:Sexo=Mujer" ...] [--sheet Psicométricos]
+        [--bootstrap 2000] [--workers N] [--seed 0]
+    python tools/effect_sizes.py OUTPUT.xlsx --fixtures [--participants 300]
+
+The output sheet has the columns of the "Psicométricos" sheets read by ``ProcessData``, so it can be uploaded
+to Drive in place of the hand-computed one. With several windows or subgroups, the Subanálisis, Pre and Post
+columns are added, as in "Psicométricos FINALES con items inversos". With ``--bootstrap``, conf.low and
+conf.high are percentile bootstrap intervals computed in a process pool.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_subgroup(text: str):
+    """
+    :param text: Subgroup as "label:column=value[,column=value]" (an empty filter keeps every row).
+    :return: A tuple (label, filters).
+    """
+    label, _, filters = text.partition(":")
+    return label, dict(f.split("=", 1) for f in filters.split(",") if f)
+
+
+def main():
+    import pandas as pd
+    from effects import EffectSizes
+
+    parser = argparse.ArgumentParser(description="Compute effect sizes from item-level responses.")
+    parser.add_argument("output", help="Output workbook")
+    parser.add_argument("--responses", help="Workbook with one row per participant and wave")
+    parser.add_argument("--items", help="Workbook with the item catalog")
+    parser.add_argument("--fixtures", action="store_true", help="Use synthetic responses")
+    parser.add_argument("--participants", type=int, default=300, help="Participants of the synthetic responses")
+    parser.add_argument("--window", action="append", help="Measurement window as pre:post (repeatable)")
+    parser.add_argument("--subgroup", action="append", help="Subgroup as label:column=value (repeatable)")
+    parser.add_argument("--sheet", default="Psicométricos", help="Name of the output sheet")
+    parser.add_argument("--bootstrap", type=int, default=0, help="Bootstrap resamples (0: normal intervals)")
+    parser.add_argument("--workers", type=int,
+                        help="Bootstrap worker processes (default: PIBSE_BOOTSTRAP_WORKERS, or the CPU count up to 4)")
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap seed")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        from fixtures import make_responses
+        responses, items = make_responses(args.participants)
+    elif args.responses and args.items:
+        responses, items = pd.read_excel(args.responses), pd.read_excel(args.items)
+    else:
+        parser.error("either --fixtures or both --responses and --items are required")
+
+    windows = [tuple(w.split(":", 1)) for w in (args.window or ["inicial:final"])]
+    subgroups = dict(parse_subgroup(s) for s in args.subgroup) if args.subgroup else None
+
+    start = time.perf_counter()
+    results = EffectSizes(responses, items).compute(
+        subgroups, windows, intervals="bootstrap" if args.bootstrap else "normal",
+        resamples=args.bootstrap or 2000, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    with pd.ExcelWriter(args.output, engine="openpyxl") as writer:
+        results.to_excel(writer, sheet_name=args.sheet, index=False)
+    print(f"{len(results)} rows ({len(responses)} responses, {len(items)} items) in {elapsed * 1000:.0f} ms "
+          f"-> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local fake of the Google Drive endpoints used by ``ProcessData``: file downloads, Google Sheets
+exports and the changes feed. It serves fixture workbooks under the real Drive file IDs, so the
+refresh mode can be exercised without network access or credentials.
+
+Usage:
+    python tools/fake_drive.py FIXTURE_DIR [--port 8765]
+
+then run the dashboards with:
+    PIBSE_DRIVE_API=http://127.0.0.1:8765/drive/v3 PIBSE_DOCS_URL=http://127.0.0.1:8765 \\
+    PIBSE_REFRESH_SECONDS=5 streamlit run Beneficiaries.py
+
+``POST /_touch/<dataset label>`` re-reads ``FIXTURE_DIR/<label>.xlsx`` and records a change for its file.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class FakeDrive:
+    """
+    In-memory Drive: file contents by file ID and an append-only log of changed file IDs.
+    The position in the log is used as the changes page token.
+    """
+
+    def __init__(self, page_size: int = 100):
+        """
+        :param page_size: Number of changes returned per page of the changes feed.
+        """
+        self.files = {}  # File ID: content
+        self.log = []  # Changed file IDs, in order
+        self.page_size = page_size
+        self.requests = Counter()  # Number of requests per endpoint
+        self.lock = threading.Lock()
+
+    def publish(self, file_id: str, content: bytes):
+        """
+        Stores a new version of a file and records the change in the feed.
+
+        :param file_id: Drive file ID.
+        :param content: New content of the file.
+        :return: None
+        """
+        with self.lock:
+            self.files[file_id] = content
+            self.log.append(file_id)
+
+    def changes(self, token: int):
+        """
+        :param token: Page token (position in the change log).
+        :return: A page of the changes feed, shaped like the Drive API response.
+        """
+        with self.lock:
+            page = self.log[token:token + self.page_size]
+            response = {"changes": [{"fileId": f, "removed": False} for f in page]}
+            if token + self.page_size < len(self.log):
+                response["nextPageToken"] = str(token + self.page_size)
+            else:
+                response["newStartPageToken"] = str(len(self.log))
+            return response
+
+    def serve(self, port: int = 0):
+        """
+        Starts the HTTP server in a background thread.
+
+        :param port: Port to listen on; 0 picks a free port.
+        :return: The running ThreadingHTTPServer (its port is in server.server_address[1]).
+        """
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def send(self, status: int, body: bytes, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/drive/v3/changes/startPageToken":
+                    drive.requests["startPageToken"] += 1
+                    self.send(200, json.dumps({"startPageToken": str(len(drive.log))}).encode())
+                elif url.path == "/drive/v3/changes":
+                    drive.requests["changes"] += 1
+                    self.send(200, json.dumps(drive.changes(int(query["pageToken"]))).encode())
+                elif url.path.startswith("/drive/v3/files/") or url.path == "/spreadsheets/export":
+                    file_id = query.get("id") or url.path.rsplit("/", 1)[-1]
+                    drive.requests["download"] += 1
+                    if file_id in drive.files:
+                        self.send(200, drive.files[file_id], "application/octet-stream")
+                    else:
+                        self.send(404, b"{}")
+                else:
+                    self.send(404, b"{}")
+
+            def do_POST(self):
+                # Hook for manual tests, set by main(): re-publish a fixture file.
+                if self.path.startswith("/_touch/") and hasattr(drive, "touch"):
+                    drive.touch(self.path.rsplit("/", 1)[-1])
+                    self.send(200, b"{}")
+                else:
+                    self.send(404, b"{}")
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    from processing import ProcessData
+
+    parser = argparse.ArgumentParser(description="Serve fixture workbooks through a fake Drive API.")
+    parser.add_argument("folder", help="Folder with <dataset>.xlsx files (see tools/fixtures.py)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    processing = ProcessData()
+    drive = FakeDrive()
+
+    def touch(k):
+        with open(os.path.join(args.folder, f"{k}.xlsx"), "rb") as f:
+            drive.publish(processing.file_id(k), f.read())
+
+    for k in processing.keys():
+        touch(k)
+    drive.touch = touch
+
+    server = drive.serve(args.port)
+    print(f"Fake Drive on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
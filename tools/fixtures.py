@@ -0,0 +1,201 @@
+"""
+Synthetic fixture data with the same layout as the Drive sheets read by ``ProcessData``.
+
+The frames only carry the columns the dashboards use, with realistic categories (states, priorities,
+constructs, significance labels, ...), so benchmarks and harnesses can run without Drive credentials.
+
+Usage:
+    python tools/fixtures.py OUTPUT_DIR [--scale 1] [--seed 0]
+
+writes one ``<dataset>.xlsx`` file per dataset (named after the ``ProcessData`` keys) into OUTPUT_DIR.
+"""
+import argparse
+import os
+
+STATES = ["Campeche", "Quintana Roo", "Yucatán"]
+PRIORITIES = ["Kellogg's Priority", "Authorized Extension", "Other"]
+PROGRAMS = ["Professional Development", "Systemic Leadership Training",
+            "Professional Development/Systemic Leadership Training", "Teenagers"]
+IMPLEMENTATIONS = ["Educadores", "Estudiantes", "Educadores y directivos"]
+SCALES = {
+    # Construct: English names of its scales
+    "Malestar psicológico": ["Depression", "Anxiety", "Stress"],
+    "Bienestar psicológico": ["Life satisfaction", "Flourishing"],
+    "Regulación emocional": ["Cognitive reappraisal", "Expressive suppression"],
+    "Prosocialidad": ["Empathy", "Prosocial behavior"],
+    "Autoconocimiento": ["Self awareness"],
+    "Seguridad y pertenencia": ["Growth mindset", "School belonging"],
+}
+BEHAVIOURS = ["Significativo/sentido esperado", "No significativo/sentido esperado",
+              "Significativo/sentido contrario", "No significativo/sentido contrario"]
+SUBANALYSES = ["Todos-as 1+ CA", "Todos-as 2+ CA", "Mujeres 1+ CA", "Hombres 1+ CA"]
+WINDOWS = [("inicial", "final"), ("inicial", "intermedia"), ("intermedia", "final")]
+
+
+def make_psychometrics(rng, windows: bool = False):
+    """
+    Builds a psychometric results frame (one row per construct and scale).
+
+    :param rng: numpy random Generator.
+    :param windows: If True, repeat the rows for every subanalysis and measurement window,
+                    as in the "Psicométricos FINALES con items inversos" sheet.
+    :return: A pandas DataFrame.
+    """
+    import pandas as pd
+
+    groups = [(s, pre, post) for s in SUBANALYSES for pre, post in WINDOWS] if windows else [(None, None, None)]
+    rows = []
+    for sub, pre, post in groups:
+        for construct, scales in SCALES.items():
+            for scale in scales:
+                d = float(rng.normal(0.2, 0.3))
+                half_width = float(rng.uniform(0.1, 0.35))
+                significance = rng.choice(["", "*", "**", "***"], p=[0.4, 0.3, 0.2, 0.1])
+                row = {
+                    "Constructo": construct,
+                    "Medición": scale,
+                    "Medición inglés": scale,
+                    "Medición inglés_sig": f"{scale}{significance}",
+                    "D-cohen": d,
+                    "conf.low": d - half_width,
+                    "conf.high": d + half_width,
+                    "Significancia": significance,
+                    "Comportamiento": BEHAVIOURS[int(rng.integers(len(BEHAVIOURS)))]
+                }
+                if windows:
+                    row.update({"Subanálisis": sub, "Pre": pre, "Post": post})
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def make_responses(participants: int = 300, seed: int = 0):
+    """
+    Builds item-level pre/post responses and their item catalog, as read by ``effects.EffectSizes``. Every scale
+    has four Likert items (1 to 5), the last one reverse-scored, and every participant answers every wave.
+
+    :param participants: Number of participants.
+    :param seed: Seed of the random generator.
+    :return: A tuple (responses, items) of DataFrames.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+
+    items = pd.DataFrame([
+        {"Ítem": f"{scale[:4].upper()}{i}", "Constructo": construct, "Medición": scale, "Medición inglés": scale,
+         "Inverso": i == 4, "Mínimo": 1, "Máximo": 5, "Sentido": -1 if construct == "Malestar psicológico" else 1}
+        for construct, scales in SCALES.items() for scale in scales for i in range(1, 5)
+    ])
+
+    waves = ["inicial", "intermedia", "final"]
+    n_scales = items["Medición"].nunique()
+    # Latent score per participant and scale, plus a scale-specific change per wave
+    latent = rng.normal(3, 0.7, size=(participants, n_scales))
+    change = rng.normal(0.15, 0.2, size=n_scales)
+    scale_of_item = items["Medición"].factorize()[0]
+
+    frames = []
+    for w, wave in enumerate(waves):
+        score = latent + w * change / 2 + rng.normal(0, 0.4, size=latent.shape)
+        answers = score[:, scale_of_item] + rng.normal(0, 0.6, size=(participants, len(items)))
+        answers[:, items["Inverso"].to_numpy()] = 6 - answers[:, items["Inverso"].to_numpy()]
+        answers = np.clip(np.rint(answers), 1, 5)
+        answers[rng.random(answers.shape) < 0.02] = np.nan  # A few unanswered items
+        frame = pd.DataFrame(answers, columns=items["Ítem"])
+        frame.insert(0, "ID", np.arange(participants))
+        frame.insert(1, "Aplicación", wave)
+        frame.insert(2, "Sexo", np.where(np.arange(participants) % 2 == 0, "Mujer", "Hombre"))
+        frames.append(frame)
+
+    # Some participants miss a wave
+    responses = pd.concat(frames, ignore_index=True)
+    responses = responses[rng.random(len(responses)) > 0.1].reset_index(drop=True)
+    return responses, items
+
+
+def make_datasets(scale: int = 1, seed: int = 0):
+    """
+    Builds every dataset downloaded by ``ProcessData``. The derived datasets ('municipios_alcanzados') are
+    not files on Drive; ``ProcessData.derive_datasets`` computes them from these.
+
+    :param scale: Multiplier for the number of beneficiaries and municipalities.
+    :param seed: Seed of the random generator, so fixtures are reproducible.
+    :return: A dictionary of DataFrames keyed like ``ProcessData`` (e.g., "alcance", "educadores").
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+
+    # Municipality catalog: a fixed number of municipalities per state.
+    n_mun = 40 * scale
+    municipios = pd.DataFrame({
+        "Entidad": np.repeat(STATES, n_mun),
+        "Municipio": [f"Municipio {s[:3]} {i}" for s in STATES for i in range(n_mun)],
+        "Prioridad": rng.choice(PRIORITIES, size=n_mun * len(STATES), p=[0.4, 0.2, 0.4]),
+    })
+    municipios["Municipio_Porcentaje"] = 1 / municipios.groupby("Entidad")["Municipio"].transform("count")
+
+    # Reach: one row per beneficiary and program component.
+    n = 5000 * scale
+    mun = municipios.sample(n=n, replace=True, random_state=seed).reset_index(drop=True)
+    implementation = rng.choice(IMPLEMENTATIONS, size=n)
+    alcance = pd.DataFrame({
+        "Entidad": mun["Entidad"],
+        "Municipio": mun["Municipio"],
+        "Prioridad": mun["Prioridad"],
+        "Tipo": rng.choice(PROGRAMS, size=n),
+        "Implementación": implementation,
+        "Email": [f"user{i}@example.org" for i in rng.integers(0, int(n * 0.8), size=n)],
+        "Centro de trabajo": [f"CCT{i:05d}" for i in rng.integers(0, n // 10, size=n)],
+        "Centro de trabajo verificado": rng.random(n) < 0.7,
+        "Tipo_cct": rng.choice(["Escuela", "Oficina"], size=n, p=[0.85, 0.15]),
+        "Ben_directo": np.where(implementation == "Estudiantes", rng.choice([1, 25], size=n), 1),
+    })
+
+    return {
+        "educadores": make_psychometrics(rng),
+        "estudiantes_g1": make_psychometrics(rng),
+        "estudiantes_g2": make_psychometrics(rng, windows=True),
+        "fls": make_psychometrics(rng),
+        "alcance": alcance,
+        "municipios": municipios,
+    }
+
+
+def write_datasets(folder: str, scale: int = 1, seed: int = 0):
+    """
+    Writes the fixture datasets as Excel files, using the sheet names ``ProcessData`` expects.
+
+    :param folder: Output directory (created if needed).
+    :param scale: Multiplier for the number of rows (see make_datasets).
+    :param seed: Seed of the random generator.
+    :return: A list with the written file paths.
+    """
+    import pandas as pd
+
+    sheetnames = {
+        "educadores": "Psicométricos",
+        "estudiantes_g1": "Psicométricos",
+        "estudiantes_g2": "Psicométricos FINALES con items inversos",
+        "fls": "Psicométricos_final",
+    }
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for k, df in make_datasets(scale=scale, seed=seed).items():
+        path = os.path.join(folder, f"{k}.xlsx")
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            df.to_excel(writer, sheet_name=sheetnames.get(k, "Sheet1"), index=False)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic fixture workbooks for the dashboards.")
+    parser.add_argument("folder", help="Output directory")
+    parser.add_argument("--scale", type=int, default=1, help="Row multiplier")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    for p in write_datasets(args.folder, scale=args.scale, seed=args.seed):
+        print(p)
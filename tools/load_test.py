@@ -0,0 +1,201 @@
+"""
+Concurrent-session load test of the dashboard pages.
+
+Each simulated session drives ``Beneficiaries.py`` or ``pages/1_Outcomes.py`` headlessly through
+Streamlit's app-testing API and keeps switching sidebar options. All sessions run in this process, so
+they share the Streamlit caches like the sessions of a single server process do. ``ProcessData`` reads
+local fixture files (``PIBSE_DATA_DIR``) instead of Google Drive.
+
+Reported: p50/p95/p99 rerun latency per page, throughput (reruns per second), peak memory and the number of
+fetches per dataset: all sessions start together on a cold cache, so with single-flight loading every dataset
+is fetched exactly once.
+With ``--warmup`` the datasets and figures are prepared first (see ``warmup.WarmUp``), so the first runs of
+the sessions are measured against a warm cache: cold-start p99 should then be close to the warm p50.
+
+Usage:
+    python tools/load_test.py [--sessions 8] [--steps 10] [--data-dir DIR] [--scale 1] [--warmup]
+
+Without ``--data-dir``, fixtures from ``tools/fixtures.py`` are written to a temporary folder.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = ["Beneficiaries.py", os.path.join("pages", "1_Outcomes.py")]
+
+
+def percentile(values: list, q: float):
+    """
+    :param values: Measurements.
+    :param q: Percentile between 0 and 100.
+    :return: The percentile using linear interpolation, or NaN for an empty list.
+    """
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def print_cache_metrics(top: int = 5):
+    """
+    Prints the shared cache metrics of this process: bytes held against the budget, the counters per kind
+    of entry and the slowest loads.
+
+    :param top: Number of slowest keys listed.
+    :return: None
+    """
+    from cache import get_shared_cache
+
+    metrics = get_shared_cache().metrics()
+    print(f"cache: {metrics['bytes_held'] / 1024 ** 2:.1f} MB held of {metrics['max_bytes'] / 1024 ** 2:.0f} MB")
+    for prefix, counters in sorted(metrics["prefixes"].items()):
+        rate = counters.get("hit_rate")
+        print(f"  {prefix:<10} hits {counters.get('hits', 0):>6}  misses {counters.get('misses', 0):>6}  "
+              f"hit rate {'-' if rate is None else f'{rate:.0%}':>5}  sets {counters.get('sets', 0):>5}  "
+              f"rejected {counters.get('rejected', 0):>4}  evictions {counters.get('evictions', 0):>4}")
+    slowest = sorted(metrics["load_times"].items(), key=lambda x: -x[1])[:top]
+    for key, seconds in slowest:
+        print(f"  load {seconds * 1000:>8.0f} ms  {key[:70]}")
+
+
+def run_session(page: str, steps: int, seed: int, timeout: float):
+    """
+    Simulates one user: opens the page, then switches sidebar options `steps` times. On Outcomes, the
+    subanalysis or the measurement window of Teenagers Groups 3, 4 & 5 changes in some steps too.
+
+    :param page: Page script relative to the repository root.
+    :param steps: Number of sidebar interactions after the first run.
+    :param seed: Seed of the random choices of this session.
+    :param timeout: Timeout of each script run in seconds.
+    :return: A list with the latency of every run (the first one included) in seconds.
+    :raises RuntimeError: When a run of the page raised an exception (the first run included).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+
+    latencies = []
+    start = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"{page} failed on the first run: {at.exception[0].message}")
+
+    for _ in range(steps):
+        # The first sidebar select box holds the chart groups of both pages.
+        selectbox = at.sidebar.selectbox[0]
+        selectbox.select(rng.choice(list(selectbox.options)))
+
+        # Beneficiaries also has multiselect filters: sometimes pick or clear a state.
+        if at.sidebar.multiselect and rng.random() < 0.5:
+            states = at.sidebar.multiselect[0]
+            states.set_value(rng.sample(list(states.options), k=rng.randint(0, len(states.options))))
+
+        # Outcomes also selects the subanalysis and the window: change one of them at a time, since the
+        # windows offered depend on the subanalysis of the previous run
+        selectors = [s for s in at.sidebar.selectbox if s.label in ("Subanalysis", "Measurement window")]
+        if selectors and rng.random() < 0.5:
+            selector = rng.choice(selectors)
+            selector.select_index(rng.randrange(len(selector.options)))
+
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+
+        if at.exception:
+            raise RuntimeError(f"{page} failed: {at.exception[0].message}")
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard pages with concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions per page")
+    parser.add_argument("--steps", type=int, default=10, help="Sidebar interactions per session")
+    parser.add_argument("--data-dir", help="Folder with <dataset>.xlsx fixture files")
+    parser.add_argument("--scale", type=int, default=1, help="Row multiplier of generated fixtures")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout of each rerun in seconds")
+    parser.add_argument("--warmup", action="store_true", help="Preload data and figures before the sessions")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if data_dir is None:
+        from fixtures import write_datasets
+        data_dir = tempfile.mkdtemp(prefix="pibse-fixtures-")
+        write_datasets(data_dir, scale=args.scale)
+    os.environ["PIBSE_DATA_DIR"] = data_dir
+    # Keep the load test away from the shared cache of a real deployment on this host. The warm-up needs
+    # a cache to fill, so it gets a private one.
+    cache_url = "none"
+    if args.warmup:
+        cache_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="pibse-cache-"), "cache.sqlite")
+    os.environ.setdefault("PIBSE_CACHE_URL", cache_url)
+
+    # Track the peak resident memory of the process while sessions run.
+    peak = {"rss": 0}
+    done = threading.Event()
+
+    def sample_memory():
+        while not done.wait(0.05):
+            # ru_maxrss is in kilobytes on Linux (bytes on macOS).
+            peak["rss"] = max(peak["rss"], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+
+    if args.warmup:
+        from warmup import WarmUp
+        status = WarmUp().run()
+        print(f"warm-up: {status['state']}, {status['figures']} figures in {status['seconds']:.1f} s")
+
+    results = {page: [] for page in PAGES}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions * len(PAGES)) as pool:
+        futures = {pool.submit(run_session, page, args.steps, n, args.timeout): page
+                   for page in PAGES for n in range(args.sessions)}
+        for future, page in futures.items():
+            results[page].extend(future.result())
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    print(f"{args.sessions} sessions per page, {args.steps} interactions each, fixtures in {data_dir}")
+    print(f"{'page':<22} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'first p99 ms':>13}")
+    for page, latencies in results.items():
+        # The first run of every session is the cold start of that session
+        first = latencies[::args.steps + 1]
+        print(f"{page:<22} {len(latencies):>7} {percentile(latencies, 50) * 1000:>8.0f} "
+              f"{percentile(latencies, 95) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+              f"{percentile(first, 99) * 1000:>13.0f}")
+
+    total = sum(len(x) for x in results.values())
+    factor = 1 if sys.platform == "darwin" else 1024
+    print(f"throughput: {total / elapsed:.1f} reruns/s over {elapsed:.1f} s")
+    print(f"peak memory: {peak['rss'] * factor / 1024 ** 2:.0f} MB")
+
+    from processing import ProcessData
+    from singleflight import get_single_flight
+    fetches = dict(ProcessData.downloads)
+    print(f"fetches per dataset: {fetches}")
+    print(f"coalesced calls: {dict(get_single_flight().stats)}")
+    print_cache_metrics()
+    if any(n > 1 for n in fetches.values()):
+        print(f"WARNING: {sum(fetches.values()) - len(fetches)} duplicate fetches")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
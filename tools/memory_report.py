@@ -0,0 +1,67 @@
+"""
+Memory footprint report of the datasets loaded by ``ProcessData``.
+
+Prints the deep memory usage per dataset and column, the cache size and per-session overhead, and the
+same figures after ``MemoryReport.compact``.
+
+Usage:
+    python tools/memory_report.py [--fixtures] [--scale 1] [--sessions 10] [--columns]
+
+With ``--fixtures`` the synthetic data of ``tools/fixtures.py`` is used instead of the Drive files.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def mb(value):
+    """
+    :param value: Number of bytes.
+    :return: The value formatted in megabytes.
+    """
+    return f"{value / 1024 ** 2:.2f} MB"
+
+
+def main():
+    import pandas as pd
+    from memory import MemoryReport
+
+    parser = argparse.ArgumentParser(description="Report the memory used by the dashboard datasets.")
+    parser.add_argument("--fixtures", action="store_true", help="Use synthetic fixture data")
+    parser.add_argument("--scale", type=int, default=1, help="Fixture row multiplier")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions to estimate")
+    parser.add_argument("--columns", action="store_true", help="Also list every column")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        from fixtures import make_datasets
+        data = make_datasets(scale=args.scale)
+    else:
+        from processing import ProcessData
+        processing = ProcessData()
+        data = {k: processing.read_dataset(k, compact=False) for k in processing.keys()}
+
+    before = MemoryReport(data)
+    after = before.compact()
+
+    pd.set_option("display.width", 160)
+    for label, report in [("Before compaction", before), ("After compaction", after)]:
+        print(f"== {label}")
+        if args.columns:
+            print(report.columns().to_string(index=False))
+        print(report.datasets().to_string(index=False))
+        summary = report.summary(sessions=args.sessions)
+        print(f"cache: {mb(summary['cache_bytes'])}, per session: {mb(summary['session_bytes'])}, "
+              f"{summary['sessions']} sessions: {mb(summary['total_bytes'])}")
+        print()
+
+    print("== Comparison")
+    print(before.compare(after).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
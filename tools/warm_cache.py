@@ -0,0 +1,45 @@
+"""
+Warms the shared cache of a deployment: loads every dataset and builds every figure of the dashboards.
+
+The datasets and figures land in the shared cache (``PIBSE_CACHE_URL``) that every Streamlit process on the
+host reads, so running this right after a deploy or restart means the first visitors only read cached
+figures. Exits with status 0 once the cache is ready (and writes ``PIBSE_READY_FILE`` when it is set), so
+it can gate a readiness probe.
+
+Usage:
+    python tools/warm_cache.py [--data-dir DIR]
+
+Without ``--data-dir`` the datasets are downloaded from Drive, which needs the same
+``.streamlit/secrets.toml`` the pages use.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preload the datasets and prebuild every dashboard figure.")
+    parser.add_argument("--data-dir", help="Folder with <dataset>.xlsx files used instead of Drive")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.environ["PIBSE_DATA_DIR"] = args.data_dir
+
+    from warmup import WarmUp
+
+    status = WarmUp().run()
+    if status["state"] != "ready":
+        print(f"warm-up failed after {status['seconds']:.1f} s: {status['error']}")
+        sys.exit(1)
+    print(f"ready: {status['figures']} figures in {status['seconds']:.1f} s")
+
+    from load_test import print_cache_metrics
+    print_cache_metrics()
+
+
+if __name__ == "__main__":
+    main()
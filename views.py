@@ -0,0 +1,77 @@
+from cache import aggregate_cache
+from processing import ProcessData
+
+
+class IndexedViews:
+    """
+    This class indexes a dataset once on a set of columns (e.g., 'Subanálisis', 'Pre' and 'Post')
+    and serves the filtered views for each combination of their values. Views are memoized, so
+    repeated lookups of the same combination cost a dictionary access instead of a query over
+    the full frame. Every view carries its own version (see ProcessData.derive_version), so caches keyed
+    on data versions tell the views apart.
+    """
+
+    def __init__(self, df, levels: tuple = ("Subanálisis", "Pre", "Post")):
+        """
+        Builds the sorted index of the dataset.
+
+        :param df: DataFrame to index (e.g., the 'estudiantes_g2' dataset).
+        :param levels: Columns that identify a view.
+        """
+        self.levels = list(levels)
+        self.version = ProcessData.dataset_version(df)  # Version of the dataset the views derive from
+        # Keep the indexed columns in the frame so the views look exactly like the original rows.
+        self.indexed = df.set_index(self.levels, drop=False).sort_index()
+        # Returned for combinations that do not exist
+        self.empty = ProcessData.derive_version(df.iloc[0:0], self.version, "empty")
+        self.__views = {}  # Memoized views, keyed by the tuple of level values
+
+    def keys(self):
+        """
+        :return: The list of existing combinations of level values, in index order.
+        """
+        return list(self.indexed.index.unique())
+
+    def values(self, level: str, **fixed):
+        """
+        Lists the existing values of one level, optionally restricted by the values of other levels.
+
+        :param level: Name of the level (e.g., 'Subanálisis').
+        :param fixed: Values of other levels to restrict the search (e.g., Subanálisis='Todos-as 1+ CA').
+        :return: A list of values, in index order.
+        """
+        position = self.levels.index(level)
+        result = []
+        for key in self.keys():
+            if all(key[self.levels.index(k)] == v for k, v in fixed.items()) and key[position] not in result:
+                result.append(key[position])
+        return result
+
+    def view(self, *key):
+        """
+        Returns the rows matching a combination of level values.
+
+        :param key: One value per level, in the order of the levels (e.g., 'Todos-as 1+ CA', 'inicial', 'final').
+        :return: A DataFrame with the matching rows (empty if the combination does not exist).
+        """
+        if key not in self.__views:
+            if key in self.indexed.index:
+                # A list with a single full key always returns a DataFrame, even for a single row.
+                view = self.indexed.loc[[key]].reset_index(drop=True)
+                self.__views[key] = ProcessData.derive_version(view, self.version, self.levels, key)
+            else:
+                self.__views[key] = self.empty
+        return self.__views[key]
+
+
+@aggregate_cache("views", max_entries=4, resource=True)
+def get_indexed_views(_df, version: str, levels: tuple = ("Subanálisis", "Pre", "Post")):
+    """
+    Returns the IndexedViews of a dataset, built once per data version and shared by all sessions.
+
+    :param _df: DataFrame to index (not hashed by Streamlit).
+    :param version: Fingerprint of the dataset (``df.attrs["version"]``), used as the cache key.
+    :param levels: Columns that identify a view.
+    :return: An IndexedViews instance.
+    """
+    return IndexedViews(_df, levels)
@@ -0,0 +1,131 @@
+import os
+import runpy
+import threading
+import time
+
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Dashboard classes warmed up, as (page script, class name). Pages are loaded with runpy, their main guard
+# keeps them from drawing anything.
+PAGES = [("Beneficiaries.py", "DashboardAlcance"),
+         (os.path.join("pages", "1_Outcomes.py"), "DashboardOutcomes")]
+
+
+class WarmUp:
+    """
+    This class prepares a server process before the first visitor: it loads every dataset and builds the figures
+    of every graph option of the dashboards into the shared figure cache. Pages then only read cached figures,
+    so the first visitor after a deploy or restart does not pay for the download and the figure builds.
+
+    The figures are built for the default state of each page (no sidebar filters, default subanalysis); other
+    states are built on first use as before.
+    """
+
+    def __init__(self):
+        self.state = "idle"  # "idle", "running", "ready" or "failed"
+        self.figures = 0  # Number of figures built or found in the cache
+        self.started = None  # Start time of the last run
+        self.seconds = None  # Duration of the last run
+        self.error = None  # Error of a failed run
+        self.thread = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def dashboards(data: dict):
+        """
+        Instantiates the dashboards of every page with the loaded datasets.
+
+        :param data: Dictionary of datasets, as returned by `ProcessData.read_data`.
+        :return: A list of dashboard instances.
+        """
+        dashboards = []
+        for page, name in PAGES:
+            namespace = runpy.run_path(os.path.join(ROOT, page))  # Not run as "__main__": nothing is drawn
+            dashboards.append(namespace[name](data))
+        return dashboards
+
+    @staticmethod
+    def tiles(graphs, type_graph: str):
+        """
+        Lists the tiles a page draws for a chart configuration, as set_plots_grid does.
+
+        :param graphs: CreateGraphs instance of the configuration.
+        :param type_graph: Type of graph.
+        :return: A list of disaggregate values (or summary table pages), [None] for a single figure.
+        """
+        if type_graph == "summary_table" and graphs.aux_data["page_size"]:
+            return graphs.summary_pages(graphs.aux_data["page_size"])
+        return graphs.tile_values()
+
+    def run(self):
+        """
+        Loads the datasets and builds every figure of every graph option. Runs in the calling thread.
+
+        :return: The status dictionary (see status).
+        """
+        from graphs import CreateGraphs
+        from processing import ProcessData
+
+        self.state, self.started, self.figures, self.error = "running", time.time(), 0, None
+        try:
+            data = ProcessData().read_data()
+            for dashboard in self.dashboards(data):
+                for option in dashboard.graph_options.values():
+                    for config in option.values():
+                        if "df" in config and config["df"].empty:
+                            continue  # The pages skip empty charts
+                        graphs = CreateGraphs(config)
+                        for value in self.tiles(graphs, config["type_graph"]):
+                            graphs.cached_figure(config["type_graph"], value)
+                            self.figures += 1
+            self.state = "ready"
+        except Exception as e:  # The pages still work without a warm cache
+            self.state, self.error = "failed", repr(e)
+        self.seconds = time.time() - self.started
+
+        # Readiness file for deployment probes
+        ready_file = os.environ.get("PIBSE_READY_FILE")
+        if ready_file and self.state == "ready":
+            with open(ready_file, "w", encoding="utf-8") as f:
+                f.write(f"{self.figures} figures in {self.seconds:.1f} s\n")
+        return self.status()
+
+    def start(self):
+        """
+        Starts a background run unless one is running or already succeeded.
+
+        :return: The status dictionary (see status).
+        """
+        with self.lock:
+            if self.state in ("idle", "failed"):
+                self.state = "running"
+                self.thread = threading.Thread(target=self.run, name="pibse-warmup", daemon=True)
+                self.thread.start()
+        return self.status()
+
+    def ready(self):
+        """
+        :return: True once every figure was built.
+        """
+        return self.state == "ready"
+
+    def status(self):
+        """
+        :return: A dictionary with the state, number of figures, duration in seconds and error of the last run.
+        """
+        return {"state": self.state, "figures": self.figures, "seconds": self.seconds, "error": self.error}
+
+
+@st.cache_resource
+def get_warmup():
+    """
+    Returns the warm-up of this process and starts it in the background on the first call, so it runs once
+    per server process.
+
+    :return: A WarmUp instance.
+    """
+    warmup = WarmUp()
+    warmup.start()
+    return warmup
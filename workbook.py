@@ -0,0 +1,256 @@
+import hashlib
+import os
+import tempfile
+
+# Error cells, read as missing like pandas.read_excel does (blank cells and NA strings are handled in join)
+ERROR_VALUES = {"#N/A", "#REF!", "#VALUE!", "#DIV/0!", "#NAME?", "#NUM!", "#NULL!"}
+
+# Default NA strings of pandas (pandas._libs.parsers.STR_NA_VALUES, private, copied from pandas 2.x)
+NA_VALUES = {"-1.#IND", "1.#QNAN", "1.#IND", "-1.#QNAN", "#N/A N/A", "#N/A", "N/A", "n/a", "NA", "<NA>", "#NA",
+             "NULL", "null", "NaN", "-NaN", "nan", "-nan", "None", ""}
+
+
+def spool(chunks, max_size: int = None):
+    """
+    Writes a stream of byte chunks to a spooled temporary file: it stays in memory up to `max_size` bytes and
+    rolls over to disk past it, so a large download is never held in memory as one bytes object.
+
+    :param chunks: Iterable of bytes (e.g., `response.iter_content(chunk_size)`).
+    :param max_size: In-memory limit in bytes. Defaults to PIBSE_SPOOL_MB (16 MB).
+    :return: A tuple (file object positioned at the start, SHA-1 hex digest of the content).
+    """
+    if max_size is None:
+        max_size = int(float(os.environ.get("PIBSE_SPOOL_MB", 16)) * 1024 ** 2)
+
+    digest = hashlib.sha1()
+    f = tempfile.SpooledTemporaryFile(max_size=max_size)
+    for chunk in chunks:
+        if chunk:
+            digest.update(chunk)
+            f.write(chunk)
+    f.seek(0)
+    return f, digest.hexdigest()
+
+
+class SheetReader:
+    """
+    This class reads one sheet of a workbook row by row with a read-only, streaming reader (openpyxl in
+    read-only mode or calamine) and builds typed pandas columns block by block, instead of loading the whole
+    object tree of the workbook first. Each block of rows is turned into one typed Series per column right
+    away, and the blocks of a column are joined one column at a time, so peak memory stays close to the
+    size of the final frame.
+
+    The result follows `pandas.read_excel` with the default options: the first non-empty row is the header,
+    blank rows are skipped, blank and error cells and the default NA strings are missing, text columns that
+    only hold numbers are parsed as numbers, and integral numbers become integers. tools/check_workbook.py
+    compares both readers on the fixture workbooks.
+    """
+
+    def __init__(self, block_rows: int = 8192):
+        """
+        :param block_rows: Number of rows converted to typed columns at once.
+        """
+        self.block_rows = block_rows
+
+    @staticmethod
+    def rows(f, sheetname: str, engine: str):
+        """
+        Iterates over the rows of a sheet.
+
+        :param f: Seekable binary file object with the workbook.
+        :param sheetname: Name of the sheet.
+        :param engine: "openpyxl" or "calamine".
+        :return: A generator of row tuples.
+        """
+        if engine == "openpyxl":
+            from openpyxl import load_workbook
+
+            wb = load_workbook(f, read_only=True, data_only=True)
+            try:
+                yield from wb[sheetname].iter_rows(values_only=True)
+            finally:
+                wb.close()
+        elif engine == "calamine":
+            from python_calamine import CalamineWorkbook
+
+            sheet = CalamineWorkbook.from_filelike(f).get_sheet_by_name(sheetname)
+            if hasattr(sheet, "iter_rows"):
+                yield from sheet.iter_rows()
+            else:  # Older python-calamine versions only return the whole sheet
+                yield from sheet.to_python(skip_empty_area=False)
+        else:
+            raise ValueError(f"Unsupported streaming engine: {engine}")
+
+    @staticmethod
+    def header(values):
+        """
+        Names the columns like pandas: blank names become "Unnamed: <i>", repeated names get a ".<n>" suffix,
+        skipping the suffixes already taken by other columns (["A", "A.1", "A"] gives "A", "A.1", "A.2").
+
+        :param values: Values of the header row.
+        :return: A list of column names.
+        """
+        names, used, counts = [], set(), {}  # counts: last suffix given to every repeated base name
+        for i, v in enumerate(values):
+            name = f"Unnamed: {i}" if v is None or v == "" else v
+            if name in used:
+                base, n = name, counts.get(name, 0)
+                while name in used:
+                    n += 1
+                    name = f"{base}.{n}"
+                counts[base] = n
+            used.add(name)
+            names.append(name)
+        return names
+
+    @staticmethod
+    def block_column(values):
+        """
+        Converts the values of one column of a block to a typed Series.
+
+        :param values: Tuple of cell values.
+        :return: A tuple (Series, True if every value is missing).
+        """
+        import datetime
+        import pandas as pd
+
+        s = pd.Series([None if v == "" or (isinstance(v, str) and v in ERROR_VALUES) else v for v in values])
+        valid = s.first_valid_index()
+        if valid is None:
+            return s, True
+
+        # Dates come as date objects from calamine; pandas reads them as timestamps
+        if s.dtype == object and isinstance(s[valid], datetime.date):
+            try:
+                s = pd.to_datetime(s)
+            except (ValueError, TypeError):
+                pass
+        return s, False
+
+    @staticmethod
+    def join(pieces: list, length: int):
+        """
+        Joins the blocks of a column and normalizes its type.
+
+        :param pieces: List of (Series, empty) blocks.
+        :param length: Total number of rows.
+        :return: The column as a Series.
+        """
+        import numpy as np
+        import pandas as pd
+
+        filled = [s for s, empty in pieces if not empty]
+        if not filled:
+            # Blank columns are float, except in a sheet without rows, where pandas leaves them as object
+            return pd.Series(np.nan, index=range(length)) if length else pd.Series([], dtype=object)
+
+        # All-missing blocks take the type of the column (NaT for dates, NaN otherwise)
+        dtype = filled[0].dtype
+        fill = dtype if pd.api.types.is_datetime64_any_dtype(dtype) or dtype == object else "float64"
+        column = pd.concat([pd.Series(None if fill != "float64" else np.nan, index=s.index, dtype=fill)
+                            if empty else s for s, empty in pieces], ignore_index=True)
+
+        if column.dtype == object:
+            # Default NA strings of pandas ("NA", "N/A", "null", ...) are missing values, stored as NaN
+            column = column.mask(column.isna() | column.isin(NA_VALUES))
+            kind = pd.api.types.infer_dtype(column, skipna=True)
+            if kind in ("string", "mixed-integer", "mixed"):
+                # Text that only holds numbers ("12", "0.5") is parsed as numbers, as pandas does; the first
+                # value rules out most text columns without converting the whole column
+                try:
+                    float(column[column.first_valid_index()])
+                    numeric = pd.to_numeric(column, errors="coerce")
+                except (ValueError, TypeError):
+                    numeric = None
+                if numeric is not None and column.notna().sum() == numeric.notna().sum():
+                    return numeric
+            elif kind in ("integer", "floating", "mixed-integer-float"):
+                # Numbers mixed with missing markers
+                column = pd.to_numeric(column)
+        if column.dtype.kind == "f" and column.notna().all() and (column % 1 == 0).all():
+            column = column.astype("int64")  # Integral numbers are read as integers
+        return column
+
+    def read(self, f, sheetname: str, engine: str):
+        """
+        Reads a sheet into a DataFrame.
+
+        :param f: Seekable binary file object with the workbook.
+        :param sheetname: Name of the sheet.
+        :param engine: "openpyxl" or "calamine".
+        :return: A DataFrame.
+        """
+        import numpy as np
+        import pandas as pd
+
+        names = None
+        columns = []  # Blocks of every column: list of (Series, empty)
+        starts = []  # Row where every column starts (columns can appear after the first block)
+        length = 0
+        block = []
+
+        def flush():
+            nonlocal length
+            width = len(names)
+            for j, values in enumerate(zip(*(r + (None,) * (width - len(r)) for r in block))):
+                columns[j].append(self.block_column(values))
+            length += len(block)
+            block.clear()
+
+        for row in self.rows(f, sheetname, engine):
+            row = tuple(row)
+            # Trailing blank cells do not count, and blank rows are skipped
+            end = len(row)
+            while end and (row[end - 1] is None or row[end - 1] == ""):
+                end -= 1
+            if not end:
+                continue
+            row = row[:end]
+
+            if names is None:
+                names = self.header(row)
+                columns = [[] for _ in names]
+                starts = [0] * len(names)
+                continue
+
+            if len(row) > len(names):
+                # Cells past the header: new unnamed columns, missing in the rows read so far
+                flush()
+                for i in range(len(names), len(row)):
+                    names.append(f"Unnamed: {i}")
+                    columns.append([])
+                    starts.append(length)
+
+            block.append(row)
+            if len(block) >= self.block_rows:
+                flush()
+
+        if names is None:
+            return pd.DataFrame()
+        if block:
+            flush()
+
+        data = {}
+        for j, name in enumerate(names):
+            pieces = columns[j]
+            if starts[j]:
+                pieces.insert(0, (pd.Series(np.nan, index=range(starts[j])), True))
+            data[name] = self.join(pieces, length)
+            columns[j] = None  # Release the blocks of the column once it is joined
+        return pd.DataFrame(data)
+
+
+def read_sheet(f, sheetname: str, engine: str):
+    """
+    Reads a sheet with the streaming reader when the engine supports it, and with pandas.read_excel otherwise.
+
+    :param f: Seekable binary file object with the workbook.
+    :param sheetname: Name of the sheet.
+    :param engine: Engine of the sheet configuration (e.g., "openpyxl", "calamine").
+    :return: A DataFrame.
+    """
+    if engine in ("openpyxl", "calamine"):
+        return SheetReader().read(f, sheetname, engine)
+
+    import pandas as pd
+    return pd.read_excel(f, sheet_name=sheetname, engine=engine)